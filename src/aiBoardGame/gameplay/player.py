@@ -2,6 +2,7 @@
 
 # pylint: disable=no-name-in-module, no-member, unnecessary-pass
 
+import logging
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Tuple, Optional, ClassVar
@@ -10,7 +11,8 @@ import numpy as np
 import cv2 as cv
 from PyQt6.QtCore import pyqtSignal, QObject
 
-from aiBoardGame.logic import FairyStockfish, Difficulty, Position
+from aiBoardGame.logic import FairyStockfish, AlphaBetaSearch, Difficulty, Position
+from aiBoardGame.logic.search import OpeningBook, BOOK_PLIES, Tablebase
 from aiBoardGame.robot import RobotArm, RobotArmException
 from aiBoardGame.vision import RobotCamera, BoardImage, CameraError
 
@@ -121,25 +123,71 @@ class HumanPlayer(Player):
 @dataclass(init=False)
 class RobotPlayer(Player):
     """Robot player class base"""
-    stockfish: FairyStockfish
-    """Stockfish to generate moves"""
-
-    def __init__(self, difficulty: Difficulty = Difficulty.MEDIUM) -> None:
+    stockfish: Optional[FairyStockfish]
+    """Stockfish to generate moves, None if the binary is not available"""
+    alphaBetaSearch: AlphaBetaSearch
+    """In-process search to generate moves on easy difficulty or without Stockfish"""
+    openingBook: Optional[OpeningBook]
+    """Opening book consulted before searching, None if the book is not available"""
+    tablebase: Optional[Tablebase]
+    """Endgame tablebase consulted before searching, None if no table is available"""
+
+    def __init__(self, difficulty: Difficulty = Difficulty.MEDIUM, openingBookPath: Optional[Path] = OpeningBook.basePath, tablebaseDirectory: Optional[Path] = Tablebase.basePath) -> None:
         """
         :param difficulty: Quality of generated moves, defaults to Difficulty.MEDIUM
         :type difficulty: Difficulty, optional
+        :param openingBookPath: Opening book file, defaults to OpeningBook.basePath, None disables the book
+        :type openingBookPath: Optional[Path], optional
+        :param tablebaseDirectory: Directory of endgame tables, defaults to Tablebase.basePath, None disables the tablebase
+        :type tablebaseDirectory: Optional[Path], optional
         """
         super().__init__()
-        self.stockfish = FairyStockfish(difficulty=difficulty)
+        self.alphaBetaSearch = AlphaBetaSearch(difficulty=difficulty)
+        self.openingBook = None
+        if openingBookPath is not None and openingBookPath.exists():
+            try:
+                self.openingBook = OpeningBook(openingBookPath)
+            except ValueError:
+                logging.warning(f"Cannot open opening book {openingBookPath}, moves are generated by search from the start")
+        self.tablebase = Tablebase(tablebaseDirectory) if tablebaseDirectory is not None and tablebaseDirectory.is_dir() else None
+        try:
+            self.stockfish = FairyStockfish(difficulty=difficulty)
+        except OSError:
+            logging.warning("Cannot start Fairy-Stockfish, moves are generated by in-process search")
+            self.stockfish = None
 
     @property
     def difficulty(self) -> Difficulty:
         """Quality of generated moves"""
-        return self.stockfish.difficulty
+        return self.alphaBetaSearch.difficulty
 
     @difficulty.setter
     def difficulty(self, value: Difficulty) -> None:
-        self.stockfish.difficulty = value
+        self.alphaBetaSearch.difficulty = value
+        if self.stockfish is not None:
+            self.stockfish.difficulty = value
+
+    def nextMove(self, fen: str) -> Optional[Tuple[Position, Position]]:
+        """Take a move from the opening book for the first :data:`~aiBoardGame.logic.search.BOOK_PLIES` plies of the difficulty,
+        or play perfectly from the endgame tablebase if it has the position,
+        otherwise generate a move with in-process search on easy difficulty or without Stockfish, otherwise with Stockfish
+
+        :param fen: Game state to generate move on
+        :type fen: str
+        :return: Move's start and end position or nothing if there is no valid move
+        :rtype: Optional[Tuple[Position, Position]]
+        """
+        if self.openingBook is not None:
+            move = self.openingBook.nextMove(fen, maxPly=BOOK_PLIES[self.difficulty])
+            if move is not None:
+                return move
+        if self.tablebase is not None:
+            move = self.tablebase.nextMove(fen)
+            if move is not None:
+                return move
+        if self.stockfish is None or self.difficulty == Difficulty.EASY:
+            return self.alphaBetaSearch.nextMove(fen)
+        return self.stockfish.nextMove(fen=fen)
 
 
 @dataclass(init=False)
@@ -160,7 +208,7 @@ class RobotTerminalPlayer(RobotPlayer, TerminalPlayer):
         :param fen: Game state to make move decision on
         :type fen: str
         """
-        self.move = self.stockfish.nextMove(fen=fen)
+        self.move = self.nextMove(fen)
         if self.move is None:
             self.isConceding = True
 
@@ -226,7 +274,7 @@ class RobotArmPlayer(RobotPlayer):
         :type fen: str
         :raises RuntimeError: Generated move piece not found on board
         """
-        move = self.stockfish.nextMove(fen=fen)
+        move = self.nextMove(fen)
         if move is not None:
             fromMove, toMove = move
 
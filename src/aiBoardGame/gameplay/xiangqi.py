@@ -4,16 +4,20 @@
 
 import logging
 from pathlib import Path
+from time import perf_counter, time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Union, Tuple, Optional, Dict
+from typing import Union, Tuple, Optional, Dict, List
 from PyQt6.QtCore import pyqtSignal, QObject
 
 from aiBoardGame.logic import XiangqiEngine, InvalidMove, Board, Side, Difficulty, prettyBoard, Position
+from aiBoardGame.logic.engine.gameArchive import GameArchive, GameArchiveWriter
+from aiBoardGame.logic.engine.repetition import RepetitionRules, RepetitionVerdict
+from aiBoardGame.logic.engine.tactics import Tactics
 from aiBoardGame.vision import RobotCamera, CameraError, XiangqiPieceClassifier, BoardImage
 from aiBoardGame.robot import RobotArm, RobotArmException
 
-from aiBoardGame.gameplay.player import Player, HumanPlayer, RobotArmPlayer, HumanTerminalPlayer, RobotTerminalPlayer, PlayerError
+from aiBoardGame.gameplay.player import Player, HumanPlayer, RobotPlayer, RobotArmPlayer, HumanTerminalPlayer, RobotTerminalPlayer, PlayerError
 from aiBoardGame.gameplay.utility import retry, rerunAfterCorrection, utils, FinalMeta
 
 
@@ -31,22 +35,38 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
     """Signal emitted when turn has changed"""
     engineUpdated = pyqtSignal(str)
     """Signal emitted when engine has been updated"""
+    evaluationUpdated = pyqtSignal(int)
+    """Signal emitted with the engine's material and piece-square score from red's view when engine has been updated"""
+    hangingPiecesUpdated = pyqtSignal(list)
+    """Signal emitted with the positions of the side to move's pieces that the opponent can win material by capturing when engine has been updated"""
     over = pyqtSignal(Side, Player)
     """Signal emitted if game is over"""
+    drawn = pyqtSignal(str)
+    """Signal emitted with the reason if game is over without a winner"""
 
-    def __init__(self, redSide: Player, blackSide: Player) -> None:
+    def __init__(self, redSide: Player, blackSide: Player, archivePath: Optional[Path] = GameArchive.basePath, rules: Optional[RepetitionRules] = RepetitionRules()) -> None:
         """Used for subclass initialization
 
         :param redSide: Red side player
         :type redSide: Player
         :param blackSide: Black side player
         :type blackSide: Player
+        :param archivePath: Game archive every played game is appended to, defaults to GameArchive.basePath, None disables archiving
+        :type archivePath: Optional[Path], optional
+        :param rules: Rules ending the game when a position repeats, defaults to RepetitionRules(), None lets positions repeat forever
+        :type rules: Optional[RepetitionRules], optional
         """
         ABC.__init__(self)
         QObject.__init__(self)
         self.sides: Dict[Side, Player] = {Side.RED: redSide, Side.BLACK: blackSide}
-        self._engine = XiangqiEngine()
+        self.archivePath = archivePath
+        self.rules = rules
+        self._engine = XiangqiEngine(lazy=True)
+        self._tactics = Tactics(self._engine)
         self._turn = 0
+        self._startedAt = 0.0
+        self._timings: List[float] = []
+        self._verdict: Optional[RepetitionVerdict] = None
 
 
     @property
@@ -82,12 +102,14 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
     @property
     def isOver(self) -> bool:
         """Checks if game is over"""
-        return self._engine.isOver or any([player.isConceding for player in self.sides.values()])
+        return self._engine.isOver or self._verdict is not None or any([player.isConceding for player in self.sides.values()])
 
     @property
     def winner(self) -> Optional[Tuple[Side, Player]]:
-        """Winner if game is over"""
-        if self._engine.isOver:
+        """Winner if game is over, None if it is not over or ended in a draw"""
+        if self._verdict is not None:
+            return None if self._verdict.winner is None else (self._verdict.winner, self.sides[self._verdict.winner])
+        elif self._engine.isOver:
             winnerSide = self._engine.winner
             return winnerSide, self.sides[winnerSide]
         elif self.redSide.isConceding:
@@ -102,7 +124,12 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
         try:
             self._engine.newGame()
             self.engineUpdated.emit(self._engine.fen)
+            self.evaluationUpdated.emit(self._engine.score)
+            self.hangingPiecesUpdated.emit(self._tactics.hangingPieces(self._engine.currentSide))
             self.turn = 0
+            self._startedAt = time()
+            self._timings = []
+            self._verdict = None
             for player in self.sides.values():
                 player.prepare()
         except PlayerError as error:
@@ -110,7 +137,9 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
 
     def play(self) -> None:
         """Start Xiangqi game after preparation. Game consists of valid moves made by both sides
-        one after another until game is over. If move was invalid it needs to be corrected
+        one after another until game is over. If move was invalid it needs to be corrected.
+        After every move the repetition rules are applied, which may end the game with a winner or a draw.
+        The finished game is appended to the game archive if archiving is enabled
         """
         self._prepare()
         text = "Starting game"
@@ -123,6 +152,7 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
                 logging.info("")
                 logging.info(f"Turn {self.turn}")
                 logging.info("")
+            moveStartedAt = perf_counter()
             try:
                 self.currentPlayer.makeMove(self._engine.fen)
                 if not self.currentPlayer.isConceding:
@@ -139,11 +169,40 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
                 self._handleInvalidMove(error)
             else:
                 moves += 1
+                if not self.currentPlayer.isConceding:
+                    self._timings.append(perf_counter() - moveStartedAt)
+                    if self.rules is not None:
+                        self._verdict = self.rules.judge(self._engine)
                 self.engineUpdated.emit(self._engine.fen)
-        side, player = self.winner
+                self.evaluationUpdated.emit(self._engine.score)
+                self.hangingPiecesUpdated.emit(self._tactics.hangingPieces(self._engine.currentSide))
+        if self._verdict is not None:
+            text = self._verdict.reason
+            logging.info(text)
+            utils.statusUpdate.emit(text)
+        if (winner := self.winner) is None:
+            logging.info("The game has ended in a draw")
+            self._archive(None)
+            self.drawn.emit(self._verdict.reason)
+            return
+        side, player = winner
         logging.info(f"The game has ended, {side.name} {player.__class__.__name__} has won")
+        self._archive(side)
         self.over.emit(side, player)
 
+    def _archive(self, winner: Optional[Side]) -> None:
+        if self.archivePath is None:
+            return
+        moves = self._engine.moveHistory.moves
+        # NOTE: Moves corrected after an invalid move are not timed, timings are only stored if every move has one
+        timings = self._timings if len(self._timings) == len(moves) else None
+        difficulties = [player.difficulty if isinstance(player, RobotPlayer) else None for player in (self.redSide, self.blackSide)]
+        try:
+            with GameArchiveWriter(self.archivePath) as writer:
+                writer.append(moves, winner, *difficulties, startedAt=self._startedAt, timings=timings)
+        except (OSError, ValueError) as error:
+            logging.error(f"Cannot archive game to {self.archivePath}: {error}")
+
     @abstractmethod
     def _updateEngine(self) -> None:
         raise NotImplementedError(f"{self.__class__.__name__} has not implemented _updateEngine() method")
@@ -155,8 +214,8 @@ class XiangqiBase(ABC, QObject, metaclass=FinalMeta):
 
 class TerminalXiangqi(XiangqiBase):
     """Xiangqi gameplay in terminal"""
-    def __init__(self, redSide: Union[HumanTerminalPlayer, RobotTerminalPlayer], blackSide: Union[HumanTerminalPlayer, RobotTerminalPlayer]) -> None:
-        super().__init__(redSide, blackSide)
+    def __init__(self, redSide: Union[HumanTerminalPlayer, RobotTerminalPlayer], blackSide: Union[HumanTerminalPlayer, RobotTerminalPlayer], archivePath: Optional[Path] = GameArchive.basePath, rules: Optional[RepetitionRules] = RepetitionRules()) -> None:
+        super().__init__(redSide, blackSide, archivePath, rules)
 
     def _prepare(self) -> None:
         super()._prepare()
@@ -185,10 +244,10 @@ class Xiangqi(XiangqiBase):
     invalidMove = pyqtSignal(str, str)
     """Signal emitted when move was invalid"""
 
-    def __init__(self, camera: RobotCamera, redSide: Union[HumanPlayer, RobotArmPlayer], blackSide: Union[HumanPlayer, RobotArmPlayer]) -> None:
+    def __init__(self, camera: RobotCamera, redSide: Union[HumanPlayer, RobotArmPlayer], blackSide: Union[HumanPlayer, RobotArmPlayer], archivePath: Optional[Path] = GameArchive.basePath, rules: Optional[RepetitionRules] = RepetitionRules()) -> None:
         if not camera.isCalibrated:
             raise GameplayError("Camera is not calibrated, cannot play Xiangqi")
-        super().__init__(redSide, blackSide)
+        super().__init__(redSide, blackSide, archivePath, rules)
 
         self._camera = camera
         self._classifier = XiangqiPieceClassifier(weights=XiangqiPieceClassifier.baseWeightsPath, device=XiangqiPieceClassifier.getAvailableDevice())
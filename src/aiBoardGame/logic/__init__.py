@@ -2,10 +2,11 @@
 
 from aiBoardGame.logic.engine import XiangqiEngine, InvalidMove, Board, Side, Position, fenToBoard, prettyBoard
 from aiBoardGame.logic.stockfish import FairyStockfish, Difficulty
+from aiBoardGame.logic.search import AlphaBetaSearch
 
 __all__ = [
     "XiangqiEngine", "InvalidMove",
     "Board", "Side", "Position",
-    "FairyStockfish", "Difficulty",
+    "FairyStockfish", "Difficulty", "AlphaBetaSearch",
     "fenToBoard", "prettyBoard"
 ]
@@ -1,15 +1,22 @@
 """Engine related modules"""
 
-from aiBoardGame.logic.engine.move import MoveRecord, InvalidMove
+from aiBoardGame.logic.engine.move import MoveRecord, InvalidMove, BoardMatch
 from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.engine.snapshot import PositionSnapshot
+from aiBoardGame.logic.engine.repetition import RepetitionRules, RepetitionVerdict
+from aiBoardGame.logic.engine.profiling import EngineProfile
+from aiBoardGame.logic.engine.tactics import Tactics, Threat
 from aiBoardGame.logic.engine.auxiliary import Side, Delta, Position, BoardEntity, SideState, Board
+from aiBoardGame.logic.engine.compactBoard import CompactBoard
+from aiBoardGame.logic.engine.boardCodec import boardFromBytes, boardToBytes, squaresView
 from aiBoardGame.logic.engine.utility import createXiangqiBoard, fenToBoard, prettyBoard
 
 
 __all__ = [
-    "XiangqiEngine",
-    "Board", "SideState", "BoardEntity",
-    "MoveRecord", "InvalidMove",
+    "XiangqiEngine", "PositionSnapshot", "RepetitionRules", "RepetitionVerdict", "EngineProfile", "Tactics", "Threat",
+    "Board", "SideState", "BoardEntity", "CompactBoard",
+    "MoveRecord", "InvalidMove", "BoardMatch",
     "Position", "Side", "Delta",
-    "createXiangqiBoard", "fenToBoard", "prettyBoard"
+    "createXiangqiBoard", "fenToBoard", "prettyBoard",
+    "boardFromBytes", "boardToBytes", "squaresView"
 ]
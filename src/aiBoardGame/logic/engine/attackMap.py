@@ -0,0 +1,380 @@
+"""Attack counts of both sides, maintained incrementally while pieces move"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from aiBoardGame.logic.engine.auxiliary import Board, Side
+from aiBoardGame.logic.engine.compactBoard import EMPTY, SENTINEL, PIECE_TO_CODE, ENTITY_TO_CODE
+from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.tables import SQUARE_COUNT, GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_MOVES, HORSE_MOVES, SOLDIER_MOVES, RAYS, FORWARD_RAYS, HORSE_ATTACKS, SOLDIER_ATTACKS, LEG_HORSES, EYE_ELEPHANTS, squareIndex
+
+
+_GENERAL = PIECE_TO_CODE[General]
+_ADVISOR = PIECE_TO_CODE[Advisor]
+_ELEPHANT = PIECE_TO_CODE[Elephant]
+_HORSE = PIECE_TO_CODE[Horse]
+_CHARIOT = PIECE_TO_CODE[Chariot]
+_CANNON = PIECE_TO_CODE[Cannon]
+_SOLDIER = PIECE_TO_CODE[Soldier]
+
+_NO_ATTACKS: Tuple[int, ...] = ()
+
+
+class AttackMap:
+    """Number of pieces of each side attacking each square. A piece attacks a square if it could capture an enemy piece there,
+    so squares of friendly pieces are counted as well. The flying general move is not part of the counts, it only matters
+    for the enemy general and is checked separately by :meth:`isSquareAttacked`.
+
+    The map keeps its own copy of the piece codes, :meth:`movePiece` and :meth:`unmovePiece` update the counts of only the pieces
+    whose attacks can change: the moved and captured piece, chariots and cannons seeing the changed squares, horses with a changed leg
+    and elephants with a changed eye"""
+    squares: array
+    """Piece code for each square, same layout as :attr:`~aiBoardGame.logic.engine.compactBoard.CompactBoard.squares`"""
+
+    def __init__(self, board: Board) -> None:
+        """
+        :param board: Board to calculate the attacks of
+        :type board: Board
+        """
+        squares = array("b", [EMPTY] * SQUARE_COUNT + [SENTINEL])
+        for position, boardEntity in board.pieces:
+            squares[squareIndex(position)] = ENTITY_TO_CODE[boardEntity]
+        self._setSquares(squares)
+
+    @classmethod
+    def fromSquares(cls, squares: Sequence[int]) -> AttackMap:
+        """Calculate the attacks of piece codes
+
+        :param squares: Piece code for each square and the sentinel, see :attr:`squares`
+        :type squares: Sequence[int]
+        :return: Attack map of the pieces
+        :rtype: AttackMap
+        """
+        attackMap = cls.__new__(cls)
+        attackMap._setSquares(array("b", squares))
+        return attackMap
+
+    def attackCount(self, square: int, bySide: Side) -> int:
+        """Count pieces of a side that attack a square, without the flying general
+
+        :param square: Square index
+        :type square: int
+        :param bySide: Attacking side
+        :type bySide: Side
+        :return: Number of attacking pieces
+        :rtype: int
+        """
+        return self._counts[bySide][square]
+
+    def isSquareAttacked(self, square: int, bySide: Side) -> bool:
+        """Check if a side attacks a square, including the flying general if the square holds the enemy general
+
+        :param square: Square index
+        :type square: int
+        :param bySide: Attacking side
+        :type bySide: Side
+        :return: Square is attacked
+        :rtype: bool
+        """
+        return self._counts[bySide][square] > 0 or self._isFacingGeneral(square, bySide)
+
+    def pieceAttacks(self, square: int) -> Sequence[int]:
+        """Squares attacked by the piece on a square, the returned sequence is not modified by later moves
+
+        :param square: Square index
+        :type square: int
+        :return: Attacked square indices, empty if the square is empty
+        :rtype: Sequence[int]
+        """
+        return self._attacks[square]
+
+    def attackers(self, square: int, bySide: Side) -> List[int]:
+        """Find the pieces of a side that attack a square, including the flying general if the square holds the enemy general
+
+        :param square: Square index
+        :type square: int
+        :param bySide: Attacking side
+        :type bySide: Side
+        :return: Square indices of the attacking pieces
+        :rtype: List[int]
+        """
+        counts = self._counts[bySide]
+        if counts[square] == 0 and not self._isFacingGeneral(square, bySide):
+            return []
+        # NOTE: Only pieces around the square or first on its rays can attack it, the maintained attacks of these candidates decide
+        candidates = {start for start, _ in HORSE_ATTACKS[square]}
+        candidates.update(SOLDIER_ATTACKS[bySide][square], ADVISOR_MOVES[bySide][square], GENERAL_MOVES[bySide][square])
+        candidates.update(start for start, _ in ELEPHANT_MOVES[bySide][square])
+        for ray in RAYS[square]:
+            foundPieceCount = 0
+            for start in ray:
+                if self.squares[start] != EMPTY:
+                    candidates.add(start)
+                    foundPieceCount += 1
+                    if foundPieceCount == 2:
+                        break
+        attackers = sorted(start for start in candidates if self._owners[start] is counts and square in self._attacks[start])
+        if self._isFacingGeneral(square, bySide):
+            attackers.append(next(end for end in FORWARD_RAYS[-bySide][square] if self.squares[end] != EMPTY))
+        return attackers
+
+    def getPins(self, general: int) -> Tuple[Dict[int, Set[int]], Set[int]]:
+        """Find moves of the general's side that would expose the general, when it is not in check
+
+        :param general: Square index of the general
+        :type general: int
+        :return: Allowed end squares of each pinned piece, and squares no piece other than the general may move to
+            because it would become the screen of a cannon
+        :rtype: Tuple[Dict[int, Set[int]], Set[int]]
+        """
+        squares = self.squares
+        side = 1 if squares[general] > 0 else -1
+        pins: Dict[int, Set[int]] = {}
+        blocked: Set[int] = set()
+        for ray in RAYS[general]:
+            found = []
+            for index, square in enumerate(ray):
+                if squares[square] != EMPTY:
+                    found.append(index)
+                    if len(found) == 3:
+                        break
+            if len(found) == 0:
+                continue
+            if squares[ray[found[0]]] == -_CANNON * side:
+                blocked.update(ray[:found[0]])
+            # NOTE: Only the first two pieces of a ray can shield the general from a chariot, cannon or general,
+            # an opponent's piece can be the other screen of a cannon
+            for start in (ray[index] for index in found[:2]):
+                if squares[start] * side > 0 and _isRayExposed(squares, ray, side, start, None):
+                    reachable = ray[:found[-1] + 1]
+                    pins[start] = {end for end in reachable if not _isRayExposed(squares, ray, side, start, end)}
+        for horse, leg in HORSE_ATTACKS[general]:
+            if squares[horse] == -_HORSE * side and squares[leg] * side > 0:
+                # NOTE: A leg shared by two horses, or also pinned on a ray, keeps only the moves allowed by every pin
+                pins[leg] = pins.get(leg, {horse}) & {horse}
+        return pins, blocked
+
+    def isSafeMove(self, start: int, end: int, general: int) -> bool:
+        """Check if a move leaves the moving side's general unattacked, the move is evaluated without changing the board
+
+        :param start: Start square of the move
+        :type start: int
+        :param end: End square of the move
+        :type end: int
+        :param general: Square of the moving side's general before the move
+        :type general: int
+        :return: General is not attacked after the move
+        :rtype: bool
+        """
+        if start == general:
+            return self.isSafeGeneralMove(start, end)
+        squares = self.squares
+        side = 1 if squares[general] > 0 else -1
+        for ray in RAYS[general]:
+            if _isRayExposed(squares, ray, side, start, end):
+                return False
+        opponentHorse = -_HORSE * side
+        for horse, leg in HORSE_ATTACKS[general]:
+            if horse != end and squares[horse] == opponentHorse and (leg == start or (leg != end and squares[leg] == EMPTY)):
+                return False
+        opponentSoldier = -_SOLDIER * side
+        return all(soldier == end or squares[soldier] != opponentSoldier for soldier in SOLDIER_ATTACKS[-side][general])
+
+    def isSafeGeneralMove(self, start: int, end: int) -> bool:
+        """Check if the general can move to a square without being attacked there, using the attack counts
+
+        :param start: Square of the general
+        :type start: int
+        :param end: Square next to the general
+        :type end: int
+        :return: General is not attacked after the move
+        :rtype: bool
+        """
+        squares = self.squares
+        side = 1 if squares[start] > 0 else -1
+        attackCount = self._counts[-side][end]
+        # NOTE: Only attacks along the line of the move pass through the start square, the ones behind the general are corrected here
+        behind = next((ray for ray in RAYS[start] if len(ray) > 0 and ray[0] - start == start - end), ())
+        foundPieceCount = 0
+        for square in behind:
+            code = squares[square]
+            if code != EMPTY:
+                foundPieceCount += 1
+                if foundPieceCount == 1:
+                    if code == -_CANNON * side:
+                        attackCount -= 1
+                    elif code == -_CHARIOT * side:
+                        attackCount += 1
+                else:
+                    if code == -_CANNON * side:
+                        attackCount += 1
+                    break
+        if attackCount > 0:
+            return False
+        for square in FORWARD_RAYS[side][end]:
+            code = squares[square]
+            if square != start and code != EMPTY:
+                return code != -_GENERAL * side
+        return True
+
+    def movePiece(self, start: int, end: int) -> int:
+        """Move a piece and update the attack counts
+
+        :param start: Square index of the moved piece
+        :type start: int
+        :param end: Square index to move to
+        :type end: int
+        :return: Code of the captured piece, :data:`~aiBoardGame.logic.engine.compactBoard.EMPTY` if nothing was captured
+        :rtype: int
+        """
+        squares = self.squares
+        capturedCode = squares[end]
+        affected = {start, end}
+        self._collectAffected(start, affected)
+        self._collectAffected(end, affected)
+        squares[start], squares[end] = EMPTY, squares[start]
+        self._collectAffected(start, affected)
+        self._collectAffected(end, affected)
+        self._refresh(affected)
+        return capturedCode
+
+    def unmovePiece(self, start: int, end: int, capturedCode: int) -> None:
+        """Take back a move made by :meth:`movePiece` and update the attack counts
+
+        :param start: Square index the piece was moved from
+        :type start: int
+        :param end: Square index the piece was moved to
+        :type end: int
+        :param capturedCode: Code returned by :meth:`movePiece`
+        :type capturedCode: int
+        """
+        squares = self.squares
+        affected = {start, end}
+        self._collectAffected(start, affected)
+        self._collectAffected(end, affected)
+        squares[start], squares[end] = squares[end], capturedCode
+        self._collectAffected(start, affected)
+        self._collectAffected(end, affected)
+        self._refresh(affected)
+
+    def verify(self) -> None:
+        """Compare the attack counts with a full recalculation
+
+        :raises RuntimeError: Attack counts differ
+        """
+        attackMap = AttackMap.fromSquares(self.squares)
+        if any(attackMap.attackCount(square, side) != self.attackCount(square, side) for side in Side for square in range(SQUARE_COUNT)):
+            raise RuntimeError("Incrementally maintained attack counts differ from full recalculation")
+
+    def _setSquares(self, squares: array) -> None:
+        self.squares = squares
+        # NOTE: Indexed by the sign of a piece code, index -1 is black
+        self._counts: Tuple[Optional[array], array, array] = (None, array("B", bytes(SQUARE_COUNT + 1)), array("B", bytes(SQUARE_COUNT + 1)))
+        self._attacks: List[Sequence[int]] = [_NO_ATTACKS] * SQUARE_COUNT
+        self._owners: List[Optional[array]] = [None] * SQUARE_COUNT
+        self._refresh(range(SQUARE_COUNT))
+
+    def _isFacingGeneral(self, square: int, bySide: Side) -> bool:
+        squares = self.squares
+        if squares[square] != -_GENERAL * bySide:
+            return False
+        for end in FORWARD_RAYS[-bySide][square]:
+            if squares[end] != EMPTY:
+                return squares[end] == _GENERAL * bySide
+        return False
+
+    def _collectAffected(self, square: int, affected: Set[int]) -> None:
+        squares = self.squares
+        for ray in RAYS[square]:
+            foundPieceCount = 0
+            for end in ray:
+                code = squares[end]
+                if code != EMPTY:
+                    # NOTE: A cannon depends on the first two pieces of its rays, a chariot only on the first one
+                    if code == _CANNON or code == -_CANNON or (foundPieceCount == 0 and (code == _CHARIOT or code == -_CHARIOT)):
+                        affected.add(end)
+                    foundPieceCount += 1
+                    if foundPieceCount == 2:
+                        break
+        for horse in LEG_HORSES[square]:
+            if squares[horse] == _HORSE or squares[horse] == -_HORSE:
+                affected.add(horse)
+        for elephant in EYE_ELEPHANTS[square]:
+            if squares[elephant] == _ELEPHANT or squares[elephant] == -_ELEPHANT:
+                affected.add(elephant)
+
+    def _refresh(self, squares: Sequence[int]) -> None:
+        attacks, owners, codes = self._attacks, self._owners, self.squares
+        for square in squares:
+            counts = owners[square]
+            if counts is not None:
+                for target in attacks[square]:
+                    counts[target] -= 1
+            code = codes[square]
+            if code == EMPTY:
+                owners[square], attacks[square] = None, _NO_ATTACKS
+            else:
+                counts = self._counts[1 if code > 0 else -1]
+                pieceAttacks = _pieceAttacks(codes, square, code)
+                for target in pieceAttacks:
+                    counts[target] += 1
+                owners[square], attacks[square] = counts, pieceAttacks
+
+
+def _isRayExposed(squares: array, ray: Sequence[int], side: int, vacated: int, occupied: Optional[int]) -> bool:
+    # NOTE: The move is applied virtually, the vacated square reads as empty and the occupied one as a friendly piece
+    foundPieceCount = 0
+    for square in ray:
+        if square == occupied:
+            code = side
+        elif square == vacated:
+            continue
+        else:
+            code = squares[square]
+            if code == EMPTY:
+                continue
+        foundPieceCount += 1
+        if foundPieceCount == 1:
+            if code == -_CHARIOT * side or code == -_GENERAL * side:
+                return True
+        else:
+            return code == -_CANNON * side
+    return False
+
+
+def _pieceAttacks(squares: array, square: int, code: int) -> Sequence[int]:  # pylint: disable=too-many-branches,too-many-return-statements
+    side = 1 if code > 0 else -1
+    piece = code * side
+    if piece == _CHARIOT:
+        attacks = []
+        for ray in RAYS[square]:
+            for end in ray:
+                attacks.append(end)
+                if squares[end] != EMPTY:
+                    break
+        return attacks
+    elif piece == _CANNON:
+        attacks = []
+        for ray in RAYS[square]:
+            isScreened = False
+            for end in ray:
+                if isScreened:
+                    attacks.append(end)
+                    if squares[end] != EMPTY:
+                        break
+                elif squares[end] != EMPTY:
+                    isScreened = True
+        return attacks
+    elif piece == _HORSE:
+        return [end for end, leg in HORSE_MOVES[side][square] if squares[leg] == EMPTY]
+    elif piece == _ELEPHANT:
+        return [end for end, eye in ELEPHANT_MOVES[side][square] if squares[eye] == EMPTY]
+    elif piece == _SOLDIER:
+        return SOLDIER_MOVES[side][square]
+    elif piece == _ADVISOR:
+        return ADVISOR_MOVES[side][square]
+    elif piece == _GENERAL:
+        return GENERAL_MOVES[side][square]
+    return _NO_ATTACKS
@@ -180,7 +180,7 @@ class SideState(Dict[Position, Type[Piece]]):
             return super().__setitem__(key, value)
 
 
-@dataclass(init=False)
+@dataclass(init=False, eq=False)
 class Board(Dict[Side, SideState]):
     """Class for tracking gameboard state"""
     fileBounds: ClassVar[Tuple[int, int]] = (0, 9)
@@ -207,6 +207,29 @@ class Board(Dict[Side, SideState]):
         """
         return (cls.fileBounds[0], cls.rankBounds[0]) <= position < (cls.fileBounds[1], cls.rankBounds[1])
 
+    @classmethod
+    def fromBytes(cls, data: bytes) -> Board:
+        """Decode a board encoded with :meth:`toBytes`, see :func:`~aiBoardGame.logic.engine.boardCodec.boardFromBytes`
+
+        :param data: Encoded board
+        :type data: bytes
+        :raises ValueError: Data is not a valid encoded board
+        :return: New board of this class
+        :rtype: Board
+        """
+        # NOTE: Piece codes are defined on top of this module, so the codec is imported on first use
+        from aiBoardGame.logic.engine.boardCodec import boardFromBytes  # pylint: disable=import-outside-toplevel
+        return boardFromBytes(data, cls)
+
+    def toBytes(self) -> bytes:
+        """Encode board in one signed piece code per square, see :func:`~aiBoardGame.logic.engine.boardCodec.boardToBytes`
+
+        :return: Encoded board
+        :rtype: bytes
+        """
+        from aiBoardGame.logic.engine.boardCodec import boardToBytes  # pylint: disable=import-outside-toplevel
+        return boardToBytes(self)
+
     @property
     def pieces(self) -> List[Tuple[Position, BoardEntity]]:
         """Pieces on board"""
@@ -0,0 +1,283 @@
+"""Legal move generation and check detection for many boards at once with NumPy.
+Boards are ``(N, 10, 9)`` int8 arrays of piece codes indexed by rank and file, the same codes :class:`CompactBoard` stores"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from aiBoardGame.logic.engine.auxiliary import Board, Side
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, ENTITY_TO_CODE, PIECE_TO_CODE
+from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.tables import (
+    FILE_COUNT, RANK_COUNT, SQUARE_COUNT, OFF_BOARD, PALACE, GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_MOVES, HORSE_MOVES, SOLDIER_MOVES, RAYS, FORWARD_RAYS, BETWEEN
+)
+from aiBoardGame.logic.engine.utility import fenToBoard
+
+
+BOARD_SHAPE = (RANK_COUNT, FILE_COUNT)
+"""Shape of a single board in a batch"""
+
+DEFAULT_CHUNK_SIZE = 4096
+"""Default number of boards processed together, bounds the size of temporary arrays"""
+
+_GENERAL = PIECE_TO_CODE[General]
+_NORMAL, _CANNON, _FLYING = range(3)
+_MAX_BETWEEN = RANK_COUNT - 2
+
+
+@dataclass(frozen=True)
+class BatchMoves:
+    """Legal moves of a batch of boards in coordinate format, ordered by board"""
+    boardIndices: np.ndarray
+    """Index of the board of each legal move"""
+    starts: np.ndarray
+    """Start square index of each legal move"""
+    ends: np.ndarray
+    """End square index of each legal move"""
+    inCheck: np.ndarray
+    """Whether the side to move is in check on each board"""
+
+    @property
+    def boardCount(self) -> int:
+        """Number of boards in the batch"""
+        return len(self.inCheck)
+
+    @property
+    def moveCounts(self) -> np.ndarray:
+        """Number of legal moves on each board, 0 means the side to move is mated"""
+        return np.bincount(self.boardIndices, minlength=self.boardCount)
+
+    @property
+    def moves(self) -> np.ndarray:
+        """Legal moves encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`"""
+        return (self.starts.astype(np.int32) << 8) | self.ends
+
+    @property
+    def masks(self) -> np.ndarray:
+        """Dense ``(N, 90, 90)`` legal move masks indexed by board, start square and end square"""
+        masks = np.zeros((self.boardCount, SQUARE_COUNT, SQUARE_COUNT), dtype=bool)
+        masks[self.boardIndices, self.starts, self.ends] = True
+        return masks
+
+
+def _candidateTables() -> Tuple[np.ndarray, ...]:
+    # NOTE: Every move a piece could make on an empty board, with the squares that must be empty (or hold one screen for cannons)
+    starts: List[int] = []
+    ends: List[int] = []
+    codes: List[int] = []
+    kinds: List[int] = []
+    betweens: List[Tuple[int, ...]] = []
+
+    def add(piece: type, side: Side, start: int, end: int, kind: int = _NORMAL, between: Tuple[int, ...] = ()) -> None:
+        starts.append(start)
+        ends.append(end)
+        codes.append(PIECE_TO_CODE[piece] * side)
+        kinds.append(kind)
+        betweens.append(between + (OFF_BOARD,) * (_MAX_BETWEEN - len(between)))
+
+    for side in Side:
+        for start in range(SQUARE_COUNT):
+            for end in GENERAL_MOVES[side][start]:
+                add(General, side, start, end)
+            if PALACE[side][start]:
+                for end in FORWARD_RAYS[side][start]:
+                    add(General, side, start, end, _FLYING, BETWEEN[start][end])
+            for end in ADVISOR_MOVES[side][start]:
+                add(Advisor, side, start, end)
+            for end, eye in ELEPHANT_MOVES[side][start]:
+                add(Elephant, side, start, end, between=(eye,))
+            for end, leg in HORSE_MOVES[side][start]:
+                add(Horse, side, start, end, between=(leg,))
+            for end in SOLDIER_MOVES[side][start]:
+                add(Soldier, side, start, end)
+            for ray in RAYS[start]:
+                for end in ray:
+                    add(Chariot, side, start, end, between=BETWEEN[start][end])
+                    add(Cannon, side, start, end, _CANNON, BETWEEN[start][end])
+
+    # NOTE: Tables of candidate indices are padded with -1, code tables are indexed with code + SHIFT
+    codeShift = max(abs(code) for code in codes)
+    fromTable: List[List[List[int]]] = [[[] for _ in range(SQUARE_COUNT)] for _ in range(2 * codeShift + 1)]
+    toTable: List[List[List[int]]] = [[[] for _ in range(SQUARE_COUNT)] for _ in range(2)]
+    for candidate, (start, end, code) in enumerate(zip(starts, ends, codes)):
+        fromTable[code + codeShift][start].append(candidate)
+        toTable[_sideIndex(code)][end].append(candidate)
+
+    return (
+        np.array(starts, dtype=np.intp), np.array(ends, dtype=np.intp), np.array(codes, dtype=np.int8), np.array(kinds, dtype=np.int8),
+        np.array(betweens, dtype=np.intp), _padded(fromTable), _padded(toTable)
+    )
+
+
+def _sideIndex(code: int) -> int:
+    return 0 if code > 0 else 1
+
+
+def _padded(table: List[List[List[int]]]) -> np.ndarray:
+    width = max(len(candidates) for row in table for candidates in row)
+    padded = np.full((len(table), SQUARE_COUNT, width), -1, dtype=np.intp)
+    for index, row in enumerate(table):
+        for square, candidates in enumerate(row):
+            padded[index, square, :len(candidates)] = candidates
+    return padded
+
+
+_STARTS, _ENDS, _CODES, _KINDS, _BETWEENS, _CANDIDATES_FROM, _CANDIDATES_TO = _candidateTables()
+_CODE_SHIFT = len(_CANDIDATES_FROM) // 2
+
+
+def generateBatchMoves(boards: np.ndarray, sides: np.ndarray, chunkSize: int = DEFAULT_CHUNK_SIZE) -> BatchMoves:
+    """Generate legal moves and detect checks on a batch of boards with the rules of :class:`~aiBoardGame.logic.engine.XiangqiEngine`
+
+    :param boards: ``(N, 10, 9)`` array of piece codes indexed by rank and file, see :func:`boardsToArray`
+    :type boards: np.ndarray
+    :param sides: ``(N,)`` array of the side to move on each board, 1 for red and -1 for black
+    :type sides: np.ndarray
+    :param chunkSize: Number of boards processed together, defaults to DEFAULT_CHUNK_SIZE
+    :type chunkSize: int, optional
+    :raises ValueError: Boards or sides have the wrong shape
+    :raises ValueError: A side is not 1 or -1
+    :raises ValueError: A board does not have exactly one general for each side
+    :raises ValueError: Chunk size is less than 1
+    :return: Legal moves and check flags of every board
+    :rtype: BatchMoves
+    """
+    if chunkSize < 1:
+        raise ValueError(f"Chunk size must be at least 1, was {chunkSize}")
+    squares, sides = _toSquares(boards, sides)
+    if not (np.all(np.count_nonzero(squares == _GENERAL, axis=1) == 1) and np.all(np.count_nonzero(squares == -_GENERAL, axis=1) == 1)):
+        raise ValueError("Every board must have exactly one general for each side")
+
+    chunks = [_generateChunk(squares[index:index + chunkSize], sides[index:index + chunkSize], index) for index in range(0, len(boards), chunkSize)]
+    if len(chunks) == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return BatchMoves(empty, empty, empty, np.zeros(0, dtype=bool))
+    return BatchMoves(*(np.concatenate(parts) for parts in zip(*chunks)))
+
+
+def generatePseudoLegalMoves(boards: np.ndarray, sides: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Generate moves of a side on a batch of boards without checking whether they leave the general attacked,
+    the equivalent of :meth:`~aiBoardGame.logic.engine.pieces.Piece.getPossibleMoves` for every piece of the side
+
+    :param boards: ``(N, 10, 9)`` array of piece codes indexed by rank and file, see :func:`boardsToArray`
+    :type boards: np.ndarray
+    :param sides: ``(N,)`` array of the side to generate moves for on each board, 1 for red and -1 for black
+    :type sides: np.ndarray
+    :raises ValueError: Boards or sides have the wrong shape
+    :raises ValueError: A side is not 1 or -1
+    :return: Board index, start square index and end square index of each move, ordered by board
+    :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    squares, sides = _toSquares(boards, sides)
+    boardIndices, candidates = _pseudoLegalCandidates(squares, sides)
+    return boardIndices, _STARTS[candidates], _ENDS[candidates]
+
+
+def detectChecks(boards: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    """Detect whether the general of a side is attacked on a batch of boards, without generating moves
+
+    :param boards: ``(N, 10, 9)`` array of piece codes indexed by rank and file, every board must have both generals
+    :type boards: np.ndarray
+    :param sides: ``(N,)`` array of the side whose general is tested on each board, 1 for red and -1 for black
+    :type sides: np.ndarray
+    :raises ValueError: Boards or sides have the wrong shape
+    :raises ValueError: A side is not 1 or -1
+    :return: ``(N,)`` bool array, True where the general is attacked
+    :rtype: np.ndarray
+    """
+    return _isGeneralAttacked(*_toSquares(boards, sides))
+
+
+def boardsToArray(boards: Iterable[Board]) -> np.ndarray:
+    """Convert boards to a batch of piece codes
+
+    :param boards: Boards to convert, :class:`CompactBoard` objects are copied without allocating board entities
+    :type boards: Iterable[Board]
+    :return: ``(N, 10, 9)`` int8 array of piece codes
+    :rtype: np.ndarray
+    """
+    arrays = []
+    for board in boards:
+        if isinstance(board, CompactBoard):
+            array = np.frombuffer(board.squares, dtype=np.int8, count=SQUARE_COUNT).copy()
+        else:
+            array = np.zeros(SQUARE_COUNT, dtype=np.int8)
+            for position, boardEntity in board.pieces:
+                array[position.rank * FILE_COUNT + position.file] = ENTITY_TO_CODE[boardEntity]
+        arrays.append(array.reshape(BOARD_SHAPE))
+    return np.stack(arrays) if len(arrays) > 0 else np.zeros((0, *BOARD_SHAPE), dtype=np.int8)
+
+
+def fensToArrays(fens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert FENs to a batch of boards and sides to move
+
+    :param fens: Game FENs or board FENs, red moves first if side is not given
+    :type fens: Sequence[str]
+    :raises ValueError: Invalid FEN
+    :return: ``(N, 10, 9)`` array of piece codes and ``(N,)`` array of sides to move
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    sides = np.array([Side.BLACK if len(fen.split(" ")) > 1 and fen.split(" ")[1] == Side.BLACK.fen else Side.RED for fen in fens], dtype=np.int8)
+    return boardsToArray(fenToBoard(fen, CompactBoard) for fen in fens), sides
+
+
+def _toSquares(boards: np.ndarray, sides: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    boards = np.asarray(boards, dtype=np.int8)
+    sides = np.asarray(sides, dtype=np.int8)
+    if boards.ndim != 3 or boards.shape[1:] != BOARD_SHAPE:
+        raise ValueError(f"Boards must have shape (N, {RANK_COUNT}, {FILE_COUNT}), was {boards.shape}")
+    if sides.shape != boards.shape[:1]:
+        raise ValueError(f"Sides must have shape ({len(boards)},), was {sides.shape}")
+    if not np.all(np.abs(sides) == 1):
+        raise ValueError("Sides must be 1 for red or -1 for black")
+    # NOTE: Boards are flattened to square indices with an always empty OFF_BOARD column, which pads the candidate tables
+    squares = np.zeros((len(boards), SQUARE_COUNT + 1), dtype=np.int8)
+    squares[:, :SQUARE_COUNT] = boards.reshape(len(boards), SQUARE_COUNT)
+    return squares, sides
+
+
+def _pseudoLegalCandidates(squares: np.ndarray, sides: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    pieceBoards, pieceSquares = np.nonzero(squares[:, :SQUARE_COUNT] * sides[:, None] > 0)
+    candidates = _CANDIDATES_FROM[squares[pieceBoards, pieceSquares] + _CODE_SHIFT, pieceSquares]
+    candidateBoards = np.broadcast_to(pieceBoards[:, None], candidates.shape)[candidates >= 0]
+    candidates = candidates[candidates >= 0]
+    isPseudoLegal = _isSatisfied(squares, candidateBoards, candidates)
+    return candidateBoards[isPseudoLegal], candidates[isPseudoLegal]
+
+
+def _generateChunk(squares: np.ndarray, sides: np.ndarray, offset: int) -> Tuple[np.ndarray, ...]:
+    # NOTE: Pseudo-legal candidates come from the pieces of the side to move, then each is made on a copy and tested for check
+    candidateBoards, candidates = _pseudoLegalCandidates(squares, sides)
+    starts, ends = _STARTS[candidates], _ENDS[candidates]
+    madeSquares = squares[candidateBoards]
+    rows = np.arange(len(candidates))
+    madeSquares[rows, ends] = madeSquares[rows, starts]
+    madeSquares[rows, starts] = 0
+    isLegal = ~_isGeneralAttacked(madeSquares, sides[candidateBoards])
+    return candidateBoards[isLegal] + offset, starts[isLegal], ends[isLegal], _isGeneralAttacked(squares, sides)
+
+
+def _isSatisfied(squares: np.ndarray, boardIndices: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    # NOTE: Assumes the start square holds the candidate's piece
+    sides = np.sign(_CODES[candidates])
+    blockers = np.count_nonzero(squares[boardIndices[..., None], _BETWEENS[candidates]], axis=-1)
+    endCodes = squares[boardIndices, _ENDS[candidates]] * sides
+    kinds = _KINDS[candidates]
+    isNormal = (blockers == 0) & (endCodes <= 0)
+    isCannon = ((blockers == 0) & (endCodes == 0)) | ((blockers == 1) & (endCodes < 0))
+    isFlying = (blockers == 0) & (endCodes == -_GENERAL)
+    return np.where(kinds == _NORMAL, isNormal, np.where(kinds == _CANNON, isCannon, isFlying))
+
+
+def _isGeneralAttacked(squares: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    # NOTE: A general is attacked if any pseudo-legal move of the opponent ends on it
+    generals = np.argmax(squares == (sides * _GENERAL)[:, None], axis=1)
+    candidates = _CANDIDATES_TO[(1 + sides) // 2, generals]
+    boardIndices = np.broadcast_to(np.arange(len(squares))[:, None], candidates.shape)
+    isOccupied = squares[boardIndices, _STARTS[candidates]] == _CODES[candidates]
+    isOccupied &= candidates >= 0
+    boardIndices, candidates = boardIndices[isOccupied], candidates[isOccupied]
+    isAttacked = np.zeros(len(squares), dtype=bool)
+    isAttacked[boardIndices[_isSatisfied(squares, boardIndices, candidates)]] = True
+    return isAttacked
@@ -0,0 +1,86 @@
+"""Fixed size binary encoding of boards: one signed piece code per square in square index order, see
+:data:`~aiBoardGame.logic.engine.compactBoard.PIECE_TO_CODE`. Pickle and copy use the encoding for boards,
+so boards sent between threads and processes do not carry their side state dictionaries"""
+
+from __future__ import annotations
+
+import copyreg
+from array import array
+from typing import Type, Union
+
+import numpy as np
+
+from aiBoardGame.logic.engine.auxiliary import Board, Side
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, PIECE_TO_CODE, decodeSquares
+from aiBoardGame.logic.engine.tables import SQUARE_COUNT
+
+
+BOARD_SIZE = SQUARE_COUNT
+"""Number of bytes of an encoded board"""
+
+# NOTE: EMPTY is 0, so an empty board is all zero bytes
+_EMPTY_SQUARES = bytes(BOARD_SIZE)
+_SIDE_CODES = {side: {piece: code * side for piece, code in PIECE_TO_CODE.items()} for side in Side}
+
+
+def boardToBytes(board: Board) -> bytes:
+    """Encode a board
+
+    :param board: Board to encode
+    :type board: Board
+    :return: Signed piece code of every square
+    :rtype: bytes
+    """
+    if isinstance(board, CompactBoard):
+        return board.squares.tobytes()[:SQUARE_COUNT]
+    codes = array("b", _EMPTY_SQUARES)
+    fileCount = Board.fileCount
+    for side, sideState in board.items():
+        codeOf = _SIDE_CODES[side]
+        for position, piece in sideState.items():
+            codes[position.rank * fileCount + position.file] = codeOf[piece]
+    return codes.tobytes()
+
+
+def boardFromBytes(data: Union[bytes, bytearray, memoryview], boardType: Type[Board] = Board) -> Board:
+    """Decode a board encoded with :func:`boardToBytes`
+
+    :param data: Encoded board
+    :type data: Union[bytes, bytearray, memoryview]
+    :param boardType: Board class to create, defaults to Board
+    :type boardType: Type[Board], optional
+    :raises ValueError: Data is not BOARD_SIZE long or holds an invalid piece code
+    :return: New board with the encoded pieces
+    :rtype: Board
+    """
+    if len(data) != BOARD_SIZE:
+        raise ValueError(f"Encoded board must be {BOARD_SIZE} bytes long, was {len(data)}")
+    if issubclass(boardType, CompactBoard):
+        return boardType.fromSquares(data)
+    board = boardType()
+    decodeSquares(data, board[Side.RED], board[Side.BLACK])
+    return board
+
+
+def squaresView(source: Union[bytes, bytearray, memoryview, CompactBoard]) -> np.ndarray:
+    """Create a read-only NumPy view of the piece codes of an encoded or compact board without copying them.
+    The view of a compact board follows its moves
+
+    :param source: Board encoded with :func:`boardToBytes`, or a compact board
+    :type source: Union[bytes, bytearray, memoryview, CompactBoard]
+    :raises ValueError: Encoded board is shorter than BOARD_SIZE
+    :return: Signed piece codes indexed by rank and file
+    :rtype: np.ndarray
+    """
+    buffer = source.squares if isinstance(source, CompactBoard) else source
+    view = np.frombuffer(buffer, dtype=np.int8, count=SQUARE_COUNT).reshape(Board.rankCount, Board.fileCount)
+    view.flags.writeable = False
+    return view
+
+
+def _reduceBoard(board: Board) -> tuple:
+    return (boardFromBytes, (boardToBytes(board), type(board)))
+
+
+for _boardType in (Board, CompactBoard):
+    copyreg.pickle(_boardType, _reduceBoard)
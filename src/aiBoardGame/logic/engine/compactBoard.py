@@ -0,0 +1,373 @@
+"""Array-backed board representation"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, overload
+
+from aiBoardGame.logic.engine.auxiliary import Board, BoardEntity, Position, Side, SideState
+from aiBoardGame.logic.engine.pieces import PIECE_SET, Piece, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.tables import SQUARE_COUNT, OFF_BOARD, POSITIONS, GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_MOVES, HORSE_MOVES, SOLDIER_MOVES, RAYS, FORWARD_RAYS, squareIndex
+
+
+EMPTY = 0
+"""Code of an empty square"""
+SENTINEL = len(PIECE_SET) + 1
+"""Code of the sentinel square"""
+
+PIECE_TO_CODE: Dict[Type[Piece], int] = {piece: code for code, piece in enumerate(PIECE_SET, start=1)}
+"""Piece codes, a square holds the code multiplied by the side of the piece"""
+CODE_TO_PIECE: Dict[int, Type[Piece]] = {code: piece for piece, code in PIECE_TO_CODE.items()}
+"""Piece for each piece code"""
+
+
+def _codeTable(valueOf: Callable[[int], Any]) -> Tuple[Any, ...]:
+    # NOTE: Negative codes index the table from the end, so table[code] works for both sides
+    table: List[Any] = [None] * (2 * SENTINEL)
+    for code in range(1 - SENTINEL, SENTINEL + 1):
+        table[code] = valueOf(code)
+    return tuple(table)
+
+
+def _isPiece(code: int) -> bool:
+    return code != EMPTY and code != SENTINEL
+
+
+CODE_TO_ENTITY: Tuple[Optional[BoardEntity], ...] = _codeTable(lambda code: BoardEntity(Side(1 if code > 0 else -1), CODE_TO_PIECE[abs(code)]) if _isPiece(code) else None)
+"""Board entity for each signed piece code, None for :data:`EMPTY` and :data:`SENTINEL`"""
+ENTITY_TO_CODE: Dict[BoardEntity, int] = {CODE_TO_ENTITY[code]: code for code in range(1 - SENTINEL, SENTINEL) if _isPiece(code)}
+"""Signed piece code for each board entity"""
+FEN_TO_CODE: Dict[str, int] = {
+    **{piece.abbreviations["fen"]: code for piece, code in PIECE_TO_CODE.items()},
+    **{piece.abbreviations["fen"].lower(): -code for piece, code in PIECE_TO_CODE.items()}
+}
+"""Signed piece code for each FEN letter, red letters are uppercase"""
+
+_PIECES = _codeTable(lambda code: CODE_TO_PIECE[abs(code)] if _isPiece(code) else None)
+_SIDE_PIECES = {side: _codeTable(lambda code, side=side: CODE_TO_PIECE[abs(code)] if _isPiece(code) and code * side > 0 else None) for side in Side}
+
+_GENERAL = PIECE_TO_CODE[General]
+_ADVISOR = PIECE_TO_CODE[Advisor]
+_ELEPHANT = PIECE_TO_CODE[Elephant]
+_HORSE = PIECE_TO_CODE[Horse]
+_CHARIOT = PIECE_TO_CODE[Chariot]
+_CANNON = PIECE_TO_CODE[Cannon]
+_SOLDIER = PIECE_TO_CODE[Soldier]
+
+
+class CompactSideState(SideState):
+    """Side state that writes through to the square array of its :class:`CompactBoard`"""
+    def __init__(self, board: CompactBoard, side: Side) -> None:
+        super().__init__()
+        self._board = board
+        self._side = side
+
+    def __getitem__(self, key: Union[Position, Tuple[int, int]]) -> Optional[Type[Piece]]:
+        return _SIDE_PIECES[self._side][self._board.squares[squareIndex(key)]]
+
+    def __setitem__(self, key: Union[Position, Tuple[int, int]], value: Optional[Type[Piece]]) -> None:
+        if isinstance(value, BoardEntity):
+            raise TypeError(f"Cannot assign {value.__class__.__name__} to {self.__class__.__name__} because object is not {value.side.__class__.__name__} aware")
+        if not isinstance(key, Position):
+            key = Position(*key)
+        if value is None:
+            if key in self:
+                del self[key]
+        else:
+            square = squareIndex(key)
+            if square == OFF_BOARD:
+                raise KeyError(f"Position {*key,} is out of bounds")
+            opponentState = dict.__getitem__(self._board, self._side.opponent)
+            if key in opponentState:
+                dict.__delitem__(opponentState, key)
+            dict.__setitem__(self, key, value)
+            self._board.squares[square] = PIECE_TO_CODE[value] * self._side
+
+    def __delitem__(self, key: Position) -> None:
+        dict.__delitem__(self, key)
+        self._board.squares[squareIndex(key)] = EMPTY
+
+    def pop(self, key: Position, *default: Optional[Type[Piece]]) -> Optional[Type[Piece]]:
+        if key in self:
+            value = dict.__getitem__(self, key)
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def clear(self) -> None:
+        for key in list(self):
+            del self[key]
+
+    def __reduce__(self) -> tuple:
+        return (SideState, (dict(self),))
+
+
+@dataclass(init=False, eq=False)
+class CompactBoard(Board):
+    """Board backed by a flat array of piece codes with a sentinel square after the last square.
+    Side states are kept in sync with the array, so it can be used anywhere a :class:`Board` is used"""
+    squares: array
+    """Piece code for each square, index :data:`OFF_BOARD` holds :data:`SENTINEL`"""
+
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        self.squares = array("b", [EMPTY] * SQUARE_COUNT + [SENTINEL])
+        dict.update(self, {side: CompactSideState(self, side) for side in Side})
+        # NOTE: Indexed by the sign of a piece code, index -1 is black
+        self._sideStates = (None, dict.__getitem__(self, Side.RED), dict.__getitem__(self, Side.BLACK))
+
+    @classmethod
+    def fromBoard(cls, board: Board) -> CompactBoard:
+        """Create compact board from any board
+
+        :param board: Board to copy
+        :type board: Board
+        :return: Compact board with the same pieces
+        :rtype: CompactBoard
+        """
+        compactBoard = cls()
+        for position, boardEntity in board.pieces:
+            compactBoard[position] = boardEntity
+        return compactBoard
+
+    @classmethod
+    def fromSquares(cls, squares: bytes) -> CompactBoard:
+        """Create compact board from signed piece codes, like the ones of :attr:`squares`
+
+        :param squares: Signed piece code of every square indexed by square index, only the first :data:`SQUARE_COUNT` are read
+        :type squares: bytes
+        :raises ValueError: A square holds an invalid piece code
+        :return: Compact board with the encoded pieces
+        :rtype: CompactBoard
+        """
+        board = cls()
+        board.squares[:SQUARE_COUNT] = decodeSquares(squares, dict.__getitem__(board, Side.RED), dict.__getitem__(board, Side.BLACK))
+        return board
+
+    @overload
+    def __getitem__(self, key: Union[Position, Tuple[int, int]]) -> Optional[BoardEntity]:
+        ...
+
+    @overload
+    def __getitem__(self, key: Side) -> CompactSideState:
+        ...
+
+    def __getitem__(self, key: Union[Position, Tuple[int, int], Side]) -> Optional[Union[BoardEntity, CompactSideState]]:
+        if isinstance(key, tuple):
+            return CODE_TO_ENTITY[self.squares[squareIndex(key)]]
+        elif isinstance(key, Side):
+            return dict.__getitem__(self, key)
+        else:
+            raise TypeError(f"Key has invalid type {key.__class__.__name__}")
+
+    def __setitem__(self, key: Union[Position, Tuple[int, int]], value: Optional[BoardEntity]) -> None:
+        if not isinstance(key, tuple):
+            raise TypeError(f"Invalid key type, must be Positon or Tuple[int, int] was {type(key)}")
+        if isinstance(value, BoardEntity):
+            self[value.side][key] = value.piece
+        elif value is None:
+            for side in Side:
+                self[side][key] = None
+        else:
+            raise TypeError(f"Invalid value type, must be BoardEntity or None, was {type(value)}")
+
+    def __reduce__(self) -> tuple:
+        return (self.__class__.fromSquares, (self.squares.tobytes(),))
+
+    def movePiece(self, start: int, end: int) -> int:
+        """Move a piece between squares without validation or allocating board entities
+
+        :param start: Square index of the moved piece
+        :type start: int
+        :param end: Square index to move to
+        :type end: int
+        :return: Code of the captured piece, :data:`EMPTY` if nothing was captured
+        :rtype: int
+        """
+        squares = self.squares
+        movedCode, capturedCode = squares[start], squares[end]
+        sign = 1 if movedCode > 0 else -1
+        endPosition = POSITIONS[end]
+        ownState = self._sideStates[sign]
+        if capturedCode != EMPTY:
+            dict.__delitem__(self._sideStates[-sign], endPosition)
+        dict.__setitem__(ownState, endPosition, dict.pop(ownState, POSITIONS[start]))
+        squares[start], squares[end] = EMPTY, movedCode
+        return capturedCode
+
+    def unmovePiece(self, start: int, end: int, capturedCode: int) -> None:
+        """Take back a move made by :meth:`movePiece`
+
+        :param start: Square index the piece was moved from
+        :type start: int
+        :param end: Square index the piece was moved to
+        :type end: int
+        :param capturedCode: Code returned by :meth:`movePiece`
+        :type capturedCode: int
+        """
+        squares = self.squares
+        movedCode = squares[end]
+        sign = 1 if movedCode > 0 else -1
+        endPosition = POSITIONS[end]
+        ownState = self._sideStates[sign]
+        dict.__setitem__(ownState, POSITIONS[start], dict.pop(ownState, endPosition))
+        if capturedCode != EMPTY:
+            dict.__setitem__(self._sideStates[-sign], endPosition, _PIECES[capturedCode])
+        squares[start], squares[end] = movedCode, capturedCode
+
+    def getPossibleMoves(self, start: Position) -> List[Position]:
+        """Generate possible moves of the piece on given position, equivalent to :meth:`~Piece.getPossibleMoves`
+
+        :param start: Start position to generate moves from
+        :type start: Position
+        :return: Possible moves
+        :rtype: List[Position]
+        """
+        return [POSITIONS[end] for end in self.getPossibleEnds(squareIndex(start))]
+
+    def getPossibleEnds(self, start: int) -> List[int]:
+        """Generate possible moves of the piece on given square
+
+        :param start: Square index to generate moves from
+        :type start: int
+        :return: Square indices of possible moves
+        :rtype: List[int]
+        """
+        code = self.squares[start]
+        if not _isPiece(code):
+            return []
+        return _generateEnds(self.squares, start, Side.RED if code > 0 else Side.BLACK)
+
+    def getAllPossibleMoves(self, side: Side) -> Dict[Position, List[Position]]:
+        """Generate possible moves of every piece of a side, equivalent to calling
+        :meth:`~Piece.getPossibleMoves` for each of them
+
+        :param side: Side to generate moves for
+        :type side: Side
+        :return: Possible moves for each piece that can move
+        :rtype: Dict[Position, List[Position]]
+        """
+        return {POSITIONS[start]: [POSITIONS[end] for end in ends] for start, ends in self.getAllPossibleEnds(side).items()}
+
+    def getAllPossibleEnds(self, side: Side) -> Dict[int, List[int]]:
+        """Generate possible moves of every piece of a side on square indices
+
+        :param side: Side to generate moves for
+        :type side: Side
+        :return: Square indices of possible moves for the square of each piece that can move
+        :rtype: Dict[int, List[int]]
+        """
+        squares = self.squares
+        fileCount = Board.fileCount
+        allPossibleEnds = {}
+        for start in dict.__getitem__(self, side):
+            square = start.rank * fileCount + start.file
+            ends = _generateEnds(squares, square, side)
+            if len(ends) > 0:
+                allPossibleEnds[square] = ends
+        return allPossibleEnds
+
+
+def fenToSquares(fen: str) -> array:
+    """Parse the board of a FEN directly into signed piece codes, without creating a board
+
+    :param fen: Game FEN or board FEN
+    :type fen: str
+    :raises ValueError: Invalid board FEN
+    :return: Signed piece code of every square indexed by square index, followed by :data:`SENTINEL`
+    :rtype: array
+    """
+    rankFens = fen.split(" ", 1)[0].split("/")
+    if len(rankFens) != Board.rankCount:
+        raise ValueError(f"Invalid board FEN {fen}")
+    squares = array("b", [EMPTY] * SQUARE_COUNT + [SENTINEL])
+    for rank, rankFen in enumerate(reversed(rankFens)):
+        file = 0
+        for char in rankFen:
+            if char.isdigit():
+                file += int(char)
+            elif char in FEN_TO_CODE and file < Board.fileCount:
+                squares[rank * Board.fileCount + file] = FEN_TO_CODE[char]
+                file += 1
+            else:
+                raise ValueError(f"Invalid board FEN {fen}")
+        if file != Board.fileCount:
+            raise ValueError(f"Invalid board FEN {fen}")
+    return squares
+
+
+def _generateEnds(squares: array, square: int, side: Side) -> List[int]:  # pylint: disable=too-many-branches
+    code = squares[square] * side
+    if code == _CHARIOT:
+        ends = []
+        for ray in RAYS[square]:
+            for end in ray:
+                endCode = squares[end]
+                if endCode != EMPTY:
+                    if endCode * side < 0:
+                        ends.append(end)
+                    break
+                ends.append(end)
+        return ends
+    elif code == _CANNON:
+        ends = []
+        for ray in RAYS[square]:
+            hasFoundPiece = False
+            for end in ray:
+                endCode = squares[end]
+                if endCode == EMPTY:
+                    if not hasFoundPiece:
+                        ends.append(end)
+                elif hasFoundPiece:
+                    if endCode * side < 0:
+                        ends.append(end)
+                    break
+                else:
+                    hasFoundPiece = True
+        return ends
+    elif code == _HORSE:
+        return [end for end, leg in HORSE_MOVES[side][square] if squares[leg] == EMPTY and squares[end] * side <= 0]
+    elif code == _ELEPHANT:
+        return [end for end, eye in ELEPHANT_MOVES[side][square] if squares[eye] == EMPTY and squares[end] * side <= 0]
+    elif code == _SOLDIER:
+        return [end for end in SOLDIER_MOVES[side][square] if squares[end] * side <= 0]
+    elif code == _ADVISOR:
+        return [end for end in ADVISOR_MOVES[side][square] if squares[end] * side <= 0]
+    elif code == _GENERAL:
+        ends = [end for end in GENERAL_MOVES[side][square] if squares[end] * side <= 0]
+        for end in FORWARD_RAYS[side][square]:
+            endCode = squares[end]
+            if endCode != EMPTY:
+                if endCode == -_GENERAL * side:  # NOTE: Flying general
+                    ends.append(end)
+                break
+        return ends
+    return []
+
+
+def decodeSquares(squares: bytes, redState: SideState, blackState: SideState) -> array:
+    """Decode signed piece codes into the side states of a board
+
+    :param squares: Signed piece code of every square indexed by square index, only the first :data:`SQUARE_COUNT` are read
+    :type squares: bytes
+    :param redState: Empty side state of red to fill
+    :type redState: SideState
+    :param blackState: Empty side state of black to fill
+    :type blackState: SideState
+    :raises ValueError: A square holds an invalid piece code
+    :return: Piece codes of the squares
+    :rtype: array
+    """
+    codes = array("b")
+    codes.frombytes(squares[:SQUARE_COUNT])
+    setItem = dict.__setitem__
+    for position, code in zip(POSITIONS, codes):
+        if code != EMPTY:
+            # NOTE: Side states are filled directly, the positions are distinct and the pieces come from the code table
+            if 0 < code < SENTINEL:
+                setItem(redState, position, _PIECES[code])
+            elif -SENTINEL < code < 0:
+                setItem(blackState, position, _PIECES[code])
+            else:
+                raise ValueError(f"Invalid piece code {code} on {*position,}")
+    return codes
@@ -0,0 +1,222 @@
+"""Static evaluation of positions from red's view: material, piece-square tables, mobility and general safety.
+Material and piece-square scores are kept incrementally by :class:`~aiBoardGame.logic.engine.XiangqiEngine` with the per-square tables"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple, Type
+
+import numpy as np
+
+from aiBoardGame.logic.engine.auxiliary import Board, Side
+from aiBoardGame.logic.engine.batchMoves import generatePseudoLegalMoves
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, ENTITY_TO_CODE, SENTINEL
+from aiBoardGame.logic.engine.pieces import Piece, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.tables import FILE_COUNT, RANK_COUNT, SQUARE_COUNT, PALACE
+
+
+PIECE_VALUES: Dict[Type[Piece], int] = {
+    General: 0,
+    Advisor: 200,
+    Elephant: 200,
+    Horse: 400,
+    Chariot: 900,
+    Cannon: 450,
+    Soldier: 100
+}
+"""Material value of each piece"""
+
+PIECE_SQUARE_TABLES: Dict[Type[Piece], Tuple[Tuple[int, ...], ...]] = {
+    General: (
+        (0, 0, 0, 2, 4, 2, 0, 0, 0),
+        (0, 0, 0, -6, -6, -6, 0, 0, 0),
+        (0, 0, 0, -12, -12, -12, 0, 0, 0),
+    ) + ((0,) * FILE_COUNT,) * 7,
+    Advisor: (
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 4, 0, 0, 0, 0),
+    ) + ((0,) * FILE_COUNT,) * 8,
+    Elephant: (
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (-2, 0, 0, 0, 4, 0, 0, 0, -2),
+    ) + ((0,) * FILE_COUNT,) * 7,
+    Horse: (
+        (0, -4, 0, 0, 0, 0, 0, -4, 0),
+        (0, 2, 4, 4, -2, 4, 4, 2, 0),
+        (4, 2, 8, 8, 4, 8, 8, 2, 4),
+        (2, 6, 8, 6, 10, 6, 8, 6, 2),
+        (4, 12, 16, 14, 12, 14, 16, 12, 4),
+        (6, 16, 14, 18, 16, 18, 14, 16, 6),
+        (8, 24, 18, 24, 20, 24, 18, 24, 8),
+        (12, 14, 16, 20, 18, 20, 16, 14, 12),
+        (4, 10, 28, 16, 8, 16, 28, 10, 4),
+        (4, 8, 16, 12, 4, 12, 16, 8, 4)
+    ),
+    Chariot: (
+        (-2, 10, 6, 14, 12, 14, 6, 10, -2),
+        (8, 4, 8, 16, 8, 16, 8, 4, 8),
+        (4, 8, 6, 14, 12, 14, 6, 8, 4),
+        (6, 10, 8, 14, 14, 14, 8, 10, 6),
+        (12, 16, 14, 20, 20, 20, 14, 16, 12),
+        (12, 14, 12, 18, 18, 18, 12, 14, 12),
+        (12, 18, 16, 22, 22, 22, 16, 18, 12),
+        (12, 12, 12, 18, 18, 18, 12, 12, 12),
+        (16, 20, 18, 24, 26, 24, 18, 20, 16),
+        (14, 14, 12, 18, 16, 18, 12, 14, 14)
+    ),
+    Cannon: (
+        (0, 0, 2, 6, 6, 6, 2, 0, 0),
+        (0, 2, 4, 6, 6, 6, 4, 2, 0),
+        (4, 0, 8, 6, 10, 6, 8, 0, 4),
+        (0, 0, 0, 2, 4, 2, 0, 0, 0),
+        (-2, 0, 4, 2, 6, 2, 4, 0, -2),
+        (0, 0, 0, 2, 8, 2, 0, 0, 0),
+        (0, 0, -2, 4, 10, 4, -2, 0, 0),
+        (2, 2, 0, -10, -8, -10, 0, 2, 2),
+        (2, 2, 0, -4, -14, -4, 0, 2, 2),
+        (6, 4, 0, -10, -12, -10, 0, 4, 6)
+    ),
+    Soldier: (
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, -2, 0, 4, 0, -2, 0, 0),
+        (2, 0, 8, 0, 8, 0, 8, 0, 2),
+        (6, 12, 18, 18, 20, 18, 18, 12, 6),
+        (10, 20, 30, 34, 40, 34, 30, 20, 10),
+        (14, 26, 42, 60, 80, 60, 42, 26, 14),
+        (18, 36, 56, 80, 120, 80, 56, 36, 18),
+        (0, 3, 6, 9, 12, 9, 6, 3, 0)
+    )
+}
+"""Placement bonus of each piece indexed by rank and file from red's view, black's tables are mirrored"""
+
+MOBILITY_WEIGHT = 2
+"""Score of each possible move"""
+PALACE_PRESSURE_WEIGHT = 6
+"""Penalty of each possible move of the opponent into a side's palace"""
+
+
+def _scoreTable(valueOf: Callable[[Type[Piece], int, int], int]) -> Tuple[Tuple[int, ...], ...]:
+    # NOTE: Negative codes index the table from the end, like the code tables of compactBoard
+    table = [(0,) * (SQUARE_COUNT + 1)] * (2 * SENTINEL)
+    for boardEntity, code in ENTITY_TO_CODE.items():
+        scores = []
+        for square in range(SQUARE_COUNT):
+            rank, file = divmod(square, FILE_COUNT)
+            relativeRank = rank if boardEntity.side == Side.RED else RANK_COUNT - rank - 1
+            scores.append(valueOf(boardEntity.piece, relativeRank, file) * boardEntity.side)
+        table[code] = tuple(scores) + (0,)
+    return tuple(table)
+
+
+MATERIAL_SCORES: Tuple[Tuple[int, ...], ...] = _scoreTable(lambda piece, relativeRank, file: PIECE_VALUES[piece])
+"""Material score from red's view of each signed piece code on each square"""
+PLACEMENT_SCORES: Tuple[Tuple[int, ...], ...] = _scoreTable(lambda piece, relativeRank, file: PIECE_SQUARE_TABLES[piece][relativeRank][file])
+"""Piece-square score from red's view of each signed piece code on each square"""
+SQUARE_SCORES: Tuple[Tuple[int, ...], ...] = tuple(tuple(map(sum, zip(material, placement))) for material, placement in zip(MATERIAL_SCORES, PLACEMENT_SCORES))
+"""Sum of material and piece-square score from red's view of each signed piece code on each square"""
+
+_MATERIAL_ARRAY = np.array(MATERIAL_SCORES, dtype=np.int32)
+_SCORE_ARRAY = np.array(SQUARE_SCORES, dtype=np.int32)
+_RED_PALACE = np.array(PALACE[Side.RED], dtype=bool)
+_BLACK_PALACE = np.array(PALACE[Side.BLACK], dtype=bool)
+
+
+@dataclass(frozen=True)
+class Evaluation:
+    """Terms of a static evaluation, each from red's view"""
+    material: int
+    """Difference of material values"""
+    placement: int
+    """Difference of piece-square table bonuses"""
+    mobility: int
+    """Difference of the number of possible moves, weighted with :data:`MOBILITY_WEIGHT`"""
+    generalSafety: int
+    """Difference of the number of the opponent's possible moves into the own palace, weighted with :data:`PALACE_PRESSURE_WEIGHT`"""
+
+    @property
+    def score(self) -> int:
+        """Sum of the terms, positive values favour red"""
+        return self.material + self.placement + self.mobility + self.generalSafety
+
+
+def staticScores(board: Board) -> Tuple[int, int]:
+    """Calculate the material and piece-square scores, the terms an engine keeps incrementally
+
+    :param board: Board to score
+    :type board: Board
+    :return: Material and piece-square score from red's view
+    :rtype: Tuple[int, int]
+    """
+    material, placement = 0, 0
+    for square, code in _pieceCodes(board):
+        material += MATERIAL_SCORES[code][square]
+        placement += PLACEMENT_SCORES[code][square]
+    return material, placement
+
+
+def activityScores(board: Board) -> Tuple[int, int]:
+    """Calculate the mobility and general safety scores, which depend on every piece of both sides
+
+    :param board: Board to score
+    :type board: Board
+    :return: Mobility and general safety score from red's view
+    :rtype: Tuple[int, int]
+    """
+    mobility, generalSafety = 0, 0
+    for side in Side:
+        ends = _possibleEnds(board, side)
+        opponentPalace = PALACE[side.opponent]
+        mobility += MOBILITY_WEIGHT * len(ends) * side
+        generalSafety += PALACE_PRESSURE_WEIGHT * sum(1 for end in ends if opponentPalace[end]) * side
+    return mobility, generalSafety
+
+
+def evaluate(board: Board) -> Evaluation:
+    """Evaluate a board statically
+
+    :param board: Board to evaluate
+    :type board: Board
+    :return: Evaluation terms from red's view
+    :rtype: Evaluation
+    """
+    return Evaluation(*staticScores(board), *activityScores(board))
+
+
+def evaluateBatch(boards: np.ndarray) -> np.ndarray:
+    """Evaluate a batch of boards statically, equivalent to calling :func:`evaluate` on each
+
+    :param boards: ``(N, 10, 9)`` array of piece codes indexed by rank and file,
+        see :func:`~aiBoardGame.logic.engine.batchMoves.boardsToArray`
+    :type boards: np.ndarray
+    :raises ValueError: Boards have the wrong shape
+    :return: ``(N, 4)`` array of material, placement, mobility and general safety scores from red's view,
+        sum along the last axis for the total scores
+    :rtype: np.ndarray
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim != 3 or boards.shape[1:] != (RANK_COUNT, FILE_COUNT):
+        raise ValueError(f"Boards must have shape (N, {RANK_COUNT}, {FILE_COUNT}), was {boards.shape}")
+    codes = boards.reshape(len(boards), SQUARE_COUNT).astype(np.intp)
+    squares = np.arange(SQUARE_COUNT)
+
+    terms = np.zeros((len(boards), 4), dtype=np.int32)
+    terms[:, 0] = _MATERIAL_ARRAY[codes, squares].sum(axis=1)
+    terms[:, 1] = _SCORE_ARRAY[codes, squares].sum(axis=1) - terms[:, 0]
+    for side, opponentPalace in ((Side.RED, _BLACK_PALACE), (Side.BLACK, _RED_PALACE)):
+        boardIndices, _, ends = generatePseudoLegalMoves(boards, np.full(len(boards), int(side), dtype=np.int8))
+        terms[:, 2] += MOBILITY_WEIGHT * np.bincount(boardIndices, minlength=len(boards)) * side
+        terms[:, 3] += PALACE_PRESSURE_WEIGHT * np.bincount(boardIndices[opponentPalace[ends]], minlength=len(boards)) * side
+    return terms
+
+
+def _pieceCodes(board: Board) -> List[Tuple[int, int]]:
+    if isinstance(board, CompactBoard):
+        return [(square, code) for square, code in enumerate(board.squares[:SQUARE_COUNT]) if code != 0]
+    return [(position.rank * FILE_COUNT + position.file, ENTITY_TO_CODE[boardEntity]) for position, boardEntity in board.pieces]
+
+
+def _possibleEnds(board: Board, side: Side) -> List[int]:
+    if isinstance(board, CompactBoard):
+        return [end for ends in board.getAllPossibleEnds(side).values() for end in ends]
+    return [end.rank * FILE_COUNT + end.file for position, piece in board[side].items() for end in piece.getPossibleMoves(board, position)]
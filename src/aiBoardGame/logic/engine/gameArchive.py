@@ -0,0 +1,404 @@
+"""Append-only binary archive of played games with random access to any position.
+The archive file holds a header followed by game records, each record is a fixed header, keyframe boards,
+16 bit encoded moves and move timings. A separate index file holds the offset of every record, a game is only
+visible once its offset is appended to the index, so a game interrupted while being written is discarded.
+A position is rebuilt from the closest keyframe before it, replaying fewer moves than the keyframe interval"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import mmap
+import struct
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from time import time
+from types import TracebackType
+from typing import ClassVar, List, Optional, Sequence, Tuple, Type, Union, overload
+
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.compactBoard import EMPTY, fenToSquares
+from aiBoardGame.logic.engine.notation import readWxfGames
+from aiBoardGame.logic.engine.perft import START_FEN
+from aiBoardGame.logic.engine.snapshot import PositionSnapshot
+from aiBoardGame.logic.engine.tables import SQUARE_COUNT
+from aiBoardGame.logic.engine.zobrist import squaresHash
+from aiBoardGame.logic.stockfish.fairyStockfish import Difficulty
+
+
+ARCHIVE_MAGIC = b"XQGA"
+"""First bytes of every game archive file"""
+INDEX_MAGIC = b"XQGI"
+"""First bytes of every game archive index file"""
+ARCHIVE_VERSION = 1
+"""Version of the file layout"""
+INDEX_SUFFIX = ".idx"
+"""Suffix appended to the archive path to get the path of its index"""
+DEFAULT_KEYFRAME_INTERVAL = 16
+"""Number of plies between stored boards of a game"""
+
+# NOTE: Archive header is magic, version and keyframe interval, index header is magic and version padded to the offset size.
+# A game header is ply count, starting side, winner, red and black difficulty and start time
+_HEADER = struct.Struct("<4sHH")
+_INDEX_HEADER = struct.Struct("<4sH2x")
+_OFFSET = struct.Struct("<Q")
+_GAME = struct.Struct("<Ibbbbd")
+
+_DIFFICULTIES: Tuple[Optional[Difficulty], ...] = (None, *Difficulty)
+
+
+@dataclass(frozen=True)
+class ArchivedGame:
+    """Game read from a :class:`GameArchive`"""
+    start: PositionSnapshot
+    """Position before the first move"""
+    moves: List[int]
+    """Moves encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`"""
+    timings: List[float]
+    """Seconds spent on each move, with millisecond precision"""
+    winner: Optional[Side]
+    """Side that won the game, None if it was drawn or unfinished"""
+    redDifficulty: Optional[Difficulty]
+    """Difficulty of the red robot player, None for a human player"""
+    blackDifficulty: Optional[Difficulty]
+    """Difficulty of the black robot player, None for a human player"""
+    startedAt: float
+    """Start of the game in seconds since the epoch"""
+
+    @property
+    def plies(self) -> int:
+        """Number of moves made"""
+        return len(self.moves)
+
+
+class GameArchive(Sequence[ArchivedGame]):
+    """Memory-mapped reader of a game archive written with :class:`GameArchiveWriter`.
+    Games appended after the archive was opened are not visible"""
+
+    basePath: ClassVar[Path] = Path("src/aiBoardGame/games.xqa")
+    """Default game archive path"""
+
+    path: Path
+    """Path of the opened archive"""
+    keyframeInterval: int
+    """Number of plies between stored boards"""
+
+    def __init__(self, path: Path = basePath) -> None:
+        """
+        :param path: Game archive file, its index is next to it with the :data:`INDEX_SUFFIX` suffix, defaults to basePath
+        :type path: Path, optional
+        :raises FileNotFoundError: Archive or its index does not exist
+        :raises ValueError: Files are not a game archive of the supported version
+        """
+        self.path = path
+        self._buffer, self._index = _mapFile(path), _mapFile(_indexPath(path))
+        try:
+            self.keyframeInterval = _readHeaders(self._buffer, self._index, path)
+        except ValueError:
+            self.close()
+            raise
+        self._count = (len(self._index) - _INDEX_HEADER.size) // _OFFSET.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> ArchivedGame:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[ArchivedGame]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ArchivedGame, List[ArchivedGame]]:
+        if isinstance(index, slice):
+            return [self[gameIndex] for gameIndex in range(*index.indices(self._count))]
+        offset = self._offset(index)
+        plies, startSide, winner, redDifficulty, blackDifficulty, startedAt = _GAME.unpack_from(self._buffer, offset)
+        movesOffset = offset + _GAME.size + _keyframeCount(plies, self.keyframeInterval) * SQUARE_COUNT
+        startSquares = self._buffer[offset + _GAME.size:offset + _GAME.size + SQUARE_COUNT]
+        return ArchivedGame(
+            PositionSnapshot(startSquares, Side(startSide), squaresHash(array("b", startSquares), Side(startSide)), 0),
+            list(struct.unpack_from(f"<{plies}H", self._buffer, movesOffset)),
+            [milliseconds / 1000 for milliseconds in struct.unpack_from(f"<{plies}I", self._buffer, movesOffset + 2 * plies)],
+            None if winner == 0 else Side(winner),
+            _DIFFICULTIES[redDifficulty],
+            _DIFFICULTIES[blackDifficulty],
+            startedAt
+        )
+
+    def __enter__(self) -> GameArchive:
+        return self
+
+    def __exit__(self, excType: Optional[Type[BaseException]], excValue: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the archive and its index"""
+        self._buffer.close()
+        self._index.close()
+
+    def plies(self, game: int) -> int:
+        """Number of moves of a game without reading the game
+
+        :param game: Index of the game, negative indices count from the end
+        :type game: int
+        :raises IndexError: Game is not in the archive
+        :return: Number of moves
+        :rtype: int
+        """
+        return _GAME.unpack_from(self._buffer, self._offset(game))[0]
+
+    def position(self, game: int, ply: int) -> PositionSnapshot:
+        """Rebuild the position of a game after a number of moves from the closest keyframe
+
+        :param game: Index of the game, negative indices count from the end
+        :type game: int
+        :param ply: Number of moves made, from 0 to the number of moves of the game
+        :type ply: int
+        :raises IndexError: Game is not in the archive or it has less moves
+        :return: Position that can be loaded with :meth:`~aiBoardGame.logic.engine.XiangqiEngine.fromSnapshot`
+        :rtype: PositionSnapshot
+        """
+        offset = self._offset(game)
+        plies, startSide = _GAME.unpack_from(self._buffer, offset)[:2]
+        if not 0 <= ply <= plies:
+            raise IndexError(f"Game {game} has {plies} plies, cannot get position after ply {ply}")
+        keyframe = ply // self.keyframeInterval
+        keyframeOffset = offset + _GAME.size + keyframe * SQUARE_COUNT
+        squares = array("b", self._buffer[keyframeOffset:keyframeOffset + SQUARE_COUNT])
+        movesOffset = offset + _GAME.size + _keyframeCount(plies, self.keyframeInterval) * SQUARE_COUNT
+        replayed = ply - keyframe * self.keyframeInterval
+        for move in struct.unpack_from(f"<{replayed}H", self._buffer, movesOffset + 2 * keyframe * self.keyframeInterval):
+            squares[move & 0xFF] = squares[move >> 8]
+            squares[move >> 8] = EMPTY
+        side = Side(startSide if ply % 2 == 0 else -startSide)
+        return PositionSnapshot(squares.tobytes(), side, squaresHash(squares, side), ply)
+
+    def _offset(self, game: int) -> int:
+        if game < 0:
+            game += self._count
+        if not 0 <= game < self._count:
+            raise IndexError(f"Game {game} is not in the archive of {self._count} games")
+        return _OFFSET.unpack_from(self._index, _INDEX_HEADER.size + game * _OFFSET.size)[0]
+
+
+class GameArchiveWriter:
+    """Appends games to a game archive, creating it if it does not exist.
+    A game interrupted while being appended is truncated when the archive is opened for writing again,
+    a missing index is rebuilt from the records of the archive.
+    Only a single writer may have an archive open at a time"""
+
+    path: Path
+    """Path of the archive"""
+    keyframeInterval: int
+    """Number of plies between stored boards, taken from the archive if it already exists"""
+
+    def __init__(self, path: Path = GameArchive.basePath, keyframeInterval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        """
+        :param path: Game archive file, its index is next to it with the :data:`INDEX_SUFFIX` suffix, defaults to GameArchive.basePath
+        :type path: Path, optional
+        :param keyframeInterval: Number of plies between stored boards of new archives, defaults to DEFAULT_KEYFRAME_INTERVAL
+        :type keyframeInterval: int, optional
+        :raises ValueError: Keyframe interval is not between 1 and 65535
+        :raises ValueError: Existing files are not a game archive of the supported version
+        :raises ValueError: Index exists without its archive
+        """
+        if not 0 < keyframeInterval <= 0xFFFF:
+            raise ValueError(f"Keyframe interval must be between 1 and 65535, was {keyframeInterval}")
+        self.path = path
+        indexPath = _indexPath(path)
+        if not path.exists():
+            if indexPath.exists():
+                raise ValueError(f"{indexPath} is the index of a missing game archive {path}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, keyframeInterval))
+            indexPath.write_bytes(_INDEX_HEADER.pack(INDEX_MAGIC, ARCHIVE_VERSION))
+        elif not indexPath.exists():
+            indexPath.write_bytes(_rebuildIndex(path))
+        self._file = path.open(mode="r+b")
+        self._indexFile = indexPath.open(mode="r+b")
+        try:
+            self.keyframeInterval = self._recover()
+        except ValueError:
+            self.close()
+            raise
+
+    def __enter__(self) -> GameArchiveWriter:
+        return self
+
+    def __exit__(self, excType: Optional[Type[BaseException]], excValue: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Close the archive and its index"""
+        self._file.close()
+        self._indexFile.close()
+
+    def append(self, moves: Sequence[int], winner: Optional[Side] = None, redDifficulty: Optional[Difficulty] = None, blackDifficulty: Optional[Difficulty] = None,
+               startedAt: Optional[float] = None, timings: Optional[Sequence[float]] = None, start: Optional[PositionSnapshot] = None) -> int:
+        """Append a game to the archive, moves are not validated against the rules, only that they move a piece of the side to move
+
+        :param moves: Moves encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`, see :attr:`~aiBoardGame.logic.engine.XiangqiEngine.moveHistory`
+        :type moves: Sequence[int]
+        :param winner: Side that won the game, defaults to None which means drawn or unfinished
+        :type winner: Optional[Side], optional
+        :param redDifficulty: Difficulty of the red robot player, defaults to None for a human player
+        :type redDifficulty: Optional[Difficulty], optional
+        :param blackDifficulty: Difficulty of the black robot player, defaults to None for a human player
+        :type blackDifficulty: Optional[Difficulty], optional
+        :param startedAt: Start of the game in seconds since the epoch, defaults to None which uses the current time
+        :type startedAt: Optional[float], optional
+        :param timings: Seconds spent on each move, defaults to None which stores zeros
+        :type timings: Optional[Sequence[float]], optional
+        :param start: Position before the first move, defaults to None which is the start position
+        :type start: Optional[PositionSnapshot], optional
+        :raises ValueError: Number of timings differs from the number of moves
+        :raises ValueError: A move does not move a piece of the side to move
+        :return: Index of the appended game
+        :rtype: int
+        """
+        if timings is not None and len(timings) != len(moves):
+            raise ValueError(f"Game has {len(moves)} moves but {len(timings)} timings")
+        side = Side.RED if start is None else start.side
+        squares = fenToSquares(START_FEN)[:SQUARE_COUNT] if start is None else start.codes
+        keyframes = bytearray()
+        for ply, move in enumerate(moves):
+            if ply % self.keyframeInterval == 0:
+                keyframes += squares.tobytes()
+            moveStart, moveEnd = move >> 8, move & 0xFF
+            if moveStart >= SQUARE_COUNT or moveEnd >= SQUARE_COUNT or squares[moveStart] * side <= 0:
+                raise ValueError(f"Move {ply + 1} of the game does not move a piece of {side.name}")
+            squares[moveEnd], squares[moveStart] = squares[moveStart], EMPTY
+            side = side.opponent
+        if len(moves) % self.keyframeInterval == 0:
+            keyframes += squares.tobytes()
+
+        record = bytearray(_GAME.pack(
+            len(moves), Side.RED if start is None else start.side, 0 if winner is None else winner,
+            _DIFFICULTIES.index(redDifficulty), _DIFFICULTIES.index(blackDifficulty), time() if startedAt is None else startedAt
+        ))
+        record += keyframes
+        record += struct.pack(f"<{len(moves)}H", *moves)
+        record += struct.pack(f"<{len(moves)}I", *(round(timing * 1000) for timing in (timings or [0.0] * len(moves))))
+
+        # NOTE: The index entry is written last, so a partially written record is never visible to readers
+        offset = self._file.seek(0, 2)
+        self._file.write(record)
+        self._file.flush()
+        self._indexFile.seek(0, 2)
+        self._indexFile.write(_OFFSET.pack(offset))
+        self._indexFile.flush()
+        self._count += 1
+        return self._count - 1
+
+    def _recover(self) -> int:
+        keyframeInterval = _readHeaders(self._file.read(_HEADER.size), self._indexFile.read(_INDEX_HEADER.size), self.path)
+
+        indexSize = self._indexFile.seek(0, 2)
+        self._count = (indexSize - _INDEX_HEADER.size) // _OFFSET.size
+        self._indexFile.truncate(_INDEX_HEADER.size + self._count * _OFFSET.size)
+        end = _HEADER.size
+        if self._count > 0:
+            self._indexFile.seek(_INDEX_HEADER.size + (self._count - 1) * _OFFSET.size)
+            end, = _OFFSET.unpack(self._indexFile.read(_OFFSET.size))
+            self._file.seek(end)
+            plies = _GAME.unpack(self._file.read(_GAME.size))[0]
+            end += _GAME.size + _keyframeCount(plies, keyframeInterval) * SQUARE_COUNT + 6 * plies
+        if self._file.seek(0, 2) < end:
+            raise ValueError(f"{self.path} is truncated, its index has games that are not in the archive")
+        self._file.truncate(end)
+        return keyframeInterval
+
+
+def _indexPath(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _rebuildIndex(path: Path) -> bytes:
+    # NOTE: Records are walked by their sizes, a partially written last record is left out and truncated on recovery
+    index = bytearray(_INDEX_HEADER.pack(INDEX_MAGIC, ARCHIVE_VERSION))
+    with path.open(mode="rb") as archiveFile:
+        keyframeInterval = _readHeaders(archiveFile.read(_HEADER.size), index, path)
+        size = archiveFile.seek(0, 2)
+        offset = _HEADER.size
+        while offset + _GAME.size <= size:
+            archiveFile.seek(offset)
+            plies = _GAME.unpack(archiveFile.read(_GAME.size))[0]
+            end = offset + _GAME.size + _keyframeCount(plies, keyframeInterval) * SQUARE_COUNT + 6 * plies
+            if end > size:
+                break
+            index += _OFFSET.pack(offset)
+            offset = end
+    return bytes(index)
+
+
+def _keyframeCount(plies: int, keyframeInterval: int) -> int:
+    return plies // keyframeInterval + 1
+
+
+def _mapFile(path: Path) -> mmap.mmap:
+    with path.open(mode="rb") as mappedFile:
+        return mmap.mmap(mappedFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _readHeaders(buffer: Union[bytes, mmap.mmap], index: Union[bytes, mmap.mmap], path: Path) -> int:
+    if len(buffer) < _HEADER.size or len(index) < _INDEX_HEADER.size:
+        raise ValueError(f"{path} is not a game archive")
+    magic, version, keyframeInterval = _HEADER.unpack_from(buffer)
+    indexMagic, indexVersion = _INDEX_HEADER.unpack_from(index)
+    if magic != ARCHIVE_MAGIC or indexMagic != INDEX_MAGIC or version != ARCHIVE_VERSION or indexVersion != ARCHIVE_VERSION or keyframeInterval == 0:
+        raise ValueError(f"{path} is not a game archive of version {ARCHIVE_VERSION}")
+    return keyframeInterval
+
+
+def archiveGameRecords(source: Path, output: Path, keyframeInterval: int = DEFAULT_KEYFRAME_INTERVAL) -> int:
+    """Convert text game records into games of an archive, so positions no longer need parsing and validation. Records with an invalid move are skipped
+
+    :param source: Directory, zip or tar archive or a single game record, see :func:`~aiBoardGame.logic.engine.replay.readGameRecords`
+    :type source: Path
+    :param output: Game archive, games are appended if it exists
+    :type output: Path
+    :param keyframeInterval: Number of plies between stored boards if a new archive is created, defaults to DEFAULT_KEYFRAME_INTERVAL
+    :type keyframeInterval: int, optional
+    :raises FileNotFoundError: Source does not exist
+    :return: Number of games appended
+    :rtype: int
+    """
+    if not source.exists():
+        raise FileNotFoundError(f"Game records not found at {source}")
+    appended = 0
+    with GameArchiveWriter(output, keyframeInterval) as writer:
+        for _, moves, engine in readWxfGames(source):
+            writer.append(moves, winner=engine.winner, startedAt=0.0)
+            appended += 1
+    return appended
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Convert game records into a game archive from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Append Xiangqi game records to a binary game archive")
+    parser.add_argument("source", type=Path, help="game record, directory of records, or zip or tar archive of records")
+    parser.add_argument("--output", type=Path, default=GameArchive.basePath, help="game archive (default: %(default)s)")
+    parser.add_argument("--keyframe-interval", type=int, default=DEFAULT_KEYFRAME_INTERVAL, help="plies between stored boards of a new archive (default: %(default)s)")
+    args = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format="")
+
+    appended = archiveGameRecords(args.source, args.output, keyframeInterval=args.keyframe_interval)
+    logging.info(f"{appended} games appended to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import Type, TypeVar, Optional
+from typing import List, Sequence, Tuple, Type, TypeVar, Optional, Union, overload
 
 from aiBoardGame.logic.engine.auxiliary import Position, BoardEntity, Board
+from aiBoardGame.logic.engine.compactBoard import CODE_TO_ENTITY
+from aiBoardGame.logic.engine.tables import POSITIONS, squareIndex
 
 
 Piece = TypeVar("Piece")
@@ -50,4 +53,164 @@ class MoveRecord:
             movedPieceEntity=board[start],
             capturedPieceEntity=board[end]
         )
-        
\ No newline at end of file
+
+
+@dataclass(frozen=True)
+class BoardMatch:
+    """Valid move whose resulting board is nearest to an observed board, see :meth:`~aiBoardGame.logic.engine.XiangqiEngine.matchBoard`"""
+    start: Position
+    """Start position of the move"""
+    end: Position
+    """End position of the move"""
+    distance: int
+    """Number of squares on which the observed board differs from the board after the move, 0 for an exact match"""
+    confidence: float
+    """How clearly the move is preferred over the next nearest valid move, from 0 for a tie to 1 for an exact match or the only valid move"""
+
+
+def encodeMove(start: int, end: int) -> int:
+    """Pack a move into 16 bits, the start square is the high byte and the end square is the low byte
+
+    :param start: Square index to move from
+    :type start: int
+    :param end: Square index to move to
+    :type end: int
+    :return: Encoded move
+    :rtype: int
+    """
+    return start << 8 | end
+
+
+def moveStart(move: int) -> int:
+    """Get start square index of an encoded move
+
+    :param move: Encoded move
+    :type move: int
+    :return: Square index to move from
+    :rtype: int
+    """
+    return move >> 8
+
+
+def moveEnd(move: int) -> int:
+    """Get end square index of an encoded move
+
+    :param move: Encoded move
+    :type move: int
+    :return: Square index to move to
+    :rtype: int
+    """
+    return move & 0xFF
+
+
+def positionsToMove(start: Union[Position, Tuple[int, int]], end: Union[Position, Tuple[int, int]]) -> int:
+    """Encode a move given with positions
+
+    :param start: Start position to move from
+    :type start: Union[Position, Tuple[int, int]]
+    :param end: End position to move to
+    :type end: Union[Position, Tuple[int, int]]
+    :return: Encoded move
+    :rtype: int
+    """
+    return squareIndex(start) << 8 | squareIndex(end)
+
+
+def moveToPositions(move: int) -> Tuple[Position, Position]:
+    """Decode a move into positions
+
+    :param move: Encoded move
+    :type move: int
+    :return: Start and end position of the move
+    :rtype: Tuple[Position, Position]
+    """
+    return POSITIONS[move >> 8], POSITIONS[move & 0xFF]
+
+
+class UndoStack(Sequence[MoveRecord]):
+    """Stack of made moves stored as plain integers in preallocated arrays.
+    Indexing builds :class:`MoveRecord` objects only when asked, so making moves does not allocate per ply"""
+
+    def __init__(self, capacity: int = 256) -> None:
+        """
+        :param capacity: Number of moves to allocate space for, doubled whenever it runs out, defaults to 256
+        :type capacity: int, optional
+        :raises ValueError: Capacity is not positive
+        """
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, was {capacity}")
+        self._moves = array("H", bytes(2 * capacity))
+        self._movedCodes = array("b", bytes(capacity))
+        self._capturedCodes = array("b", bytes(capacity))
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @overload
+    def __getitem__(self, index: int) -> MoveRecord:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[MoveRecord]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MoveRecord, List[MoveRecord]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Move history index out of range")
+        move = self._moves[index]
+        return MoveRecord(
+            start=POSITIONS[move >> 8],
+            end=POSITIONS[move & 0xFF],
+            movedPieceEntity=CODE_TO_ENTITY[self._movedCodes[index]],
+            capturedPieceEntity=CODE_TO_ENTITY[self._capturedCodes[index]]
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)})"
+
+    @property
+    def moves(self) -> List[int]:
+        """Encoded moves from the first to the last"""
+        return self._moves[:self._size].tolist()
+
+    def push(self, move: int, movedCode: int, capturedCode: int) -> None:
+        """Store a made move
+
+        :param move: Encoded move
+        :type move: int
+        :param movedCode: Signed code of the moved piece
+        :type movedCode: int
+        :param capturedCode: Signed code of the captured piece, 0 if nothing was captured
+        :type capturedCode: int
+        """
+        size = self._size
+        if size == len(self._moves):
+            self._moves.extend(self._moves)
+            self._movedCodes.extend(self._movedCodes)
+            self._capturedCodes.extend(self._capturedCodes)
+        self._moves[size] = move
+        self._movedCodes[size] = movedCode
+        self._capturedCodes[size] = capturedCode
+        self._size = size + 1
+
+    def pop(self) -> Tuple[int, int, int]:
+        """Remove the last move
+
+        :raises IndexError: Stack is empty
+        :return: Encoded move, moved and captured piece code
+        :rtype: Tuple[int, int, int]
+        """
+        if self._size == 0:
+            raise IndexError("Pop from empty move history")
+        self._size -= 1
+        size = self._size
+        return self._moves[size], self._movedCodes[size], self._capturedCodes[size]
+
+    def clear(self) -> None:
+        """Remove every move, allocated space is kept"""
+        self._size = 0
@@ -0,0 +1,243 @@
+"""Conversion between move notations and encoded moves, see :func:`~aiBoardGame.logic.engine.move.encodeMove`.
+WXF notations (like ``C2=5``) depend on the position, so they are converted on an engine,
+ICCS notations (like ``h2e2``) only depend on the squares"""
+
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.compactBoard import CODE_TO_ENTITY, EMPTY, PIECE_TO_CODE
+from aiBoardGame.logic.engine.move import InvalidMove, encodeMove, moveStart, moveEnd, moveToPositions
+from aiBoardGame.logic.engine.pieces import FEN_ABBREVIATION_TO_PIECE, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.replay import readGameRecords
+from aiBoardGame.logic.engine.tables import FILE_COUNT, RANK_COUNT, SQUARE_COUNT
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+WXF_CACHE_SIZE = 4096
+"""Number of parsed WXF notations kept, a notation parses the same way in every position"""
+
+_WXF_PATTERN = re.compile(r"(?P<tandem>[+-])?(?P<piece>[A-Za-z])(?P<formerFile>\d)?(?P<direction>[+\-=.,])(?P<number>\d)")
+_ICCS_PATTERN = re.compile(r"([a-i])(\d)-?([a-i])(\d)", re.IGNORECASE)
+_PIECE_CODES: Dict[str, int] = {
+    **{abbreviation: PIECE_TO_CODE[piece] for abbreviation, piece in FEN_ABBREVIATION_TO_PIECE.items() if piece in PIECE_TO_CODE},
+    # NOTE: WXF letters of the elephant and the horse
+    "E": PIECE_TO_CODE[Elephant],
+    "H": PIECE_TO_CODE[Horse]
+}
+_DIRECTIONS = {"+": 1, "-": -1, "=": 0, ".": 0, ",": 0}
+_STRAIGHT_CODES = frozenset(PIECE_TO_CODE[piece] for piece in (General, Chariot, Cannon, Soldier))
+_DIAGONAL_RANK_DELTAS = {PIECE_TO_CODE[Advisor]: 1, PIECE_TO_CODE[Elephant]: 2}
+
+# NOTE: Signed piece code, tandem (1 front, -1 rear, 0 none), former file number (0 if omitted), direction and number
+WxfToken = Tuple[int, int, int, int, int]
+
+
+def wxfToMove(engine: XiangqiEngine, notation: str) -> int:
+    """Convert a WXF notation to a move in the engine's current position, the move is not validated
+
+    :param engine: Engine in the position the notation was written in
+    :type engine: XiangqiEngine
+    :param notation: WXF notation, red pieces are uppercase and black pieces are lowercase
+    :type notation: str
+    :raises ValueError: Notation is malformed, moves the other side's piece, does not match the position or is ambiguous
+    :return: Encoded move
+    :rtype: int
+    """
+    code, tandem, formerFileNumber, direction, number = _parseWxf(notation)
+    side = engine.currentSide
+    if code * side < 0:
+        raise ValueError(f"{notation} does not move a piece of {side.name}")
+    squares = engine.squares
+
+    if formerFileNumber != 0:
+        starts = _fileSquares(squares, code, _fileIndex(formerFileNumber, side))
+    else:
+        # NOTE: Without a former file the notation refers to one of several pieces on the only file holding more than one
+        tandemStarts = [fileStarts for fileStarts in (_fileSquares(squares, code, file) for file in range(FILE_COUNT)) if len(fileStarts) >= 2]
+        if len(tandemStarts) > 1:
+            raise ValueError(f"{notation} is ambiguous, more than one file holds several of its pieces")
+        starts = tandemStarts[0] if len(tandemStarts) > 0 else []
+    if len(starts) == 0 or (formerFileNumber == 0 and tandem == 0):
+        raise ValueError(f"No piece found for {notation}")
+    start = starts[0] if tandem == 1 else starts[-1] if tandem == -1 else starts[len(starts) // 2]
+
+    startRank, startFile = divmod(start, FILE_COUNT)
+    if direction == 0:
+        endRank, endFile = startRank, _fileIndex(number, side)
+    elif abs(code) in _STRAIGHT_CODES:
+        endRank, endFile = startRank + direction * number * side, startFile
+    else:
+        endFile = _fileIndex(number, side)
+        rankDelta = _DIAGONAL_RANK_DELTAS.get(abs(code), 1 if abs(endFile - startFile) == 2 else 2)
+        endRank = startRank + direction * rankDelta * side
+    if not 0 <= endRank < RANK_COUNT:
+        raise ValueError(f"{notation} moves out of bounds")
+    return encodeMove(start, endRank * FILE_COUNT + endFile)
+
+
+def moveToWxf(engine: XiangqiEngine, move: int) -> str:
+    """Convert a move in the engine's current position to a WXF notation with FEN piece letters
+
+    :param engine: Engine in the position before the move
+    :type engine: XiangqiEngine
+    :param move: Encoded move
+    :type move: int
+    :raises ValueError: No piece on the start square, or the piece is the middle one of more than three on a file
+    :return: WXF notation
+    :rtype: str
+    """
+    start, end = moveStart(move), moveEnd(move)
+    squares = engine.squares
+    code = squares[start]
+    if code == EMPTY:
+        raise ValueError(f"No piece found on square {start}")
+    boardEntity = CODE_TO_ENTITY[code]
+    side = boardEntity.side
+    letter = boardEntity.piece.abbreviations["fen"] if side == Side.RED else boardEntity.piece.abbreviations["fen"].lower()
+    startRank, startFile = divmod(start, FILE_COUNT)
+    endRank, endFile = divmod(end, FILE_COUNT)
+
+    starts = _fileSquares(squares, code, startFile)
+    if len(starts) >= 2 and start in (starts[0], starts[-1]):
+        prefix = f"{'+' if start == starts[0] else '-'}{letter}"
+        # NOTE: Soldiers can stand in tandem on several files, then the file is given too, like +P7+1
+        if any(len(_fileSquares(squares, code, file)) >= 2 for file in range(FILE_COUNT) if file != startFile):
+            prefix = f"{prefix}{_fileNumber(startFile, side)}"
+    elif len(starts) <= 3:
+        prefix = f"{letter}{_fileNumber(startFile, side)}"
+    else:
+        raise ValueError(f"Move of the piece on square {start} cannot be notated unambiguously")
+
+    rankDelta = (endRank - startRank) * side
+    if rankDelta == 0:
+        return f"{prefix}={_fileNumber(endFile, side)}"
+    number = abs(rankDelta) if abs(code) in _STRAIGHT_CODES else _fileNumber(endFile, side)
+    return f"{prefix}{'+' if rankDelta > 0 else '-'}{number}"
+
+
+def iccsToMove(notation: str) -> int:
+    """Convert an ICCS notation to a move, files are letters from red's left and ranks are digits from red's side
+
+    :param notation: ICCS notation, the dash is optional (``h2-e2`` or ``h2e2``)
+    :type notation: str
+    :raises ValueError: Notation is malformed
+    :return: Encoded move
+    :rtype: int
+    """
+    match = _ICCS_PATTERN.fullmatch(notation.strip())
+    if match is None:
+        raise ValueError(f"Invalid ICCS notation {notation}")
+    startFile, startRank, endFile, endRank = match.groups()
+    return encodeMove(
+        int(startRank) * FILE_COUNT + ord(startFile.lower()) - ord("a"),
+        int(endRank) * FILE_COUNT + ord(endFile.lower()) - ord("a")
+    )
+
+
+def moveToIccs(move: int) -> str:
+    """Convert a move to a lowercase ICCS notation without dash, the format UCI engines use
+
+    :param move: Encoded move
+    :type move: int
+    :return: ICCS notation
+    :rtype: str
+    """
+    startRank, startFile = divmod(moveStart(move), FILE_COUNT)
+    endRank, endFile = divmod(moveEnd(move), FILE_COUNT)
+    return f"{chr(ord('a') + startFile)}{startRank}{chr(ord('a') + endFile)}{endRank}"
+
+
+def wxfGameToMoves(notations: Iterable[str], engine: Optional[XiangqiEngine] = None) -> List[int]:
+    """Convert the WXF notations of a whole game to moves, each move is validated and made on the engine
+
+    :param notations: WXF notations in the order they were played, empty lines are skipped
+    :type notations: Iterable[str]
+    :param engine: Engine in the start position of the game, defaults to None which creates a new engine
+    :type engine: Optional[XiangqiEngine], optional
+    :raises ValueError: A notation is malformed or does not match the position
+    :raises InvalidMove: A move is not valid
+    :return: Encoded moves
+    :rtype: List[int]
+    """
+    engine = XiangqiEngine(compact=True, cacheSize=0) if engine is None else engine
+    moves = []
+    for notation in notations:
+        notation = notation.strip()
+        if len(notation) == 0:
+            continue
+        move = wxfToMove(engine, notation)
+        if not engine.isValidMove(move):
+            raise InvalidMove(CODE_TO_ENTITY[engine.squares[moveStart(move)]].piece, *moveToPositions(move), f"Invalid move {notation}")
+        engine.makeMove(move)
+        moves.append(move)
+    return moves
+
+
+def readWxfGames(source: Path) -> Iterator[Tuple[str, List[int], XiangqiEngine]]:
+    """Read WXF game records one by one and convert them to moves. Records with an invalid move are logged and skipped
+
+    :param source: Directory, zip or tar archive or a single game record, see :func:`~aiBoardGame.logic.engine.replay.readGameRecords`
+    :type source: Path
+    :return: Name and encoded moves of each valid record, with the engine the moves were made on
+    :rtype: Iterator[Tuple[str, List[int], XiangqiEngine]]
+    """
+    for name, notations in readGameRecords(source):
+        engine = XiangqiEngine(compact=True, cacheSize=0)
+        try:
+            moves = wxfGameToMoves(notations, engine)
+        except (InvalidMove, ValueError) as error:
+            logging.warning(f"Skipping {name}: {error}")
+            continue
+        yield name, moves, engine
+
+
+def movesToWxfGame(moves: Iterable[int], engine: Optional[XiangqiEngine] = None) -> List[str]:
+    """Convert the moves of a whole game to WXF notations, each move is validated and made on the engine
+
+    :param moves: Encoded moves in the order they were played
+    :type moves: Iterable[int]
+    :param engine: Engine in the start position of the game, defaults to None which creates a new engine
+    :type engine: Optional[XiangqiEngine], optional
+    :raises InvalidMove: A move is not valid
+    :return: WXF notations
+    :rtype: List[str]
+    """
+    engine = XiangqiEngine(compact=True, cacheSize=0) if engine is None else engine
+    notations = []
+    for move in moves:
+        if not engine.isValidMove(move):
+            raise InvalidMove(None, *moveToPositions(move))
+        notations.append(moveToWxf(engine, move))
+        engine.makeMove(move)
+    return notations
+
+
+@lru_cache(maxsize=WXF_CACHE_SIZE)
+def _parseWxf(notation: str) -> WxfToken:
+    match = _WXF_PATTERN.match(notation)
+    if match is None or match["piece"].upper() not in _PIECE_CODES:
+        raise ValueError(f"Invalid WXF notation {notation}")
+    code = _PIECE_CODES[match["piece"].upper()] * (1 if match["piece"].isupper() else -1)
+    tandem = {"+": 1, "-": -1, None: 0}[match["tandem"]]
+    return code, tandem, int(match["formerFile"] or 0), _DIRECTIONS[match["direction"]], int(match["number"])
+
+
+def _fileSquares(squares: Iterable[int], code: int, file: int) -> List[int]:
+    # NOTE: Ordered from the front to the rear from the view of the piece's side
+    fileSquares = [square for square in range(file, SQUARE_COUNT, FILE_COUNT) if squares[square] == code]
+    return fileSquares[::-1] if code > 0 else fileSquares
+
+
+def _fileIndex(number: int, side: Side) -> int:
+    # NOTE: Red numbers files from its right, black from its left, both from their own view
+    if not 1 <= number <= FILE_COUNT:
+        raise ValueError(f"File number must be between 1 and {FILE_COUNT}, was {number}")
+    return FILE_COUNT - number if side == Side.RED else number - 1
+
+
+def _fileNumber(file: int, side: Side) -> int:
+    return FILE_COUNT - file if side == Side.RED else file + 1
@@ -0,0 +1,162 @@
+"""Count leaf nodes of the legal move tree to measure the speed of move generation and verify its correctness"""
+
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aiBoardGame.logic.engine.auxiliary import Position
+from aiBoardGame.logic.engine.move import positionsToMove
+from aiBoardGame.logic.engine.profiling import EngineProfile
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+"""FEN of the start position"""
+
+KNOWN_PERFT: Dict[str, Tuple[int, ...]] = {
+    START_FEN: (44, 1920, 79666, 3290240),
+    "r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1": (38, 1128, 43929),
+    "1cbak4/9/n2a5/2p1p3p/5cp2/2n2N3/6PCP/3AB4/2C6/3A1K1N1 w - - 0 1": (7, 281, 8620),
+    "5a3/3k5/3aR4/9/5r3/5n3/9/3A1A3/5K3/2BC2B2 w - - 0 1": (25, 424, 9850),
+    "CRN1k1b2/3ca4/4ba3/9/2nr5/9/9/4B4/4A4/4KA3 w - - 0 1": (28, 516, 14808),
+    "R2akab2/3n5/4b3n/p1p1p1N1p/2c3p2/6P2/P1P1P2cP/2C1B4/4A4/2BAK3R w - - 0 1": (34, 1019, 34657),
+    # NOTE: Positions from tests/data/games/game1.txt after 10, 40 and 70 plies
+    "r1bakabr1/9/n2cc1n2/p1p1p1p1p/9/6P2/P1P1P3P/1CN1B1NC1/9/R1BAKA1R1 w - - 0 6": (40, 1378, 55508),
+    "2bakab2/9/4c1n2/2p3p1p/C3p4/2P3P2/P2RPr2P/4B3C/Nnc2N3/2BAKA3 w - - 0 21": (37, 1417, 50763),
+    "3ak1b2/4a4/4b1n2/2p3p2/3r4p/2P3P2/P3R4/2N3C2/3KA4/2B2AB1c w - - 0 36": (4, 137, 4275),
+    # NOTE: Positions from tests/data/games/game2.txt after 5, 30 and 90 plies
+    "rnbakabr1/9/1c4nc1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C1N2/9/RNBAKABR1 b - - 0 3": (38, 1417, 53611),
+    "r3kabn1/4a4/1R7/4p1N1p/p5p2/2pn2P2/P3P3P/N3C4/9/2cAKAB2 w - - 0 16": (2, 63, 2490),
+    "9/4P4/4k4/8p/9/2c1r3P/P2R5/9/4A4/3K1A3 w - - 0 46": (24, 582, 12439)
+}
+"""Known-good leaf node counts of positions for each depth starting from 1, verified against an independent move generator"""
+
+
+@dataclass(frozen=True)
+class PerftResult:
+    """Leaf node counts of a perft run"""
+    fen: str
+    """Root position"""
+    depth: int
+    """Number of plies searched"""
+    divide: Dict[Tuple[Position, Position], int]
+    """Leaf node count under each valid move of the root position"""
+    seconds: float
+    """Elapsed wall clock time"""
+
+    @property
+    def nodes(self) -> int:
+        """Number of leaf nodes"""
+        return sum(self.divide.values())
+
+    @property
+    def nodesPerSecond(self) -> float:
+        """Leaf nodes counted per second"""
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+def perft(fen: str, depth: int, processes: int = 1, compact: bool = True, profile: Optional[EngineProfile] = None) -> PerftResult:
+    """Count leaf nodes of the legal move tree of a position
+
+    :param fen: Root position
+    :type fen: str
+    :param depth: Number of plies to search, at least 1
+    :type depth: int
+    :param processes: Number of processes the root moves are split across, defaults to 1
+    :type processes: int, optional
+    :param compact: Use a :class:`~aiBoardGame.logic.engine.compactBoard.CompactBoard` in the engine, defaults to True
+    :type compact: bool, optional
+    :param profile: Profile the move generation phases are measured into, defaults to None which disables profiling
+    :type profile: Optional[EngineProfile], optional
+    :raises ValueError: Depth is less than 1
+    :raises ValueError: Number of processes is less than 1
+    :raises ValueError: Profiling is requested with more than one process
+    :return: Leaf node counts with elapsed time
+    :rtype: PerftResult
+    """
+    if processes < 1:
+        raise ValueError(f"Number of processes must be at least 1, was {processes}")
+    if profile is not None and processes > 1:
+        raise ValueError("Profiling is only supported in a single process")
+
+    startTime = perf_counter()
+    engine = XiangqiEngine.fromFen(fen, compact=compact)
+    if processes == 1:
+        with nullcontext() if profile is None else engine.profiled(profile):
+            divide = engine.divide(depth)
+    else:
+        if depth < 1:
+            raise ValueError(f"Divide depth must be at least 1, was {depth}")
+        moves = [(start, end) for start, ends in engine.validMoves.items() for end in ends]
+        chunks = [moves[index::processes] for index in range(processes)]
+        divide = {}
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for partialDivide in executor.map(_divideMoves, [fen] * processes, chunks, [depth] * processes, [compact] * processes):
+                divide.update(partialDivide)
+    return PerftResult(fen, depth, divide, perf_counter() - startTime)
+
+
+def _divideMoves(fen: str, moves: List[Tuple[Position, Position]], depth: int, compact: bool) -> Dict[Tuple[Position, Position], int]:
+    engine = XiangqiEngine.fromFen(fen, compact=compact)
+    return {(start, end): engine._perftMove(positionsToMove(start, end), depth - 1) for start, end in moves}  # pylint: disable=protected-access
+
+
+def _logResult(result: PerftResult, expectedNodes: Optional[int] = None) -> bool:
+    isCorrect = expectedNodes is None or result.nodes == expectedNodes
+    expected = "" if expectedNodes is None else f"  expected {expectedNodes:>10}" + ("" if isCorrect else "  MISMATCH")
+    logging.info(f"depth {result.depth:>2}  nodes {result.nodes:>10}  time {result.seconds:>8.3f} s  {result.nodesPerSecond:>10.0f} nodes/s{expected}")
+    return isCorrect
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Run perft from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code, 1 if a known node count did not match
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Count leaf nodes of the Xiangqi legal move tree")
+    parser.add_argument("depth", type=int, nargs="?", default=3, help="number of plies to search (default: %(default)s)")
+    parser.add_argument("--fen", default=START_FEN, help="root position (default: start position)")
+    parser.add_argument("--processes", type=int, default=1, help="split root moves across a process pool of this size (default: %(default)s)")
+    parser.add_argument("--divide", action="store_true", help="print leaf node count under each root move")
+    parser.add_argument("--dict", action="store_true", help="use the dictionary board instead of the compact board")
+    parser.add_argument("--known", action="store_true", help="verify every position of the known node count table up to depth")
+    parser.add_argument("--profile", type=Path, help="measure move generation phases and write them to this file, JSON if it ends in .json, pstats otherwise")
+    args = parser.parse_args(arguments)
+    if args.profile is not None and args.processes > 1:
+        parser.error("--profile requires a single process")
+
+    logging.basicConfig(level=logging.INFO, format="")
+
+    isCorrect = True
+    profile = None if args.profile is None else EngineProfile()
+    fens = list(KNOWN_PERFT) if args.known else [args.fen]
+    for fen in fens:
+        logging.info(fen)
+        knownNodes = KNOWN_PERFT.get(fen, ())
+        depths = range(1, min(args.depth, len(knownNodes)) + 1) if args.known else range(1, args.depth + 1)
+        result = None
+        for depth in depths:
+            result = perft(fen, depth, processes=args.processes, compact=not args.dict, profile=profile)
+            isCorrect &= _logResult(result, knownNodes[depth - 1] if depth <= len(knownNodes) else None)
+        if args.divide and result is not None:
+            for (start, end), nodes in sorted(result.divide.items(), key=lambda item: (*item[0][0], *item[0][1])):
+                logging.info(f"  {*start,} -> {*end,}: {nodes}")
+    if profile is not None:
+        logging.info(profile)
+        if args.profile.suffix == ".json":
+            profile.toJson(args.profile)
+        else:
+            profile.toPstats(args.profile)
+    return 0 if isCorrect else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
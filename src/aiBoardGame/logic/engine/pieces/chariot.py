@@ -2,12 +2,11 @@
 
 from dataclasses import dataclass
 from typing import ClassVar, Dict, List
-from itertools import chain, product, starmap
-import numpy as np
 
 
 from aiBoardGame.logic.engine.pieces import Piece
-from aiBoardGame.logic.engine.auxiliary import Board, Delta, Position, Side
+from aiBoardGame.logic.engine.auxiliary import Board, Position, Side
+from aiBoardGame.logic.engine.tables import POSITIONS, RAYS, squareIndex
 
 
 @dataclass(init=False)
@@ -21,31 +20,22 @@ class Chariot(Piece):
 
     @classmethod
     def _isValidMove(cls, board: Board, side: Side, start: Position, end: Position) -> bool:
-        delta = Delta(end.file - start.file, end.rank - start.rank)
-
-        if delta.file != 0 and delta.rank != 0:  # NOTE: == isOneDeltaOnly
-            return False
-
-        files = range(start.file + np.sign(delta.file), end.file, np.sign(delta.file)) if delta.file != 0 else [end.file] * (abs(delta.rank) - 1)
-        ranks = range(start.rank + np.sign(delta.rank), end.rank, np.sign(delta.rank)) if delta.rank != 0 else [end.rank] * (abs(delta.file) - 1)
-
-        for file, rank in zip(files, ranks):  # NOTE: == isPieceInTheWay
-            if board[file, rank] is not None:
-                return False
-
-        return True
+        endSquare = squareIndex(end)
+        for ray in RAYS[squareIndex(start)]:
+            if endSquare in ray:
+                return all(board[POSITIONS[square]] is None for square in ray[:ray.index(endSquare)])  # NOTE: == not isPieceInTheWay
+        return False
 
     @classmethod
     def _getPossibleMoves(cls, board: Board, side: Side,  start: Position) -> List[Position]:
         possibleToPositions = []
-        for delta in starmap(Delta, chain(product((1,-1), (0,)), product((0,), (1,-1)))):
-            toPosition = start
-            while cls.isPositionInBounds(side, toPosition := toPosition + delta):
-                if board[toPosition] is None:
-                    possibleToPositions.append(toPosition)
-                elif board[toPosition] is not None:
-                    if board[toPosition].side == side.opponent:
-                        possibleToPositions.append(toPosition)
+        for ray in RAYS[squareIndex(start)]:
+            for end in ray:
+                boardEntity = board[POSITIONS[end]]
+                if boardEntity is None:
+                    possibleToPositions.append(POSITIONS[end])
+                else:
+                    if boardEntity.side == side.opponent:
+                        possibleToPositions.append(POSITIONS[end])
                     break
         return possibleToPositions
-        
\ No newline at end of file
@@ -2,25 +2,18 @@
 
 from dataclasses import dataclass
 from typing import ClassVar, Dict, List, Tuple
-from itertools import chain, product, starmap
-import numpy as np
 
 
 from aiBoardGame.logic.engine.pieces import Piece
-from aiBoardGame.logic.engine.auxiliary import Board, Delta, Position, Side
-
-
-NEW_FILE_LENGTH = 3
-NEW_RANK_LENGTH = 3
-
-FILE_MARGIN = (Piece.fileLength() - NEW_FILE_LENGTH) // 2
+from aiBoardGame.logic.engine.auxiliary import Board, Position, Side
+from aiBoardGame.logic.engine.tables import PALACE_FILE_BOUNDS, PALACE_RANK_BOUNDS, POSITIONS, GENERAL_MOVES, FORWARD_RAYS, RAYS, squareIndex
 
 
 @dataclass(init=False)
 class General(Piece):
     """General piece class"""
-    fileBounds: ClassVar[Tuple[int, int]] = (Piece.fileBounds[0] + FILE_MARGIN, Piece.fileBounds[1] - FILE_MARGIN)
-    rankBounds: ClassVar[Tuple[int, int]] = (Piece.rankBounds[0], NEW_RANK_LENGTH)
+    fileBounds: ClassVar[Tuple[int, int]] = PALACE_FILE_BOUNDS
+    rankBounds: ClassVar[Tuple[int, int]] = PALACE_RANK_BOUNDS
 
     abbreviations: ClassVar[Dict[str, str]] = {
         "base": "G",
@@ -30,34 +23,22 @@ class General(Piece):
 
     @classmethod
     def _isValidMove(cls, board: Board, side: Side, start: Position, end: Position) -> bool:
-        delta = Delta(end.file - start.file, end.rank - start.rank)
-
-        isOneDeltaOnly = not (delta.file != 0 and delta.rank != 0)
-        isValidDelta = abs(delta.file) == 1 or abs(delta.rank) == 1
-
-        if isOneDeltaOnly and isValidDelta:
-            return True
-        elif isOneDeltaOnly and abs(delta.rank) > 1 and board[end].piece == General:  # NOTE: Flying general
-            for rank in range(start.rank + np.sign(delta.rank), end.rank, np.sign(delta.rank)):
-                if board[end.file, rank] is not None:
-                    return False
+        startSquare, endSquare = squareIndex(start), squareIndex(end)
+        if endSquare in GENERAL_MOVES[side][startSquare]:
             return True
-        else:
-            return False
+        elif board[end] is not None and board[end].piece == General:  # NOTE: Flying general
+            for ray in RAYS[startSquare][2:]:
+                if endSquare in ray:
+                    return all(board[POSITIONS[square]] is None for square in ray[:ray.index(endSquare)])
+        return False
 
     @classmethod
     def _getPossibleMoves(cls, board: Board, side: Side,  start: Position) -> List[Position]:
-        possibleToPositions = []
-        for delta in starmap(Delta, chain(product((1,-1), (0,)), product((0,), (1,-1)))):
-            toPosition = start + delta
-            if cls.isPositionInBounds(side, toPosition) and board[side][toPosition] is None:
-                possibleToPositions.append(toPosition)
-        delta = Delta(0, side)
-        toPosition = start
-        while Piece.isPositionInBounds(side, toPosition := toPosition + delta):
-            if board[toPosition] is not None:
-                if board[side.opponent][toPosition] == General:
-                    possibleToPositions.append(toPosition)
-                else:
-                    break
+        square = squareIndex(start)
+        possibleToPositions = [POSITIONS[end] for end in GENERAL_MOVES[side][square] if board[side][POSITIONS[end]] is None]
+        for end in FORWARD_RAYS[side][square]:
+            if board[POSITIONS[end]] is not None:
+                if board[side.opponent][POSITIONS[end]] == General:
+                    possibleToPositions.append(POSITIONS[end])
+                break
         return possibleToPositions
@@ -0,0 +1,78 @@
+"""Bounded cache of per-position data keyed by position hash"""
+
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+from typing import OrderedDict as OrderedDictType
+
+
+T = TypeVar("T")
+
+
+class PositionCache(Generic[T]):
+    """Least recently used cache, evicts the entry that was not accessed for the longest time when full"""
+    maxSize: int
+    """Maximum number of stored entries"""
+    hits: int
+    """Number of lookups that found an entry"""
+    misses: int
+    """Number of lookups that did not find an entry"""
+
+    def __init__(self, maxSize: int) -> None:
+        """
+        :param maxSize: Maximum number of stored entries
+        :type maxSize: int
+        :raises ValueError: Maximum size is not positive
+        """
+        if maxSize <= 0:
+            raise ValueError(f"Cache size must be positive, was {maxSize}")
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDictType[Hashable, T] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def hitRate(self) -> float:
+        """Ratio of lookups that found an entry"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Look up an entry and mark it as recently used
+
+        :param key: Key of the entry
+        :type key: Hashable
+        :return: Stored entry, None if not found
+        :rtype: Optional[T]
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, entry: T) -> None:
+        """Store an entry, evicting the least recently used one if the cache is full
+
+        :param key: Key of the entry
+        :type key: Hashable
+        :param entry: Entry to store
+        :type entry: T
+        """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry and reset counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,257 @@
+"""Index of the positions reached in the games of a game archive, answering which games passed through a position.
+The index file holds a header and four columns of postings sorted by position hash: hash, game, ply and the move played
+from the position. Columns are stored one after another, so the hash column is binary searched in place through a memory map"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import struct
+from collections import Counter
+from dataclasses import dataclass
+from multiprocessing import Pool
+from pathlib import Path
+from typing import ClassVar, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.compactBoard import EMPTY, fenToSquares
+from aiBoardGame.logic.engine.gameArchive import GameArchive
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.engine.zobrist import PIECE_KEYS, SIDE_KEY, squaresHash
+
+
+INDEX_MAGIC = b"XQPI"
+"""First bytes of every position index file"""
+INDEX_VERSION = 1
+"""Version of the file layout"""
+DEFAULT_CHUNK_SIZE = 1024
+"""Number of games indexed by a process at once"""
+NO_MOVE = 0
+"""Move column value of the final position of a game, a move never starts and ends on the same square"""
+
+# NOTE: Header is magic, version, posting size, posting count and number of indexed games, padded to keep the columns aligned
+_HEADER = struct.Struct("<4sHHQI4x")
+_COLUMNS: Tuple[Tuple[str, np.dtype], ...] = (("hash", np.dtype("<u8")), ("game", np.dtype("<u4")), ("ply", np.dtype("<u2")), ("move", np.dtype("<u2")))
+_POSTING_SIZE = sum(dtype.itemsize for _, dtype in _COLUMNS)
+
+_Columns = Dict[str, np.ndarray]
+
+
+class PositionOccurrence(NamedTuple):
+    """Position reached in an archived game"""
+    game: int
+    """Index of the game in the archive"""
+    ply: int
+    """Number of moves made before the position"""
+    move: Optional[int]
+    """Move played from the position encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`, None if the game ended in it"""
+
+
+@dataclass(frozen=True)
+class PositionMatches:
+    """Every occurrence of a position in the indexed games, stored as columns so large results are not materialised"""
+    positionHash: int
+    """Zobrist hash of the position and the side to move"""
+    gameColumn: Tuple[int, ...]
+    """Game index of each occurrence, ordered by game and ply"""
+    plyColumn: Tuple[int, ...]
+    """Ply of each occurrence"""
+    moveColumn: Tuple[int, ...]
+    """Move played from each occurrence, :data:`NO_MOVE` if the game ended in the position"""
+
+    def __len__(self) -> int:
+        return len(self.gameColumn)
+
+    @property
+    def occurrences(self) -> List[PositionOccurrence]:
+        """Occurrences ordered by game and ply"""
+        return [PositionOccurrence(game, ply, None if move == NO_MOVE else move) for game, ply, move in zip(self.gameColumn, self.plyColumn, self.moveColumn)]
+
+    @property
+    def games(self) -> List[int]:
+        """Indices of the games that passed through the position in increasing order"""
+        return sorted(set(self.gameColumn))
+
+    @property
+    def moveCounts(self) -> Dict[int, int]:
+        """Number of times each encoded move was played from the position"""
+        moveCounts = Counter(self.moveColumn)
+        moveCounts.pop(NO_MOVE, None)
+        return dict(moveCounts)
+
+
+class PositionIndex:
+    """Memory-mapped position index built with :func:`buildPositionIndex`. Positions are matched by hash, collisions are not resolved"""
+
+    basePath: ClassVar[Path] = Path("src/aiBoardGame/games.xqi")
+    """Default position index path"""
+
+    path: Path
+    """Path of the opened index"""
+    gameCount: int
+    """Number of archive games covered by the index"""
+
+    def __init__(self, path: Path = basePath) -> None:
+        """
+        :param path: Position index file, defaults to basePath
+        :type path: Path, optional
+        :raises FileNotFoundError: Index does not exist
+        :raises ValueError: File is not a position index of the supported version or is truncated
+        """
+        self.path = path
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f"{path} is not a position index")
+        magic, version, postingSize, count, self.gameCount = _HEADER.unpack(buffer[:_HEADER.size].tobytes())
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or postingSize != _POSTING_SIZE:
+            raise ValueError(f"{path} is not a position index of version {INDEX_VERSION}")
+        if len(buffer) != _HEADER.size + count * _POSTING_SIZE:
+            raise ValueError(f"{path} is truncated, expected {count} postings")
+        self._columns: _Columns = {}
+        offset = _HEADER.size
+        for name, dtype in _COLUMNS:
+            self._columns[name] = buffer[offset:offset + count * dtype.itemsize].view(dtype)
+            offset += count * dtype.itemsize
+
+    def __len__(self) -> int:
+        return len(self._columns["hash"])
+
+    def lookup(self, positionHash: int) -> PositionMatches:
+        """Find the occurrences of a position with a binary search
+
+        :param positionHash: Zobrist hash of the position, see :attr:`~aiBoardGame.logic.engine.XiangqiEngine.hash`
+        :type positionHash: int
+        :return: Occurrences of the position, empty if no indexed game reached it
+        :rtype: PositionMatches
+        """
+        key = np.uint64(positionHash)
+        hashes = self._columns["hash"]
+        first, last = np.searchsorted(hashes, key, side="left"), np.searchsorted(hashes, key, side="right")
+        return PositionMatches(positionHash, *(tuple(self._columns[name][first:last].tolist()) for name in ("game", "ply", "move")))
+
+    def find(self, position: Union[str, XiangqiEngine]) -> PositionMatches:
+        """Find the games that passed through a position and the moves played from it
+
+        :param position: Game FEN, or an engine whose current position is searched
+        :type position: Union[str, XiangqiEngine]
+        :raises ValueError: Invalid FEN
+        :return: Occurrences of the position
+        :rtype: PositionMatches
+        """
+        if isinstance(position, XiangqiEngine):
+            positionHash = position.hash
+        else:
+            fenParts = position.split(" ")
+            positionHash = squaresHash(fenToSquares(position), Side.BLACK if len(fenParts) > 1 and fenParts[1] == Side.BLACK.fen else Side.RED)
+        return self.lookup(positionHash)
+
+
+def buildPositionIndex(archivePath: Path = GameArchive.basePath, output: Path = PositionIndex.basePath, processes: int = 1, chunkSize: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Index the positions of the archived games. If the index exists only games appended to the archive since it was built are indexed,
+    and their postings are merged into the existing ones. Chunks of games are indexed in a process pool, each sorted by hash before merging.
+    The index is replaced atomically, so an opened index stays usable
+
+    :param archivePath: Game archive, see :class:`~aiBoardGame.logic.engine.gameArchive.GameArchive`, defaults to GameArchive.basePath
+    :type archivePath: Path, optional
+    :param output: Position index, defaults to PositionIndex.basePath
+    :type output: Path, optional
+    :param processes: Number of processes indexing the games, defaults to 1 which indexes in the calling process
+    :type processes: int, optional
+    :param chunkSize: Number of games indexed by a process at once, defaults to DEFAULT_CHUNK_SIZE
+    :type chunkSize: int, optional
+    :raises ValueError: Number of processes or chunk size is less than 1
+    :raises ValueError: Existing index covers more games than the archive has
+    :return: Number of newly indexed games
+    :rtype: int
+    """
+    if processes < 1:
+        raise ValueError(f"Number of processes must be at least 1, was {processes}")
+    if chunkSize < 1:
+        raise ValueError(f"Chunk size must be at least 1, was {chunkSize}")
+
+    with GameArchive(archivePath) as archive:
+        gameCount = len(archive)
+    existing = PositionIndex(output) if output.exists() else None
+    indexedCount = 0 if existing is None else existing.gameCount
+    if indexedCount > gameCount:
+        raise ValueError(f"{output} covers {indexedCount} games, but {archivePath} only has {gameCount}")
+    if existing is not None and indexedCount == gameCount:
+        return 0
+
+    tasks = [(archivePath, first, min(first + chunkSize, gameCount)) for first in range(indexedCount, gameCount, chunkSize)]
+    if processes == 1:
+        chunks = [_indexGames(task) for task in tasks]
+    else:
+        with Pool(processes) as pool:
+            chunks = pool.map(_indexGames, tasks)
+    if existing is not None:
+        chunks.insert(0, existing._columns)  # pylint: disable=protected-access
+
+    # NOTE: Chunks are sorted runs in game order, a stable sort merges them and keeps the postings of a position ordered by game and ply
+    columns = {name: np.concatenate([np.empty(0, dtype=dtype), *(chunk[name] for chunk in chunks)]) for name, dtype in _COLUMNS}
+    order = np.argsort(columns["hash"], kind="stable")
+    partialPath = output.with_name(output.name + ".partial")
+    with partialPath.open(mode="wb") as indexFile:
+        indexFile.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, _POSTING_SIZE, len(order), gameCount))
+        for name, dtype in _COLUMNS:
+            indexFile.write(columns[name][order].astype(dtype, copy=False).tobytes())
+    os.replace(partialPath, output)
+    return gameCount - indexedCount
+
+
+def _indexGames(task: Tuple[Path, int, int]) -> _Columns:
+    archivePath, first, last = task
+    hashes: List[int] = []
+    games: List[int] = []
+    plies: List[int] = []
+    moves: List[int] = []
+    with GameArchive(archivePath) as archive:
+        for game in range(first, last):
+            archivedGame = archive[game]
+            squares = archivedGame.start.codes
+            positionHash = archivedGame.start.hash
+            # NOTE: Hashes are updated like in XiangqiEngine._make, the archived moves were validated when the games were played
+            for move in archivedGame.moves:
+                hashes.append(positionHash)
+                start, end = move >> 8, move & 0xFF
+                movedCode, capturedCode = squares[start], squares[end]
+                movedKeys = PIECE_KEYS[movedCode]
+                positionHash ^= movedKeys[start] ^ movedKeys[end] ^ PIECE_KEYS[capturedCode][end] ^ SIDE_KEY
+                squares[end], squares[start] = movedCode, EMPTY
+            hashes.append(positionHash)
+            games.extend([game] * (archivedGame.plies + 1))
+            plies.extend(range(archivedGame.plies + 1))
+            moves.extend(archivedGame.moves)
+            moves.append(NO_MOVE)
+    columns = {"hash": np.array(hashes, dtype=np.uint64), "game": np.array(games, dtype=np.uint32), "ply": np.array(plies, dtype=np.uint16), "move": np.array(moves, dtype=np.uint16)}
+    order = np.argsort(columns["hash"], kind="stable")
+    return {name: column[order] for name, column in columns.items()}
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Build or update a position index from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Index the positions of the games of a Xiangqi game archive")
+    parser.add_argument("--archive", type=Path, default=GameArchive.basePath, help="game archive (default: %(default)s)")
+    parser.add_argument("--output", type=Path, default=PositionIndex.basePath, help="position index, updated if it exists (default: %(default)s)")
+    parser.add_argument("--processes", type=int, default=1, help="index games in a process pool of this size (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="number of games indexed by a process at once (default: %(default)s)")
+    args = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format="")
+
+    indexed = buildPositionIndex(args.archive, args.output, processes=args.processes, chunkSize=args.chunk_size)
+    logging.info(f"{indexed} new games indexed in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""Call counts and cumulative time of the move generation phases of the engine, see :meth:`~aiBoardGame.logic.engine.XiangqiEngine.profiled`.
+Phases are checks, pins, possible moves, pin filtering and general safety checks, timed on the same code path as unprofiled move generation"""
+
+from __future__ import annotations
+
+import json
+import marshal
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+
+
+CHECKS = "checks"
+"""Phase finding the pieces that give check to the general of the side to move"""
+PINS = "pins"
+"""Phase finding pinned pieces and the squares screening a cannon from the general"""
+POSSIBLE_MOVES = "possibleMoves"
+"""Phase generating possible moves, of every piece at once, or per piece class as ``possibleMoves.<Piece>`` when pieces are generated lazily"""
+PIN_FILTER = "pinFilter"
+"""Phase removing the possible moves of a piece that would leave a pin or screen a cannon"""
+GENERAL_SAFETY = "generalSafety"
+"""Phase replaying possible moves of the general or of any piece in check on the attack map"""
+CACHED = "cached"
+"""Positions whose checks and valid moves were found in the position cache"""
+
+PSTATS_FILE = "xiangqiEngine"
+"""File name of the phases in pstats exports"""
+
+
+@dataclass
+class PhaseStats:
+    """Accumulated measurements of a phase"""
+    calls: int = 0
+    """Number of times the phase ran"""
+    seconds: float = 0.0
+    """Cumulative time spent in the phase"""
+
+    @property
+    def meanSeconds(self) -> float:
+        """Average time of a call"""
+        return self.seconds / self.calls if self.calls > 0 else 0.0
+
+
+class EngineProfile:
+    """Measurements of the move generation phases of an engine, filled while it is profiled"""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, PhaseStats] = {}
+        """Measurements of each phase by name"""
+
+    def __str__(self) -> str:
+        rows = [f"{'phase':<24}{'calls':>12}{'seconds':>12}{'us/call':>12}"]
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].seconds):
+            rows.append(f"{name:<24}{stats.calls:>12}{stats.seconds:>12.4f}{stats.meanSeconds * 1e6:>12.2f}")
+        return "\n".join(rows)
+
+    @property
+    def seconds(self) -> float:
+        """Time spent in every phase"""
+        return sum(stats.seconds for stats in self.phases.values())
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Add a call of a phase
+
+        :param phase: Name of the phase
+        :type phase: str
+        :param seconds: Time spent in the call
+        :type seconds: float
+        """
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = PhaseStats()
+        stats.calls += 1
+        stats.seconds += seconds
+
+    def reset(self) -> None:
+        """Forget every measurement"""
+        self.phases.clear()
+
+    def asDict(self) -> Dict[str, Dict[str, float]]:
+        """Convert measurements to builtins
+
+        :return: Calls and seconds of each phase by name
+        :rtype: Dict[str, Dict[str, float]]
+        """
+        return {name: {"calls": stats.calls, "seconds": stats.seconds} for name, stats in self.phases.items()}
+
+    def toJson(self, path: Path) -> None:
+        """Write measurements to a JSON file
+
+        :param path: Output file
+        :type path: Path
+        """
+        with path.open(mode="w") as jsonFile:
+            json.dump({"phases": self.asDict()}, jsonFile, indent=4)
+
+    def toPstats(self, path: Path) -> None:
+        """Write measurements in the format of :meth:`cProfile.Profile.dump_stats`, so they can be loaded with :class:`pstats.Stats`.
+        Each phase is a function without callers whose own time equals its cumulative time
+
+        :param path: Output file
+        :type path: Path
+        """
+        stats: Dict[Tuple[str, int, str], Tuple[int, int, float, float, Dict]] = {
+            (PSTATS_FILE, 0, name): (phase.calls, phase.calls, phase.seconds, phase.seconds, {}) for name, phase in self.phases.items()
+        }
+        with path.open(mode="wb") as statsFile:
+            marshal.dump(stats, statsFile)
@@ -0,0 +1,139 @@
+"""Repetition tracking and the rules ending games that repeat positions.
+Every position of the game is counted by hash and every move is flagged as a check or a chase when it is made,
+the flags are kept as run lengths, so perpetual checking and chasing are answered without rescanning the history"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from aiBoardGame.logic.engine.auxiliary import Side
+
+if TYPE_CHECKING:
+    from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+class RepetitionHistory:
+    """Occurrences of each position of a game and the check and chase flags of every move, updated in constant time per move"""
+
+    def __init__(self, positionHash: int) -> None:
+        """
+        :param positionHash: Hash of the position before the first move
+        :type positionHash: int
+        """
+        self.reset(positionHash)
+
+    def __len__(self) -> int:
+        return len(self._hashes) - 1
+
+    @property
+    def count(self) -> int:
+        """Number of times the current position has occurred, including now"""
+        return len(self._plies[self._hashes[-1]])
+
+    def reset(self, positionHash: int) -> None:
+        """Forget every move and start from a position
+
+        :param positionHash: Hash of the position before the first move
+        :type positionHash: int
+        """
+        self._hashes: List[int] = [positionHash]
+        self._plies: Dict[int, List[int]] = {positionHash: [0]}
+        # NOTE: Number of consecutive checking or chasing moves of the same side, ending with the move at each index
+        self._checkRuns: List[int] = []
+        self._chaseRuns: List[int] = []
+
+    def push(self, positionHash: int, isCheck: bool, isChase: bool) -> None:
+        """Store a made move
+
+        :param positionHash: Hash of the position after the move
+        :type positionHash: int
+        :param isCheck: Move gives check
+        :type isCheck: bool
+        :param isChase: Move starts a chase, see :meth:`~aiBoardGame.logic.engine.XiangqiEngine.isPerpetualChaseBy`
+        :type isChase: bool
+        """
+        index = len(self._hashes) - 1
+        self._checkRuns.append(self._checkRuns[index - 2] + 1 if isCheck and index >= 2 else int(isCheck))
+        self._chaseRuns.append(self._chaseRuns[index - 2] + 1 if isChase and index >= 2 else int(isChase))
+        self._hashes.append(positionHash)
+        self._plies.setdefault(positionHash, []).append(index + 1)
+
+    def pop(self) -> None:
+        """Forget the last move
+
+        :raises IndexError: No move was stored
+        """
+        if len(self._hashes) == 1:
+            raise IndexError("Cannot pop from a repetition history without moves")
+        positionHash = self._hashes.pop()
+        plies = self._plies[positionHash]
+        plies.pop()
+        if len(plies) == 0:
+            del self._plies[positionHash]
+        self._checkRuns.pop()
+        self._chaseRuns.pop()
+
+    def isPerpetual(self, byLastMover: bool, chase: bool) -> bool:
+        """Check if a side has checked or chased with every move since the first occurrence of the current position
+
+        :param byLastMover: Judge the side that made the last move, otherwise its opponent
+        :type byLastMover: bool
+        :param chase: Judge chases instead of checks
+        :type chase: bool
+        :return: Current position is a repetition and every move of the side in the cycle was a check or a chase
+        :rtype: bool
+        """
+        plies = self._plies[self._hashes[-1]]
+        if len(plies) < 2:
+            return False
+        runs = self._chaseRuns if chase else self._checkRuns
+        index = len(runs) - (1 if byLastMover else 2)
+        # NOTE: The same side is to move in both occurrences, so each side made half of the moves in between
+        return index >= 0 and runs[index] >= (len(runs) - plies[0]) // 2
+
+
+@dataclass(frozen=True)
+class RepetitionVerdict:
+    """Outcome of a game ended by repetition"""
+    winner: Optional[Side]
+    """Side that won because the opponent checked or chased perpetually, None for a draw"""
+    reason: str
+    """Description of the outcome"""
+
+
+@dataclass(frozen=True)
+class RepetitionRules:
+    """Rules ending a game when a position repeats. A side checking perpetually loses, then a side chasing perpetually loses,
+    if both or neither side does the game is drawn"""
+    maxRepetitions: int = 3
+    """Number of occurrences of a position that ends the game"""
+    perpetualCheckLoses: bool = True
+    """Side checking with every move of the repetition loses"""
+    perpetualChaseLoses: bool = True
+    """Side chasing with every move of the repetition loses"""
+
+    def __post_init__(self) -> None:
+        if self.maxRepetitions < 2:
+            raise ValueError(f"Maximum number of repetitions must be at least 2, was {self.maxRepetitions}")
+
+    def judge(self, engine: XiangqiEngine) -> Optional[RepetitionVerdict]:
+        """Judge the current position of a game
+
+        :param engine: Engine of the game
+        :type engine: XiangqiEngine
+        :return: Outcome if the game has to end, None if it continues
+        :rtype: Optional[RepetitionVerdict]
+        """
+        if engine.repetitionCount < self.maxRepetitions:
+            return None
+        sides = (engine.currentSide.opponent, engine.currentSide)
+        if self.perpetualCheckLoses:
+            checking = [side for side in sides if engine.isPerpetualCheckBy(side)]
+            if len(checking) == 1:
+                return RepetitionVerdict(checking[0].opponent, f"{checking[0].name} checked perpetually")
+        if self.perpetualChaseLoses:
+            chasing = [side for side in sides if engine.isPerpetualChaseBy(side)]
+            if len(chasing) == 1:
+                return RepetitionVerdict(chasing[0].opponent, f"{chasing[0].name} chased perpetually")
+        return RepetitionVerdict(None, f"Position repeated {self.maxRepetitions} times")
@@ -1,27 +1,98 @@
-"""Replay a game from stored matches"""
+"""Replay a game from stored matches, or validate many stored matches at once"""
 
+import argparse
 import logging
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from multiprocessing import Pool
 from pathlib import Path
-from time import sleep
-from typing import Optional
+from time import perf_counter, sleep
+from typing import Iterator, List, Optional, Sequence, Tuple
 
+from aiBoardGame.logic.engine.auxiliary import Side
 from aiBoardGame.logic.engine.move import InvalidMove
 from aiBoardGame.logic.engine.utility import fenMoveNotationToMove
 from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
 
 
-def replayGame(gameRecordPath: Path, intermission: Optional[int] = None) -> XiangqiEngine:
+GAME_RECORD_SUFFIX = ".txt"
+"""Suffix of game record files in directories and archives"""
+
+
+@dataclass(frozen=True)
+class GameResult:
+    """Outcome of replaying a single game record"""
+    name: str
+    """Path of the record, relative to the replayed directory or archive"""
+    fen: str
+    """FEN after the last valid move"""
+    plies: int
+    """Number of valid moves replayed"""
+    winner: Optional[Side]
+    """Side that checkmated the other, None if the game is not over"""
+    illegalPly: Optional[int]
+    """Number of the first move that could not be made counted from 1, None if every move is valid"""
+    error: Optional[str] = None
+    """Reason the first illegal move could not be made"""
+
+    @property
+    def isValid(self) -> bool:
+        """Check if every move of the record could be made"""
+        return self.illegalPly is None
+
+    @property
+    def result(self) -> str:
+        """Result in PGN notation, ``*`` if the game is not over"""
+        if self.winner is None:
+            return "*"
+        return "1-0" if self.winner == Side.RED else "0-1"
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    """Outcome of replaying many game records with throughput statistics"""
+    games: List[GameResult]
+    """Result of each game in the order the records were read"""
+    seconds: float
+    """Elapsed wall clock time"""
+
+    @property
+    def plies(self) -> int:
+        """Number of valid moves replayed"""
+        return sum(game.plies for game in self.games)
+
+    @property
+    def invalidGames(self) -> List[GameResult]:
+        """Games with an illegal move"""
+        return [game for game in self.games if not game.isValid]
+
+    @property
+    def gamesPerSecond(self) -> float:
+        """Replayed games per second"""
+        return len(self.games) / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def pliesPerSecond(self) -> float:
+        """Replayed valid moves per second"""
+        return self.plies / self.seconds if self.seconds > 0 else 0.0
+
+
+def replayGame(gameRecordPath: Path, intermission: Optional[int] = None, game: Optional[XiangqiEngine] = None) -> XiangqiEngine:
     """Replay a Xiangqi game
 
     :param gameRecordPath: File with moves made during the game
     :type gameRecordPath: Path
     :param intermission: Time between moves, defaults to None
     :type intermission: Optional[int], optional
+    :param game: Engine in start state to replay the game on, defaults to None which creates a new engine
+    :type game: Optional[XiangqiEngine], optional
     :raises InvalidMove: Could not convert notation to move
     :return: Engine after replayed moves
     :rtype: XiangqiEngine
     """
-    game = XiangqiEngine()
+    if game is None:
+        game = XiangqiEngine()
     with gameRecordPath.open(mode="r") as gameRecordFile:
         for turn, notation in enumerate(gameRecordFile):
             logging.info(f"\nTurn {turn+1} - {game.currentSide}")
@@ -34,12 +105,120 @@ def replayGame(gameRecordPath: Path, intermission: Optional[int] = None) -> Xian
     return game
 
 
-if __name__ == "__main__":
+def replayGames(source: Path, processes: int = 1, chunkSize: int = 16, compact: bool = True) -> ReplayResult:
+    """Replay and validate every game record of a directory or archive, without logging or intermission.
+    Records are streamed to a process pool, so archives larger than memory can be validated
+
+    :param source: Directory searched recursively, zip or tar archive, or a single record with the :data:`GAME_RECORD_SUFFIX` suffix
+    :type source: Path
+    :param processes: Number of processes replaying the games, defaults to 1 which replays in the calling process
+    :type processes: int, optional
+    :param chunkSize: Number of records sent to a process at once, defaults to 16
+    :type chunkSize: int, optional
+    :param compact: Replay on a :class:`CompactBoard`, defaults to True
+    :type compact: bool, optional
+    :raises ValueError: Number of processes or chunk size is less than 1
+    :raises FileNotFoundError: Source does not exist
+    :return: Result of each game with throughput statistics
+    :rtype: ReplayResult
+    """
+    if processes < 1:
+        raise ValueError(f"Number of processes must be at least 1, was {processes}")
+    if chunkSize < 1:
+        raise ValueError(f"Chunk size must be at least 1, was {chunkSize}")
+    if not source.exists():
+        raise FileNotFoundError(f"Game records not found at {source}")
+
+    startTime = perf_counter()
+    records = ((name, notations, compact) for name, notations in readGameRecords(source))
+    if processes == 1:
+        games = [_replayRecord(record) for record in records]
+    else:
+        with Pool(processes) as pool:
+            games = list(pool.imap(_replayRecord, records, chunksize=chunkSize))
+    return ReplayResult(games, perf_counter() - startTime)
+
+
+def readGameRecords(source: Path) -> Iterator[Tuple[str, List[str]]]:
+    """Read game records one by one from a directory, archive or a single record
+
+    :param source: Directory searched recursively, zip or tar archive, or a single record with the :data:`GAME_RECORD_SUFFIX` suffix
+    :type source: Path
+    :return: Name and move notations of each record, ordered by name within directories
+    :rtype: Iterator[Tuple[str, List[str]]]
+    """
+    if source.is_dir():
+        for path in sorted(source.rglob(f"*{GAME_RECORD_SUFFIX}")):
+            yield str(path.relative_to(source)), _notations(path.read_text())
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.endswith(GAME_RECORD_SUFFIX):
+                    yield info.filename, _notations(archive.read(info).decode())
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                recordFile = archive.extractfile(member) if member.isfile() and member.name.endswith(GAME_RECORD_SUFFIX) else None
+                if recordFile is not None:
+                    yield member.name, _notations(recordFile.read().decode())
+    else:
+        yield source.name, _notations(source.read_text())
+
+
+def _notations(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if len(line.strip()) > 0]
+
+
+def _replayRecord(record: Tuple[str, List[str], bool]) -> GameResult:
+    name, notations, compact = record
+    game = XiangqiEngine(compact=compact, cacheSize=0)
+    for ply, notation in enumerate(notations, start=1):
+        error = None
+        start, end = fenMoveNotationToMove(game.board, game.currentSide, notation)
+        if start is None or end is None:
+            error = f"Could not convert notation {notation} to move"
+        else:
+            try:
+                game.move(start, end)
+            except InvalidMove as invalidMove:
+                error = str(invalidMove)
+            except (IndexError, KeyError, ValueError) as exception:
+                # NOTE: Notations of a piece that is not on the board can convert to out of bounds positions
+                error = f"Invalid move {notation}: {exception}"
+        if error is not None:
+            return GameResult(name, game.fen, ply - 1, game.winner, ply, error)
+    return GameResult(name, game.fen, len(notations), game.winner, None)
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Replay and validate game records from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code, 1 if a game has an illegal move
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Replay and validate Xiangqi game records")
+    parser.add_argument("source", type=Path, help="game record, directory of records, or zip or tar archive of records")
+    parser.add_argument("--processes", type=int, default=1, help="replay games in a process pool of this size (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="number of records sent to a process at once (default: %(default)s)")
+    parser.add_argument("--dict", action="store_true", help="use the dictionary board instead of the compact board")
+    parser.add_argument("--games", action="store_true", help="print the result of every game, not only the invalid ones")
+    args = parser.parse_args(arguments)
+
     logging.basicConfig(level=logging.INFO, format="")
-    try:
-        gameRecord = Path(input("Gamerecord path: "))
-        replayGame(gameRecord, 0)
-    except InvalidMove as error:
-        logging.info(error)
-    except Exception:
-        logging.exception("An error occurred during game replay")
+
+    result = replayGames(args.source, processes=args.processes, chunkSize=args.chunk_size, compact=not args.dict)
+    for game in result.games:
+        if args.games or not game.isValid:
+            illegal = "" if game.isValid else f"  illegal ply {game.illegalPly}: {game.error}"
+            logging.info(f"{game.name}  {game.result}  plies {game.plies}  {game.fen}{illegal}")
+    logging.info(
+        f"games {len(result.games)}  invalid {len(result.invalidGames)}  plies {result.plies}  time {result.seconds:.3f} s  "
+        f"{result.gamesPerSecond:.1f} games/s  {result.pliesPerSecond:.0f} plies/s"
+    )
+    return 0 if len(result.invalidGames) == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
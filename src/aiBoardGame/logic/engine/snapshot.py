@@ -0,0 +1,64 @@
+"""Immutable snapshots of engine positions, cheap to create and to send to other threads and processes"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Type
+
+from aiBoardGame.logic.engine.auxiliary import Board, Position, Side
+from aiBoardGame.logic.engine.boardCodec import boardFromBytes
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, PIECE_TO_CODE
+from aiBoardGame.logic.engine.pieces import General
+from aiBoardGame.logic.engine.tables import POSITIONS, SQUARE_COUNT
+
+
+@dataclass(frozen=True)
+class PositionSnapshot:
+    """Position of an engine without its move history, see :meth:`~aiBoardGame.logic.engine.XiangqiEngine.snapshot`.
+    Holds only immutable builtins, so it can be shared between threads and pickled for processes"""
+    squares: bytes
+    """Signed piece code of every square indexed by square index"""
+    side: Side
+    """Side to move"""
+    hash: int
+    """64 bit Zobrist hash of the position and the side to move"""
+    ply: int
+    """Number of plies made before the snapshot was taken, only used for the full move number of the FEN"""
+
+    def __post_init__(self) -> None:
+        if len(self.squares) != SQUARE_COUNT:
+            raise ValueError(f"Snapshot must have {SQUARE_COUNT} squares, had {len(self.squares)}")
+
+    @property
+    def codes(self) -> array:
+        """Piece codes of the squares as a signed array, see :attr:`~aiBoardGame.logic.engine.XiangqiEngine.squares`"""
+        return array("b", self.squares)
+
+    @property
+    def generals(self) -> Dict[Side, Position]:
+        """Positions of the generals
+
+        :raises ValueError: A side has no general
+        """
+        codes = self.codes
+        generalCode = PIECE_TO_CODE[General]
+        try:
+            return {side: POSITIONS[codes.index(generalCode * side)] for side in Side}
+        except ValueError as error:
+            raise ValueError("Both sides must have a general in the snapshot") from error
+
+    @property
+    def fen(self) -> str:
+        """FEN of the position, equal to the engine's FEN when the snapshot was taken"""
+        return f"{CompactBoard.fromSquares(self.squares).fen} {self.side.fen} - - 0 {self.ply//2+1}"
+
+    def toBoard(self, boardType: Type[Board] = Board) -> Board:
+        """Create a new board with the pieces of the snapshot
+
+        :param boardType: Board class to create, defaults to Board
+        :type boardType: Type[Board], optional
+        :return: Board that is not shared with the snapshot
+        :rtype: Board
+        """
+        return boardFromBytes(self.squares, boardType)
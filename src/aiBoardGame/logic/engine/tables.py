@@ -0,0 +1,178 @@
+"""Move tables of every piece type, precomputed for each side and square on import.
+Squares are flat indices of positions, see :func:`squareIndex`. Every per-square table
+can also be indexed with :data:`OFF_BOARD`, which has no moves"""
+
+from typing import Callable, Dict, List, Tuple, TypeVar, Union
+
+from aiBoardGame.logic.engine.auxiliary import Board, Position, Side
+
+
+FILE_COUNT = Board.fileCount
+"""Number of files on board"""
+RANK_COUNT = Board.rankCount
+"""Number of ranks on board"""
+SQUARE_COUNT = FILE_COUNT * RANK_COUNT
+"""Number of squares on board"""
+OFF_BOARD = SQUARE_COUNT
+"""Square index of every position out of bounds"""
+
+T = TypeVar("T")
+
+PALACE_FILE_BOUNDS = ((FILE_COUNT - 3) // 2, (FILE_COUNT + 3) // 2)
+"""File bounds of the palaces"""
+PALACE_RANK_BOUNDS = (0, 3)
+"""Rank bounds of the palace from the owning side's view"""
+OWN_HALF_RANK_BOUNDS = (0, RANK_COUNT // 2)
+"""Rank bounds of a side's half from its own view"""
+
+POSITIONS: Tuple[Position, ...] = tuple(Position(square % FILE_COUNT, square // FILE_COUNT) for square in range(SQUARE_COUNT))
+"""Position of each square"""
+
+ORTHOGONALS: Tuple[Tuple[int, int], ...] = ((1, 0), (-1, 0), (0, 1), (0, -1))
+"""Orthogonal directions, the order of :data:`RAYS`"""
+DIAGONALS: Tuple[Tuple[int, int], ...] = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+"""Diagonal directions"""
+
+
+def squareIndex(position: Union[Position, Tuple[int, int]]) -> int:
+    """Get flat square index of a position
+
+    :param position: Position on board
+    :type position: Union[Position, Tuple[int, int]]
+    :return: Square index, :data:`OFF_BOARD` if position is out of bounds
+    :rtype: int
+    """
+    file, rank = position
+    if 0 <= file < FILE_COUNT and 0 <= rank < RANK_COUNT:
+        return rank * FILE_COUNT + file
+    return OFF_BOARD
+
+
+def _offset(square: int, fileDelta: int, rankDelta: int) -> int:
+    file, rank = POSITIONS[square]
+    return squareIndex((file + fileDelta, rank + rankDelta))
+
+
+def _relativeRank(side: Side, square: int) -> int:
+    rank = POSITIONS[square].rank
+    return rank if side == Side.RED else RANK_COUNT - rank - 1
+
+
+def _isInPalace(side: Side, square: int) -> bool:
+    return PALACE_FILE_BOUNDS[0] <= POSITIONS[square].file < PALACE_FILE_BOUNDS[1] and PALACE_RANK_BOUNDS[0] <= _relativeRank(side, square) < PALACE_RANK_BOUNDS[1]
+
+
+def _isInOwnHalf(side: Side, square: int) -> bool:
+    return OWN_HALF_RANK_BOUNDS[0] <= _relativeRank(side, square) < OWN_HALF_RANK_BOUNDS[1]
+
+
+PALACE: Dict[Side, Tuple[bool, ...]] = {side: tuple(_isInPalace(side, square) for square in range(SQUARE_COUNT)) + (False,) for side in Side}
+"""Palace mask of each side, indexable with :data:`OFF_BOARD`"""
+OWN_HALF: Dict[Side, Tuple[bool, ...]] = {side: tuple(_isInOwnHalf(side, square) for square in range(SQUARE_COUNT)) + (False,) for side in Side}
+"""Own half mask of each side, indexable with :data:`OFF_BOARD`"""
+
+
+def _leaps(deltas: Tuple[Tuple[int, int], ...], mask: Tuple[bool, ...]) -> Tuple[Tuple[int, ...], ...]:
+    table = []
+    for square in range(SQUARE_COUNT):
+        ends = (_offset(square, *delta) for delta in deltas)
+        table.append(tuple(end for end in ends if end != OFF_BOARD and mask[end]))
+    return tuple(table) + ((),)
+
+
+def _blockableLeaps(deltas: Tuple[Tuple[int, int], ...], mask: Tuple[bool, ...]) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    table = []
+    for square in range(SQUARE_COUNT):
+        moves = []
+        for fileDelta, rankDelta in deltas:
+            end = _offset(square, fileDelta, rankDelta)
+            if end != OFF_BOARD and mask[end]:
+                # NOTE: The blocking square is one step from start towards the longer side of the leap
+                block = _offset(square, int(fileDelta / 2), int(rankDelta / 2))
+                moves.append((end, block))
+        table.append(tuple(moves))
+    return tuple(table) + ((),)
+
+
+def _soldierMoves(side: Side) -> Tuple[Tuple[int, ...], ...]:
+    table = []
+    for square in range(SQUARE_COUNT):
+        deltas = [(0, int(side))] if OWN_HALF[side][square] else [(0, int(side)), (1, 0), (-1, 0)]
+        table.append(tuple(end for end in (_offset(square, *delta) for delta in deltas) if end != OFF_BOARD))
+    return tuple(table) + ((),)
+
+
+def _rays(fileDelta: int, rankDelta: int) -> Tuple[Tuple[int, ...], ...]:
+    table = []
+    for square in range(SQUARE_COUNT):
+        ray: List[int] = []
+        end = square
+        while (end := _offset(end, fileDelta, rankDelta)) != OFF_BOARD:
+            ray.append(end)
+        table.append(tuple(ray))
+    return tuple(table) + ((),)
+
+
+_WHOLE_BOARD = (True,) * SQUARE_COUNT + (False,)
+_HORSE_DELTAS = ((1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1))
+_ELEPHANT_DELTAS = ((2, 2), (-2, 2), (2, -2), (-2, -2))
+
+GENERAL_MOVES: Dict[Side, Tuple[Tuple[int, ...], ...]] = {side: _leaps(ORTHOGONALS, PALACE[side]) for side in Side}
+"""Target squares of a general on each square, without the flying general move"""
+ADVISOR_MOVES: Dict[Side, Tuple[Tuple[int, ...], ...]] = {side: _leaps(DIAGONALS, PALACE[side]) for side in Side}
+"""Target squares of an advisor on each square"""
+ELEPHANT_MOVES: Dict[Side, Tuple[Tuple[Tuple[int, int], ...], ...]] = {side: _blockableLeaps(_ELEPHANT_DELTAS, OWN_HALF[side]) for side in Side}
+"""Target and eye squares of an elephant on each square"""
+HORSE_MOVES: Dict[Side, Tuple[Tuple[Tuple[int, int], ...], ...]] = {side: _blockableLeaps(_HORSE_DELTAS, _WHOLE_BOARD) for side in Side}
+"""Target and leg squares of a horse on each square"""
+SOLDIER_MOVES: Dict[Side, Tuple[Tuple[int, ...], ...]] = {side: _soldierMoves(side) for side in Side}
+"""Target squares of a soldier on each square"""
+
+RAYS: Tuple[Tuple[Tuple[int, ...], ...], ...] = tuple(zip(*(_rays(*delta) for delta in ORTHOGONALS)))
+"""Squares in each orthogonal direction from each square ordered by distance, used by chariots and cannons"""
+FORWARD_RAYS: Dict[Side, Tuple[Tuple[int, ...], ...]] = {side: _rays(0, int(side)) for side in Side}
+"""Squares in front of each square from a side's view ordered by distance, used for the flying general move"""
+
+
+def _lineTable(valueOf: Callable[[int, Tuple[int, ...], int], T], default: T) -> Tuple[Tuple[T, ...], ...]:
+    table = [[default] * (SQUARE_COUNT + 1) for _ in range(SQUARE_COUNT + 1)]
+    for square in range(SQUARE_COUNT):
+        for ray in RAYS[square]:
+            for index, end in enumerate(ray):
+                table[square][end] = valueOf(square, ray, index)
+    return tuple(tuple(row) for row in table)
+
+
+DIRECTIONS: Tuple[Tuple[int, ...], ...] = _lineTable(lambda square, ray, index: ray[0] - square, 0)
+"""Square index step from a square towards another on the same file or rank, 0 if they are not on the same line"""
+BETWEEN: Tuple[Tuple[Tuple[int, ...], ...], ...] = _lineTable(lambda square, ray, index: ray[:index], ())
+"""Squares strictly between two squares on the same file or rank ordered from the first square, empty if they are not on the same line"""
+SAME_LINE: Tuple[Tuple[bool, ...], ...] = _lineTable(lambda square, ray, index: True, False)
+"""Whether two different squares are on the same file or rank"""
+
+
+def _inverse(moves: Tuple[Tuple[int, ...], ...]) -> Tuple[Tuple[int, ...], ...]:
+    table: List[List[int]] = [[] for _ in range(SQUARE_COUNT + 1)]
+    for square in range(SQUARE_COUNT):
+        for end in moves[square]:
+            table[end].append(square)
+    return tuple(tuple(starts) for starts in table)
+
+
+HORSE_ATTACKS: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple((start, leg) for start in range(SQUARE_COUNT) for end, leg in HORSE_MOVES[Side.RED][start] if end == square)
+    for square in range(SQUARE_COUNT)
+) + ((),)
+"""Squares and leg squares of horses that attack each square"""
+SOLDIER_ATTACKS: Dict[Side, Tuple[Tuple[int, ...], ...]] = {side: _inverse(SOLDIER_MOVES[side]) for side in Side}
+"""Squares of soldiers of each side that attack each square"""
+LEG_HORSES: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(start for start in range(SQUARE_COUNT) for _, leg in HORSE_MOVES[Side.RED][start] if leg == square)
+    for square in range(SQUARE_COUNT)
+) + ((),)
+"""Squares of horses that have each square as a leg"""
+EYE_ELEPHANTS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(sorted({start for side in Side for start in range(SQUARE_COUNT) for _, eye in ELEPHANT_MOVES[side][start] if eye == square}))
+    for square in range(SQUARE_COUNT)
+) + ((),)
+"""Squares of elephants of either side that have each square as an eye"""
@@ -0,0 +1,231 @@
+"""Tactical queries on the current position of an engine: attackers of a square, static exchange evaluation of captures,
+hanging pieces and material threats. Everything is read from the attack map and the attack tables, no move is made on the engine"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional
+
+from aiBoardGame.logic.engine.auxiliary import Position, Side
+from aiBoardGame.logic.engine.compactBoard import EMPTY, PIECE_TO_CODE
+from aiBoardGame.logic.engine.evaluation import PIECE_VALUES
+from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.tables import POSITIONS, SQUARE_COUNT, RAYS, FORWARD_RAYS, HORSE_ATTACKS, SOLDIER_ATTACKS, ELEPHANT_MOVES, ADVISOR_MOVES, GENERAL_MOVES, PALACE, OWN_HALF
+
+if TYPE_CHECKING:
+    from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+_GENERAL = PIECE_TO_CODE[General]
+_ADVISOR = PIECE_TO_CODE[Advisor]
+_ELEPHANT = PIECE_TO_CODE[Elephant]
+_HORSE = PIECE_TO_CODE[Horse]
+_CHARIOT = PIECE_TO_CODE[Chariot]
+_CANNON = PIECE_TO_CODE[Cannon]
+_SOLDIER = PIECE_TO_CODE[Soldier]
+
+GENERAL_VALUE = 10000
+"""Exchange value of the general, it is never captured, the value only makes it the last piece to recapture with"""
+
+# NOTE: Indexed by the absolute value of a piece code
+_VALUES = (0,) + tuple(GENERAL_VALUE if piece is General else PIECE_VALUES[piece] for piece in PIECE_TO_CODE)
+
+
+@dataclass(frozen=True)
+class Threat:
+    """Capture that wins material according to static exchange evaluation"""
+    move: int
+    """Encoded move of the capture"""
+    gain: int
+    """Material won by the capturing side, always positive"""
+
+    @property
+    def start(self) -> Position:
+        """Position of the capturing piece"""
+        return POSITIONS[self.move >> 8]
+
+    @property
+    def end(self) -> Position:
+        """Position of the captured piece"""
+        return POSITIONS[self.move & 0xFF]
+
+
+class Tactics:
+    """Tactical analysis of the current position of an engine, answers follow the moves made on the engine.
+    Pins are ignored like in any static exchange evaluation, a pinned piece still attacks and recaptures"""
+
+    def __init__(self, engine: XiangqiEngine) -> None:
+        """
+        :param engine: Engine to analyse
+        :type engine: XiangqiEngine
+        """
+        self.engine = engine
+        """Analysed engine"""
+
+    def attackers(self, square: int, side: Side) -> List[int]:
+        """Find the pieces of a side that attack a square, cannons through their screen, horses only with a free leg
+        and the flying general if the square holds the enemy general
+
+        :param square: Square index
+        :type square: int
+        :param side: Attacking side
+        :type side: Side
+        :return: Square indices of the attacking pieces, ordered from the least valuable
+        :rtype: List[int]
+        """
+        squares = self.engine.squares
+        return sorted(squareAttackers(squares, square, side), key=lambda start: _VALUES[abs(squares[start])])
+
+    def see(self, move: int) -> int:
+        """Static exchange evaluation of a move: the material the moving side wins if both sides keep recapturing on the end square
+        with their least valuable attacker and either side may stop when recapturing would lose material.
+        Pieces that recapture uncover the chariots and cannons behind them, and free the legs of horses
+
+        :param move: Encoded move of the side to move or the opponent
+        :type move: int
+        :raises ValueError: Start square of the move is empty
+        :return: Material won, negative if the moved piece is lost for less, 0 for a quiet move to a safe square
+        :rtype: int
+        """
+        start, end = move >> 8, move & 0xFF
+        squares = self.engine.squares
+        if squares[start] == EMPTY:
+            raise ValueError(f"No piece to move on {POSITIONS[start]}")
+        return _staticExchange(array("b", squares), start, end)
+
+    def threats(self, side: Optional[Side] = None) -> List[Threat]:
+        """Find the captures of a side that win material
+
+        :param side: Capturing side, defaults to None which means the opponent of the side to move,
+            so the captures threatened by the last move
+        :type side: Optional[Side], optional
+        :return: Winning captures ordered by decreasing gain, captures of the general are not threats but checks
+        :rtype: List[Threat]
+        """
+        engine = self.engine
+        side = engine.currentSide.opponent if side is None else side
+        squares = engine.squares
+        attackMap = engine._attackMap  # pylint: disable=protected-access
+        threats = []
+        scratch = array("b", squares)
+        for start in range(SQUARE_COUNT):
+            if squares[start] * side <= 0:
+                continue
+            for end in attackMap.pieceAttacks(start):
+                code = squares[end]
+                if code * side >= 0 or code == -_GENERAL * side:
+                    continue
+                # NOTE: Attack counts are not enough to skip the exchange of an undefended piece,
+                # the capturing piece can uncover a defending chariot or cannon or free the leg of a defending horse
+                gain = _staticExchange(scratch, start, end)
+                scratch[:] = squares
+                if gain > 0:
+                    threats.append(Threat(start << 8 | end, gain))
+        threats.sort(key=lambda threat: -threat.gain)
+        return threats
+
+    def hangingPieces(self, side: Side) -> List[Position]:
+        """Find the pieces of a side that the opponent can win material by capturing, unprotected attacked pieces
+        and pieces attacked by less valuable ones
+
+        :param side: Side owning the pieces
+        :type side: Side
+        :return: Positions of the hanging pieces, ordered from the one losing the most material
+        :rtype: List[Position]
+        """
+        hanging: List[Position] = []
+        for threat in self.threats(side.opponent):
+            if threat.end not in hanging:
+                hanging.append(threat.end)
+        return hanging
+
+
+def squareAttackers(squares: array, target: int, side: int) -> List[int]:  # pylint: disable=too-many-branches
+    """Find the pieces of a side that attack a square on a signed piece code array, it can be a scratch copy of the board
+
+    :param squares: Signed piece code of every square, see :attr:`~aiBoardGame.logic.engine.attackMap.AttackMap.squares`
+    :type squares: array
+    :param target: Square index of the attacked square
+    :type target: int
+    :param side: Attacking side
+    :type side: int
+    :return: Square indices of the attacking pieces in scan order
+    :rtype: List[int]
+    """
+    attackers = []
+    chariot, cannon, general = _CHARIOT * side, _CANNON * side, _GENERAL * side
+    for ray in RAYS[target]:
+        isScreened = False
+        for square in ray:
+            code = squares[square]
+            if code == EMPTY:
+                continue
+            if isScreened:
+                if code == cannon:
+                    attackers.append(square)
+                break
+            if code == chariot:
+                attackers.append(square)
+            isScreened = True
+    horse = _HORSE * side
+    for start, leg in HORSE_ATTACKS[target]:
+        if squares[start] == horse and squares[leg] == EMPTY:
+            attackers.append(start)
+    soldier = _SOLDIER * side
+    for start in SOLDIER_ATTACKS[side][target]:
+        if squares[start] == soldier:
+            attackers.append(start)
+    if OWN_HALF[side][target]:
+        elephant = _ELEPHANT * side
+        for start, eye in ELEPHANT_MOVES[side][target]:
+            if squares[start] == elephant and squares[eye] == EMPTY:
+                attackers.append(start)
+    if PALACE[side][target]:
+        advisor = _ADVISOR * side
+        for start in ADVISOR_MOVES[side][target]:
+            if squares[start] == advisor:
+                attackers.append(start)
+        for start in GENERAL_MOVES[side][target]:
+            if squares[start] == general:
+                attackers.append(start)
+    elif squares[target] == -general:
+        for square in FORWARD_RAYS[-side][target]:
+            if squares[square] != EMPTY:
+                if squares[square] == general:
+                    attackers.append(square)
+                break
+    return attackers
+
+
+def _leastValuableAttacker(squares: array, target: int, side: int) -> Optional[int]:
+    attackers = squareAttackers(squares, target, side)
+    if len(attackers) == 0:
+        return None
+    return min(attackers, key=lambda start: _VALUES[abs(squares[start])])
+
+
+def _staticExchange(squares: array, start: int, end: int) -> int:
+    # NOTE: The squares are modified, gains[depth] is the material won by the side making the capture at depth if the exchange stops after it
+    side = 1 if squares[start] > 0 else -1
+    gains = [_VALUES[abs(squares[end])]]
+    onTarget = _VALUES[abs(squares[start])]
+    squares[end], squares[start] = squares[start], EMPTY
+    side = -side
+    while True:
+        attacker = _leastValuableAttacker(squares, end, side)
+        if attacker is None:
+            break
+        code, captured = squares[attacker], squares[end]
+        squares[end], squares[attacker] = code, EMPTY
+        # NOTE: The general may only recapture on an undefended square, it is checked after the general left its square,
+        # which can uncover a chariot or cannon behind it
+        if code == _GENERAL * side and len(squareAttackers(squares, end, -side)) > 0:
+            squares[end], squares[attacker] = captured, code
+            break
+        gains.append(onTarget - gains[-1])
+        onTarget = _VALUES[code * side]
+        side = -side
+    for depth in range(len(gains) - 1, 0, -1):
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+    return gains[0]
@@ -5,7 +5,7 @@
 import re
 from math import floor
 from collections import defaultdict
-from typing import Dict, Literal, Optional, Tuple, Union, overload, Iterable, List, TypeVar, Callable
+from typing import Dict, Literal, Optional, Tuple, Type, Union, overload, Iterable, List, TypeVar, Callable
 
 from aiBoardGame.logic.engine.auxiliary import Board, Delta, Position, Side
 from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier, FEN_ABBREVIATION_TO_PIECE
@@ -51,13 +51,15 @@ class FontFormat:
     ENDC = "\033[0m"
 
 
-def createXiangqiBoard() -> Tuple[Board, Dict[Side, Position]]:
+def createXiangqiBoard(boardType: Type[Board] = Board) -> Tuple[Board, Dict[Side, Position]]:
     """Load an empty Xiangqi board with starting pieces
 
+    :param boardType: Board implementation to use, defaults to Board
+    :type boardType: Type[Board], optional
     :return: Xiangqi board and general positions
     :rtype: Tuple[Board, Dict[Side, Position]
     """
-    board = Board()
+    board = boardType()
 
     uniquePieces = [Chariot, Horse, Elephant, Advisor, General]
     for rank, side in [(Board.rankBounds[0], Side.RED), (Board.rankBounds[1]-1, Side.BLACK)]:
@@ -101,9 +103,9 @@ def fenMoveNotationToMove(board: Board, side: Side, notation: str) -> Union[Tupl
     try:
         notationRegEx = re.match(r"(?P<tandem>[+-])?(?P<piece>\w)(?P<formerFile>\d)?(?P<direction>[+-=.,])(?P<newFileOrDeltaRank>\d)", notation)
         if notationRegEx is None:
-            return None
+            return None, None
         if notationRegEx["piece"] is not None and (notationRegEx["piece"].upper() not in FEN_ABBREVIATION_TO_PIECE or not ((side == Side.RED and notationRegEx["piece"].isupper()) or (side == Side.BLACK and notationRegEx["piece"].islower()))):
-            return None
+            return None, None
 
         start, end = None, None
         if notationRegEx["piece"] is not None:
@@ -147,11 +149,13 @@ def fenMoveNotationToMove(board: Board, side: Side, notation: str) -> Union[Tupl
         return None, None
 
 
-def fenToBoard(fenStr: str) -> Board:
+def fenToBoard(fenStr: str, boardType: Type[Board] = Board) -> Board:
     """Convert FEN to a board
 
     :param fenStr: FEN
     :type fenStr: str
+    :param boardType: Board implementation to use, defaults to Board
+    :type boardType: Type[Board], optional
     :raises ValueError: Invalid game FEN
     :raises ValueError: Invalid board FEN
     :return: Board from FEN
@@ -165,7 +169,7 @@ def fenToBoard(fenStr: str) -> Board:
     if len(boardFenParts) != 10:
         raise ValueError
 
-    board = Board()
+    board = boardType()
     for rank, rankFEN in enumerate(boardFenParts):
         file = 0
         for char in rankFEN:
@@ -1,15 +1,141 @@
 """Xiangqi rules"""
 
+from __future__ import annotations
+
 import logging
+from array import array
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Union, Optional
-from itertools import chain, product, starmap
-from collections import defaultdict
-
-from aiBoardGame.logic.engine.pieces import General, Cannon, Horse
-from aiBoardGame.logic.engine.move import MoveRecord, InvalidMove
-from aiBoardGame.logic.engine.auxiliary import Board, BoardEntity, Delta, Position, Side
-from aiBoardGame.logic.engine.utility import createXiangqiBoard, fenMoveNotationToMove
+from collections.abc import Mapping
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, FrozenSet, Generator, Iterator, List, Sequence, Set, Tuple, Type, Union, Optional
+
+from aiBoardGame.logic.engine.pieces import Piece, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.move import BoardMatch, InvalidMove, UndoStack, encodeMove
+from aiBoardGame.logic.engine.auxiliary import Board, Position, Side
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, CODE_TO_ENTITY, CODE_TO_PIECE, ENTITY_TO_CODE, EMPTY, PIECE_TO_CODE
+from aiBoardGame.logic.engine.positionCache import PositionCache
+from aiBoardGame.logic.engine.snapshot import PositionSnapshot
+from aiBoardGame.logic.engine.attackMap import AttackMap
+from aiBoardGame.logic.engine.evaluation import Evaluation, MATERIAL_SCORES, PIECE_VALUES, PLACEMENT_SCORES, activityScores, staticScores
+from aiBoardGame.logic.engine.repetition import RepetitionHistory
+from aiBoardGame.logic.engine.profiling import CACHED, CHECKS, GENERAL_SAFETY, PIN_FILTER, PINS, POSSIBLE_MOVES, EngineProfile
+from aiBoardGame.logic.engine.tables import POSITIONS, SQUARE_COUNT, squareIndex
+from aiBoardGame.logic.engine.zobrist import PIECE_KEYS, SIDE_KEY, squaresHash, zobristHash
+from aiBoardGame.logic.engine.utility import createXiangqiBoard, fenMoveNotationToMove, fenToBoard
+
+
+_INFLUENCES: Dict[Type[Piece], Callable[[int, int], bool]] = {
+    General: lambda fileDelta, rankDelta: fileDelta == 0 or abs(fileDelta) + abs(rankDelta) == 1,
+    Advisor: lambda fileDelta, rankDelta: abs(fileDelta) == abs(rankDelta) == 1,
+    Elephant: lambda fileDelta, rankDelta: abs(fileDelta) == abs(rankDelta) <= 2,
+    Horse: lambda fileDelta, rankDelta: (abs(fileDelta), abs(rankDelta)) in ((1, 2), (2, 1), (1, 0), (0, 1)),
+    Chariot: lambda fileDelta, rankDelta: fileDelta == 0 or rankDelta == 0,
+    Cannon: lambda fileDelta, rankDelta: fileDelta == 0 or rankDelta == 0,
+    Soldier: lambda fileDelta, rankDelta: abs(fileDelta) + abs(rankDelta) == 1
+}
+"""Checks if a piece's possible moves can change when a square at the given delta from it changes (ray, target, horse leg or elephant eye)"""
+
+
+def _influenceTable(influences: Callable[[int, int], bool]) -> Tuple[FrozenSet[int], ...]:
+    return tuple(
+        frozenset(square for square, position in enumerate(POSITIONS) if square == changed or influences(position.file - POSITIONS[changed].file, position.rank - POSITIONS[changed].rank))
+        for changed in range(SQUARE_COUNT)
+    )
+
+
+_INFLUENCED_SQUARES: Dict[int, Tuple[FrozenSet[int], ...]] = {
+    code: table for piece, table in ((piece, _influenceTable(influences)) for piece, influences in _INFLUENCES.items()) for code in (PIECE_TO_CODE[piece], -PIECE_TO_CODE[piece])
+}
+"""Squares of the pieces of a code whose possible moves can change when a square changes, including the changed square itself"""
+
+DEFAULT_CACHE_SIZE = 1024
+"""Default number of positions whose valid moves are cached"""
+DEFAULT_MIN_CONFIDENCE = 0.5
+"""Default minimum confidence of a board that :meth:`XiangqiEngine.update` accepts without an exact match, allows one misread square"""
+
+_GENERAL = PIECE_TO_CODE[General]
+_SOLDIER = PIECE_TO_CODE[Soldier]
+
+_CHASE_VALUES: Tuple[int, ...] = (0, *(PIECE_VALUES[CODE_TO_PIECE[code]] for code in range(1, len(CODE_TO_PIECE) + 1)))
+"""Value of each unsigned piece code, a piece attacking a more valuable one chases it even if it is protected"""
+
+
+def _boardSquares(board: Board) -> List[int]:
+    squares = [EMPTY] * SQUARE_COUNT
+    for position, boardEntity in board.pieces:
+        squares[squareIndex(position)] = ENTITY_TO_CODE[boardEntity]
+    return squares
+
+
+def _recordPhase(profile: EngineProfile, phase: str, startedAt: float) -> float:
+    # NOTE: Returns the end of the recorded call, so consecutive phases share one clock reading
+    endedAt = perf_counter()
+    profile.record(phase, endedAt - startedAt)
+    return endedAt
+
+
+class _LazyValidMoves(Mapping):
+    """Valid moves of a position whose ends are generated for each piece on first access and kept for the ply.
+    Checks and pins are calculated when the position is reached, iteration and length generate the moves of every piece"""
+
+    def __init__(self, engine: XiangqiEngine, generalSquare: int, pins: Dict[int, Set[int]], blocked: Set[int]) -> None:
+        self._engine = engine
+        self._hash = engine.hash
+        self._filter = (generalSquare, pins, blocked)
+        self._moves: Dict[int, List[int]] = {}
+        self._isComplete = False
+
+    def __getitem__(self, start: int) -> List[int]:
+        ends = self._moves.get(start)
+        if ends is None:
+            if self._isComplete:
+                raise KeyError(start)
+            ends = self._moves[start] = self._generate(start)
+        if len(ends) == 0:
+            raise KeyError(start)
+        return ends
+
+    def __iter__(self) -> Iterator[int]:
+        self._complete()
+        return iter(self._moves)
+
+    def __len__(self) -> int:
+        self._complete()
+        return len(self._moves)
+
+    def __bool__(self) -> bool:
+        # NOTE: Stops at the first piece with a valid move, so checking for the end of the game rarely generates every move
+        if any(len(ends) > 0 for ends in self._moves.values()):
+            return True
+        elif self._isComplete:
+            return False
+        for start in self._unvisited():
+            ends = self._moves[start] = self._generate(start)
+            if len(ends) > 0:
+                return True
+        self._complete()
+        return False
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self)})"
+
+    def _unvisited(self) -> List[int]:
+        return [square for square, code in enumerate(self._engine.squares[:SQUARE_COUNT]) if code * self._engine.currentSide > 0 and square not in self._moves]
+
+    def _generate(self, start: int) -> List[int]:
+        if self._engine.hash != self._hash:
+            raise RuntimeError("Cannot generate valid moves of a position the engine has left")
+        return self._engine._getValidEnds(start, *self._filter)  # pylint: disable=protected-access
+
+    def _complete(self) -> None:
+        if self._isComplete:
+            return
+        for start in self._unvisited():
+            self._moves[start] = self._generate(start)
+        # NOTE: Ordered by square, so iteration does not depend on which pieces were asked for first
+        self._moves = {start: self._moves[start] for start in sorted(self._moves) if len(self._moves[start]) > 0}
+        self._isComplete = True
 
 
 @dataclass(init=False)
@@ -21,18 +147,118 @@ class XiangqiEngine:
     """Stored positions of the generals"""
     currentSide: Side
     """Next that has to move"""
-    moveHistory: List[MoveRecord]
-    """Stored moves made by both sides"""
-
-    _checks: List[Position]
-    _pins: Dict[Position, List[Position]]
-    _validMoves: Dict[Position, List[Position]]
-
-    def __init__(self) -> None:
-        self.board, self.generals = createXiangqiBoard()
-        self.currentSide = Side.RED
-        self.moveHistory = []
-        self._calculateValidMoves()
+    verifyIncremental: bool
+    """Compare incrementally maintained moves with a full regeneration after every ply"""
+    positionCache: Optional[PositionCache[Tuple[List[int], Mapping[int, List[int]]]]]
+    """Checks and valid moves on square indices of recently seen positions keyed by position hash, None if caching is disabled"""
+    profile: Optional[EngineProfile]
+    """Measurements of the move generation phases, None if profiling is off, see :meth:`profiled`"""
+
+    # NOTE: Internal state is kept on square indices, positions are only used at the public interface
+    _checks: List[int]
+    _validMoves: Mapping[int, List[int]]
+    _incremental: bool
+    _lazy: bool
+    _possibleMoves: Dict[Side, Dict[int, List[int]]]
+    _hash: int
+    _material: int
+    _placement: int
+    _attackMap: AttackMap
+    _undoStack: UndoStack
+    _repetitions: RepetitionHistory
+    _successors: Tuple[Optional[int], Dict[int, int]]
+    _checkStack: List[List[int]]
+    _validMoveStack: List[Mapping[int, List[int]]]
+
+    def __init__(self, compact: bool = False, incremental: bool = False, verifyIncremental: bool = False, cacheSize: int = DEFAULT_CACHE_SIZE, lazy: bool = False) -> None:
+        """
+        :param compact: Store the board in a :class:`CompactBoard` for faster move generation, defaults to False
+        :type compact: bool, optional
+        :param incremental: Keep possible moves of each piece between plies and only regenerate the ones affected by the last move, defaults to False
+        :type incremental: bool, optional
+        :param verifyIncremental: Compare incrementally maintained moves with a full regeneration after every ply, defaults to False
+        :type verifyIncremental: bool, optional
+        :param cacheSize: Number of positions whose valid moves are cached, 0 disables caching, defaults to DEFAULT_CACHE_SIZE
+        :type cacheSize: int, optional
+        :param lazy: Generate the valid moves of a piece only when they are first needed in a ply, defaults to False
+        :type lazy: bool, optional
+        """
+        self._configure(incremental, verifyIncremental, cacheSize, lazy)
+        self._setPosition(*createXiangqiBoard(CompactBoard if compact else Board), Side.RED)
+
+    @classmethod
+    def fromFen(cls, fen: str, compact: bool = False, incremental: bool = False, verifyIncremental: bool = False, cacheSize: int = DEFAULT_CACHE_SIZE, lazy: bool = False) -> XiangqiEngine:
+        """Create engine with the position of a FEN, move history starts empty
+
+        :param fen: Game FEN, board FEN, or board FEN followed by the side to move, red moves first if side is not given
+        :type fen: str
+        :param compact: Store the board in a :class:`CompactBoard` for faster move generation, defaults to False
+        :type compact: bool, optional
+        :param incremental: Keep possible moves of each piece between plies and only regenerate the ones affected by the last move, defaults to False
+        :type incremental: bool, optional
+        :param verifyIncremental: Compare incrementally maintained moves with a full regeneration after every ply, defaults to False
+        :type verifyIncremental: bool, optional
+        :param cacheSize: Number of positions whose valid moves are cached, 0 disables caching, defaults to DEFAULT_CACHE_SIZE
+        :type cacheSize: int, optional
+        :param lazy: Generate the valid moves of a piece only when they are first needed in a ply, defaults to False
+        :type lazy: bool, optional
+        :raises ValueError: FEN does not have 1, 2 or 6 fields, or has an invalid side
+        :raises ValueError: Invalid board FEN
+        :raises ValueError: A side has no general
+        :return: Engine with the given position
+        :rtype: XiangqiEngine
+        """
+        fenParts = fen.split(" ")
+        if len(fenParts) not in (1, 2, 6):
+            raise ValueError(f"FEN must have 1, 2 or 6 fields, was {fen}")
+        if len(fenParts) > 1 and fenParts[1] not in (Side.RED.fen, Side.BLACK.fen):
+            raise ValueError(f"Invalid side {fenParts[1]} in {fen}")
+        engine = cls(compact=compact, incremental=incremental, verifyIncremental=verifyIncremental, cacheSize=cacheSize, lazy=lazy)
+        try:
+            board = fenToBoard(fenParts[0], CompactBoard if compact else Board)
+        except ValueError as error:
+            raise ValueError(f"Invalid board FEN in {fen}") from error
+        generals = {boardEntity.side: position for position, boardEntity in board.pieces if boardEntity.piece == General}
+        if len(generals) != len(Side):
+            raise ValueError(f"Both sides must have a general in {fen}")
+        engine._setPosition(board, generals, Side.BLACK if len(fenParts) > 1 and fenParts[1] == Side.BLACK.fen else Side.RED)
+        return engine
+
+    @classmethod
+    def fromSnapshot(cls, snapshot: PositionSnapshot, compact: bool = False, incremental: bool = False, verifyIncremental: bool = False, cacheSize: int = DEFAULT_CACHE_SIZE, lazy: bool = False) -> XiangqiEngine:
+        """Create an independent engine with the position of a snapshot, move history starts empty.
+        Unlike :meth:`fromFen` no start position is set up first, only the snapshot's position is built
+
+        :param snapshot: Snapshot taken with :meth:`snapshot`, possibly in another thread or process
+        :type snapshot: PositionSnapshot
+        :param compact: Store the board in a :class:`CompactBoard` for faster move generation, defaults to False
+        :type compact: bool, optional
+        :param incremental: Keep possible moves of each piece between plies and only regenerate the ones affected by the last move, defaults to False
+        :type incremental: bool, optional
+        :param verifyIncremental: Compare incrementally maintained moves with a full regeneration after every ply, defaults to False
+        :type verifyIncremental: bool, optional
+        :param cacheSize: Number of positions whose valid moves are cached, 0 disables caching, defaults to DEFAULT_CACHE_SIZE
+        :type cacheSize: int, optional
+        :param lazy: Generate the valid moves of a piece only when they are first needed in a ply, defaults to False
+        :type lazy: bool, optional
+        :raises ValueError: A side has no general
+        :return: Engine with the snapshot's position
+        :rtype: XiangqiEngine
+        """
+        generals = snapshot.generals
+        engine = cls.__new__(cls)
+        engine._configure(incremental, verifyIncremental, cacheSize, lazy)
+        engine._setPosition(snapshot.toBoard(CompactBoard if compact else Board), generals, snapshot.side)
+        return engine
+
+    def snapshot(self) -> PositionSnapshot:
+        """Capture the current position in an immutable, picklable object.
+        Only the squares are copied, the move history and cached moves stay with the engine
+
+        :return: Snapshot to recreate the position with :meth:`fromSnapshot`
+        :rtype: PositionSnapshot
+        """
+        return PositionSnapshot(self._attackMap.squares.tobytes()[:SQUARE_COUNT], self.currentSide, self._hash, len(self._undoStack))
 
     @property
     def isCurrentPlayerChecked(self) -> bool:
@@ -41,21 +267,159 @@ class XiangqiEngine:
 
     @property
     def isOver(self) -> bool:
-        """Check if a side has checkmated the other"""
-        return len(self._validMoves) == 0
+        """Check if a side has checkmated the other, in lazy mode only moves up to the first valid one are generated"""
+        return not self._validMoves
+
+    @property
+    def validMoves(self) -> Dict[Position, List[Position]]:
+        """Valid moves of the current side for each piece that can move"""
+        return {POSITIONS[start]: [POSITIONS[end] for end in ends] for start, ends in self._validMoves.items()}
+
+    def validMovesOf(self, position: Union[Position, Tuple[int, int]]) -> List[Position]:
+        """Valid moves of a single piece, in lazy mode only the moves of this piece are generated
+
+        :param position: Position of the piece
+        :type position: Union[Position, Tuple[int, int]]
+        :return: End positions the piece can move to, empty if there is no piece of the current side or it cannot move
+        :rtype: List[Position]
+        """
+        return [POSITIONS[end] for end in self._validMoves.get(squareIndex(Position(*position)), ())]
 
     @property
     def winner(self) -> Optional[Side]:
         """Return winner side if the game is over"""
         return self.currentSide.opponent if self.isOver else None
 
+    @property
+    def isCompact(self) -> bool:
+        """Check if board is stored in a :class:`CompactBoard`"""
+        return isinstance(self.board, CompactBoard)
+
+    @property
+    def isIncremental(self) -> bool:
+        """Check if possible moves are maintained incrementally between plies"""
+        return self._incremental
+
+    @property
+    def isLazy(self) -> bool:
+        """Check if valid moves of a piece are only generated when they are first needed in a ply"""
+        return self._lazy
+
+    @property
+    def moveHistory(self) -> UndoStack:
+        """Stored moves made by both sides, :class:`MoveRecord` objects are built only when accessed"""
+        return self._undoStack
+
+    @property
+    def hash(self) -> int:
+        """64 bit Zobrist hash of the position and the side to move"""
+        return self._hash
+
+    @property
+    def squares(self) -> array:
+        """Signed piece code of every square indexed by square index, maintained for both board types, must not be modified"""
+        return self._attackMap.squares
+
+    @property
+    def repetitionCount(self) -> int:
+        """Number of times the current position with the same side to move has occurred since the start position, including now"""
+        return self._repetitions.count
+
+    @property
+    def isRepetition(self) -> bool:
+        """Check if the current position has occurred before"""
+        return self._repetitions.count > 1
+
+    @property
+    def isPerpetualCheck(self) -> bool:
+        """Check if the side that made the last move checked with every move since the current position first occurred"""
+        return self._repetitions.isPerpetual(byLastMover=True, chase=False)
+
+    @property
+    def isPerpetualChase(self) -> bool:
+        """Check if the side that made the last move chased with every move since the current position first occurred"""
+        return self._repetitions.isPerpetual(byLastMover=True, chase=True)
+
+    def isPerpetualCheckBy(self, side: Side) -> bool:
+        """Check if a side checked with every move since the current position first occurred
+
+        :param side: Side to judge
+        :type side: Side
+        :return: Current position is a repetition and every move of the side in between gave check
+        :rtype: bool
+        """
+        return self._repetitions.isPerpetual(byLastMover=side != self.currentSide, chase=False)
+
+    def isPerpetualChaseBy(self, side: Side) -> bool:
+        """Check if a side chased with every move since the current position first occurred.
+        A move chases if the moved piece newly attacks an enemy piece that is unprotected or more valuable than the attacker.
+        Generals and soldiers do not chase, soldiers that have not crossed the river and the general cannot be chased,
+        attacks discovered by moving a blocking piece are not counted
+
+        :param side: Side to judge
+        :type side: Side
+        :return: Current position is a repetition and every move of the side in between was a chase
+        :rtype: bool
+        """
+        return self._repetitions.isPerpetual(byLastMover=side != self.currentSide, chase=True)
+
+    @property
+    def score(self) -> int:
+        """Material and piece-square score from red's view, maintained incrementally, see :mod:`~aiBoardGame.logic.engine.evaluation`"""
+        return self._material + self._placement
+
+    def evaluate(self) -> Evaluation:
+        """Evaluate the current position statically, only mobility and general safety are calculated from scratch
+
+        :return: Evaluation terms from red's view
+        :rtype: Evaluation
+        """
+        return Evaluation(self._material, self._placement, *activityScores(self.board))
+
+    @contextmanager
+    def profiled(self, profile: Optional[EngineProfile] = None) -> Generator[EngineProfile, None, None]:
+        """Measure move generation phases while the context is active. Without profiling the only cost is a few checks of the profile per ply
+
+        :param profile: Profile to add measurements to, defaults to None which creates a new one
+        :type profile: Optional[EngineProfile], optional
+        :yield: Profile filled while the context is active
+        :rtype: Generator[EngineProfile, None, None]
+        """
+        previous = self.profile
+        self.profile = EngineProfile() if profile is None else profile
+        try:
+            yield self.profile
+        finally:
+            self.profile = previous
+
     def newGame(self) -> None:
-        """Start a new game instance
+        """Start a new game instance, cached positions are kept
         """
-        self.__init__()  # pylint: disable=unnecessary-dunder-call
+        self._setPosition(*createXiangqiBoard(CompactBoard if self.isCompact else Board), Side.RED)
+
+    def _configure(self, incremental: bool, verifyIncremental: bool, cacheSize: int, lazy: bool) -> None:
+        self.verifyIncremental = verifyIncremental
+        self.positionCache = PositionCache(cacheSize) if cacheSize > 0 else None
+        self._incremental = incremental
+        self._lazy = lazy
+        self.profile = None
+        self._undoStack = UndoStack()
+        self._successors = (None, {})
+
+    def _setPosition(self, board: Board, generals: Dict[Side, Position], side: Side) -> None:
+        self.board = board
+        self.generals = generals
+        self.currentSide = side
+        self._undoStack.clear()
+        self._checkStack = []
+        self._validMoveStack = []
+        self._possibleMoves = {side: {} for side in Side}
+        self._hash = zobristHash(self.board, self.currentSide)
+        self._material, self._placement = staticScores(self.board)
+        self._attackMap = AttackMap(self.board)
+        self._repetitions = RepetitionHistory(self._hash)
+        self._calculateValidMoves()
 
-    # TODO: Do not allow perpetual chasing and checking
-    # TODO: Calculate approximate values for each side
     def move(self, start: Union[Position, Tuple[int, int]], end: Union[Position, Tuple[int, int]]) -> None:
         """Move a piece on board. All possible and valid moves are generated between turns, given move has to be amongst them
 
@@ -72,193 +436,405 @@ class XiangqiEngine:
         if not isinstance(end, Position):
             end = Position(*end)
 
+        startSquare, endSquare = squareIndex(start), squareIndex(end)
         if self.isOver:
             raise InvalidMove(None, start, end, "Cannot move beacuse the game is already over, start a new game or undo last move")
         elif self.board[start] is None:
             raise InvalidMove(None, start, end, f"No piece found on {*start,}")
-        elif start not in self._validMoves or end not in self._validMoves[start]:
+        elif startSquare not in self._validMoves or endSquare not in self._validMoves[startSquare]:
             raise InvalidMove(self.board[start].piece, start, end)
 
-        self._move(start, end)
-        self.currentSide = self.currentSide.opponent
-        self._calculateValidMoves()
+        self.makeMove(encodeMove(startSquare, endSquare))
 
     def undoMove(self) -> None:
         """Undo last move made. Also removes it from the move history
+
+        :raises InvalidMove: No move was made since the start position
         """
-        self._undoMove()
-        self.currentSide = self.currentSide.opponent
-        self._calculateValidMoves()
+        if len(self._undoStack) == 0:
+            raise InvalidMove(None, None, None, "Cannot undo move, game is in start state")
+        self.unmakeMove()
 
-    def update(self, board: Board) -> None:
-        """Update board with a new board state if it is a valid transition
+    def makeMove(self, move: int) -> None:
+        """Make an encoded move without validation, intended for search where the move comes from the valid moves.
+        Checks and valid moves of the current position are stacked, so :meth:`unmakeMove` restores them without regeneration
 
-        :param board: New board state
-        :type board: Board
-        :raises InvalidMove: No piece were moved
-        :raises InvalidMove: Multiple piece were moved
-        :raises InvalidMove: Moved piece does not match with it's previous state
+        :param move: Move encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`
+        :type move: int
         """
-        selfPiecesAsSet = set(self.board.pieces)
-        otherPiecesAsSet = set(board.pieces)
+        self._checkStack.append(self._checks)
+        self._validMoveStack.append(self._validMoves)
+        start, end = move >> 8, move & 0xFF
+        attacksBefore = self._attackMap.pieceAttacks(start)
+        self._make(move, start, end)
+        if self._incremental:
+            self._invalidatePossibleMoves(start, end)
+        self.currentSide = self.currentSide.opponent
+        self._calculateValidMoves()
+        self._repetitions.push(self._hash, len(self._checks) > 0, self._isChase(end, attacksBefore))
 
-        selfDifference = list(selfPiecesAsSet - otherPiecesAsSet)
-        otherDifference = list(otherPiecesAsSet - selfPiecesAsSet)
+    def unmakeMove(self) -> None:
+        """Take back the last move made with :meth:`makeMove` or :meth:`move`
 
-        if len(selfDifference) == 0 and len(otherDifference) == 0:
-            raise InvalidMove(None, None, None, "Cannot update because no piece were moved")
-        elif not (1 <= len(selfDifference) <= 2 and len(otherDifference) == 1):
-            logging.error(selfDifference)
-            logging.error(otherDifference)
-            raise InvalidMove(None, None, None, "Cannot update because multiple piece were moved")
+        :raises IndexError: No move was made since the start position
+        """
+        move = self._unmake()
+        self._repetitions.pop()
+        if self._incremental:
+            self._invalidatePossibleMoves(move >> 8, move & 0xFF)
+        self._checks = self._checkStack.pop()
+        self._validMoves = self._validMoveStack.pop()
+
+    def isValidMove(self, move: int) -> bool:
+        """Check if an encoded move is amongst the valid moves of the current position
+
+        :param move: Move encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`
+        :type move: int
+        :return: Move can be made with :meth:`makeMove`
+        :rtype: bool
+        """
+        ends = self._validMoves.get(move >> 8)
+        return ends is not None and move & 0xFF in ends
 
-        end, movedBoardEntity = otherDifference[0]
-        start = None
-        for position, boardEntity in selfDifference:
-            if boardEntity == movedBoardEntity:
-                start = position
+    def perft(self, depth: int) -> int:
+        """Count leaf nodes of the legal move tree from the current position, moves are made and unmade on the engine itself
 
-        if start is None:
-            raise InvalidMove(None, None, None, "Moved piece does not match with it's previous state")
+        :param depth: Number of plies to search
+        :type depth: int
+        :raises ValueError: Depth is negative
+        :return: Number of positions reachable in exactly depth plies
+        :rtype: int
+        """
+        if depth < 0:
+            raise ValueError(f"Perft depth must not be negative, was {depth}")
+        return 1 if depth == 0 else self._perft(depth)
+
+    def divide(self, depth: int) -> Dict[Tuple[Position, Position], int]:
+        """Count leaf nodes of the legal move tree under each valid move of the current position
+
+        :param depth: Number of plies to search, including the divided move
+        :type depth: int
+        :raises ValueError: Depth is less than 1
+        :return: Number of leaf nodes for each valid move
+        :rtype: Dict[Tuple[Position, Position], int]
+        """
+        if depth < 1:
+            raise ValueError(f"Divide depth must be at least 1, was {depth}")
+        return {(POSITIONS[start], POSITIONS[end]): self._perftMove(encodeMove(start, end), depth - 1) for start, ends in list(self._validMoves.items()) for end in ends}
+
+    def isSquareAttacked(self, square: int, bySide: Side) -> bool:
+        """Check if a side attacks a square, answered from incrementally maintained attack counts
+
+        :param square: Square index, see :func:`~aiBoardGame.logic.engine.tables.squareIndex`
+        :type square: int
+        :param bySide: Attacking side
+        :type bySide: Side
+        :return: A piece of the side could capture on the square, the flying general counts only against the enemy general
+        :rtype: bool
+        """
+        return self._attackMap.isSquareAttacked(square, bySide)
 
-        self.move(start, end)
+    def matchBoard(self, board: Board) -> Optional[BoardMatch]:
+        """Find the valid move that results in an observed board. Exact matches are found by hash among the successors of the position,
+        otherwise the move with the fewest differing squares is searched, which tolerates misread squares
 
-    def _move(self, start: Position, end: Position) -> None:
-        self.moveHistory.append(MoveRecord.make(self.board, start, end))
-        self.board[end] = self.board[start]
-        self.board[start] = None
+        :param board: Observed board after a move
+        :type board: Board
+        :return: Nearest valid move, None if the board is unchanged or there are no valid moves
+        :rtype: Optional[BoardMatch]
+        """
+        observed = board.squares if isinstance(board, CompactBoard) else _boardSquares(board)
+        move = self._successorMoves().get(squaresHash(observed, self.currentSide.opponent))
+        if move is not None:
+            return BoardMatch(POSITIONS[move >> 8], POSITIONS[move & 0xFF], 0, 1.0)
+
+        squares = self._attackMap.squares
+        changedCount = sum(observed[square] != squares[square] for square in range(SQUARE_COUNT))
+        if changedCount == 0:
+            return None
+        best: Optional[Tuple[int, int]] = None
+        bestDistance = runnerUpDistance = SQUARE_COUNT + 1
+        # NOTE: A move only changes its start and end squares, so the distance is the changed count corrected on those two squares
+        for start, ends in self._validMoves.items():
+            movedCode = squares[start]
+            startDistance = changedCount + (observed[start] != EMPTY) - (observed[start] != movedCode)
+            for end in ends:
+                distance = startDistance + (observed[end] != movedCode) - (observed[end] != squares[end])
+                if distance < bestDistance:
+                    best, bestDistance, runnerUpDistance = (start, end), distance, bestDistance
+                elif distance < runnerUpDistance:
+                    runnerUpDistance = distance
+        if best is None:
+            return None
+        confidence = 1.0 if runnerUpDistance > SQUARE_COUNT else (runnerUpDistance - bestDistance) / (runnerUpDistance + bestDistance)
+        return BoardMatch(POSITIONS[best[0]], POSITIONS[best[1]], bestDistance, confidence)
+
+    def update(self, board: Board, minConfidence: float = DEFAULT_MIN_CONFIDENCE) -> BoardMatch:
+        """Update board with a new board state by making the valid move nearest to it, see :meth:`matchBoard`
 
-        if self.board[end].piece == General:
-            self.generals[self.board[end].side] = end
+        :param board: New board state
+        :type board: Board
+        :param minConfidence: Minimum confidence of a move that does not match the board exactly, defaults to DEFAULT_MIN_CONFIDENCE
+        :type minConfidence: float, optional
+        :raises InvalidMove: Game is already over
+        :raises InvalidMove: No piece were moved
+        :raises InvalidMove: Board does not match any valid move with enough confidence
+        :return: Made move
+        :rtype: BoardMatch
+        """
+        if self.isOver:
+            raise InvalidMove(None, None, None, "Cannot update because the game is already over, start a new game or undo last move")
+        match = self.matchBoard(board)
+        if match is None:
+            raise InvalidMove(None, None, None, "Cannot update because no piece were moved")
+        elif match.distance > 0 and match.confidence < minConfidence:
+            raise InvalidMove(None, None, None, f"Cannot update because board does not match a valid move, nearest is {*match.start,} to {*match.end,} with {match.distance} differing squares")
+        elif match.distance > 0:
+            logging.warning(f"Board differs on {match.distance} squares from move {*match.start,} to {*match.end,}, confidence {match.confidence:.2f}")
+
+        self.makeMove(encodeMove(squareIndex(match.start), squareIndex(match.end)))
+        return match
+
+    def _successorMoves(self) -> Dict[int, int]:
+        # NOTE: Built on the first board update of a position instead of every ply, so search and perft do not pay for it
+        positionHash, successors = self._successors
+        if positionHash != self._hash:
+            squares = self._attackMap.squares
+            successors = {}
+            for start, ends in self._validMoves.items():
+                movedKeys = PIECE_KEYS[squares[start]]
+                startHash = self._hash ^ SIDE_KEY ^ movedKeys[start]
+                for end in ends:
+                    successors[startHash ^ movedKeys[end] ^ PIECE_KEYS[squares[end]][end]] = encodeMove(start, end)
+            self._successors = (self._hash, successors)
+        return successors
+
+    def _make(self, move: int, start: int, end: int) -> None:
+        board = self.board
+        if self.isCompact:
+            movedCode = board.squares[start]
+            capturedCode = board.movePiece(start, end)
+        else:
+            startPosition, endPosition = POSITIONS[start], POSITIONS[end]
+            movedEntity, capturedEntity = board[startPosition], board[endPosition]
+            movedCode = ENTITY_TO_CODE[movedEntity]
+            capturedCode = EMPTY if capturedEntity is None else ENTITY_TO_CODE[capturedEntity]
+            board[endPosition] = movedEntity
+            board[startPosition] = None
+        self._attackMap.movePiece(start, end)
+        self._undoStack.push(move, movedCode, capturedCode)
+        # NOTE: Every move switches the side to move, so the side key is toggled together with the pieces
+        movedKeys = PIECE_KEYS[movedCode]
+        self._hash ^= movedKeys[start] ^ movedKeys[end] ^ PIECE_KEYS[capturedCode][end] ^ SIDE_KEY
+        self._material -= MATERIAL_SCORES[capturedCode][end]
+        movedScores = PLACEMENT_SCORES[movedCode]
+        self._placement += movedScores[end] - movedScores[start] - PLACEMENT_SCORES[capturedCode][end]
+        if movedCode == _GENERAL or movedCode == -_GENERAL:
+            self.generals[self.currentSide] = POSITIONS[end]
+
+    def _isChase(self, square: int, attacksBefore: Sequence[int]) -> bool:
+        attackMap = self._attackMap
+        squares = attackMap.squares
+        code = squares[square]
+        side = 1 if code > 0 else -1
+        if code * side in (_GENERAL, _SOLDIER):
+            return False
+        for target in attackMap.pieceAttacks(square):
+            targetCode = squares[target]
+            if targetCode * side >= 0 or targetCode == -_GENERAL * side or target in attacksBefore:
+                continue
+            # NOTE: Soldiers cannot be chased on their own side of the river, red soldiers cross it on rank 5, black soldiers on rank 4
+            if targetCode == -_SOLDIER * side and (target // Board.fileCount >= 5) == (side > 0):
+                continue
+            if _CHASE_VALUES[-targetCode * side] > _CHASE_VALUES[code * side] or not attackMap.isSquareAttacked(target, Side(-side)):
+                return True
+        return False
+
+    def _unmake(self) -> int:
+        move, movedCode, capturedCode = self._undoStack.pop()
+        start, end = move >> 8, move & 0xFF
+        self.currentSide = self.currentSide.opponent
+        board = self.board
+        if self.isCompact:
+            board.unmovePiece(start, end, capturedCode)
+        else:
+            board[POSITIONS[start]] = CODE_TO_ENTITY[movedCode]
+            board[POSITIONS[end]] = CODE_TO_ENTITY[capturedCode]
+        self._attackMap.unmovePiece(start, end, capturedCode)
+        movedKeys = PIECE_KEYS[movedCode]
+        self._hash ^= movedKeys[start] ^ movedKeys[end] ^ PIECE_KEYS[capturedCode][end] ^ SIDE_KEY
+        self._material += MATERIAL_SCORES[capturedCode][end]
+        movedScores = PLACEMENT_SCORES[movedCode]
+        self._placement -= movedScores[end] - movedScores[start] - PLACEMENT_SCORES[capturedCode][end]
+        if movedCode == _GENERAL or movedCode == -_GENERAL:
+            self.generals[self.currentSide] = POSITIONS[start]
+        return move
 
     @property
     def fen(self) -> str:
         """Game's FEN"""
         return f"{self.board.fen} {self.currentSide.fen} - - 0 {len(self.moveHistory)//2+1}"
 
-    def _undoMove(self) -> None:
-        if len(self.moveHistory) > 0:
-            lastMove = self.moveHistory.pop()
-            self.board[lastMove.start] = lastMove.movedPieceEntity
-            self.board[lastMove.end] = lastMove.capturedPieceEntity
-
-            if lastMove.movedPieceEntity.piece == General:
-                self.generals[lastMove.movedPieceEntity.side] = lastMove.start
-        else:
-            raise InvalidMove(None, None, None, "Cannot undo move, game is in start state")
-
     def _calculateValidMoves(self) -> None:
-        self._checks, self._pins = self._getChecksAndPins()
-        self._validMoves = self._getAllValidMoves(self._checks, self._pins)
-
-    def _getChecksAndPins(self) -> Tuple[List[Position], Dict[Position, List[Position]]]:
-        checks = []
-        pins = defaultdict(list)
-        for delta in starmap(Delta, chain(product((1,-1), (0,)), product((0,), (1,-1)))):
-            possiblePinPositions = []
-            position = self.generals[self.currentSide]
-            foundBoardEntityCount = 0
-            while self.board.isInBounds(position := position + delta) and foundBoardEntityCount < 3:
-                if (foundBoardEntity := self.board[position]) is not None:
-                    foundBoardEntityCount += 1
-                    if foundBoardEntity.side == self.currentSide:
-                        possiblePinPositions.append(position)
-                    else:
-                        if ((foundBoardEntityCount == 1 and foundBoardEntity.piece != Cannon) or (foundBoardEntityCount == 2 and foundBoardEntity.piece == Cannon)) and \
-                            foundBoardEntity.piece.isValidMove(self.board, self.currentSide.opponent, position, self.generals[self.currentSide]):
-                            checks.append(position)
-                        elif len(possiblePinPositions) > 0 and not (foundBoardEntityCount == 3) ^ (foundBoardEntity.piece == Cannon):
-                            for possiblePinPosition in list(possiblePinPositions):
-                                possiblePinBoardEntity = self.board[possiblePinPosition]
-                                self.board[possiblePinPosition] = None
-                                isValidMove = foundBoardEntity.piece.isValidMove(self.board, self.currentSide.opponent, position, self.generals[self.currentSide])
-                                self.board[possiblePinPosition] = possiblePinBoardEntity
-                                if isValidMove:
-                                    pins[possiblePinPosition].append(position)
-                                    possiblePinPositions.remove(possiblePinPosition)
-
-        for delta in starmap(Delta, chain(product((1,-1), (2,-2)), product((2,-2), (1,-1)))):
-            position = self.generals[self.currentSide] + delta
-            if self.board.isInBounds(position) and self.board[position] == BoardEntity(self.currentSide.opponent, Horse):
-                possiblePinPosition = position + (delta/2).round()
-                possiblePinBoardEntity = self.board[possiblePinPosition]
-                if possiblePinBoardEntity is None or possiblePinBoardEntity.side == self.currentSide:
-                    self.board[possiblePinPosition] = None
-                    if Horse.isValidMove(self.board, self.currentSide.opponent, position, self.generals[self.currentSide]):
-                        if possiblePinBoardEntity is None:
-                            checks.append(position)
-                        else:
-                            pins[possiblePinPosition].append(position)
-                    self.board[possiblePinPosition] = possiblePinBoardEntity
-
-        return checks, dict(pins)
-
-    def _getAllPossibleMoves(self) -> Dict[Position, List[Position]]:
+        profile = self.profile
+        startedAt = perf_counter() if profile is not None else 0.0
+        if self.positionCache is not None:
+            cached = self.positionCache.get(self._hash)
+            if cached is not None:
+                self._checks, self._validMoves = cached
+                if profile is not None:
+                    _recordPhase(profile, CACHED, startedAt)
+                return
+
+        if self.verifyIncremental:
+            self._attackMap.verify()
+        generalSquare = squareIndex(self.generals[self.currentSide])
+        if profile is not None:
+            startedAt = perf_counter()
+        self._checks = self._getChecks(generalSquare)
+        if profile is not None:
+            _recordPhase(profile, CHECKS, startedAt)
+        if self._lazy:
+            self._validMoves = _LazyValidMoves(self, generalSquare, *self._getPins(generalSquare, profile))
+        else:
+            self._validMoves = self._getAllValidMoves(profile)
+        if self._incremental and self.verifyIncremental:
+            self._verifyValidMoves()
+
+        if self.positionCache is not None:
+            self.positionCache.put(self._hash, (self._checks, self._validMoves))
+
+    def _verifyValidMoves(self) -> None:
+        self._incremental = False
+        try:
+            validMoves = self._getAllValidMoves()
+        finally:
+            self._incremental = True
+        if validMoves != self._validMoves:
+            raise RuntimeError(f"Incrementally maintained moves differ from full regeneration in {self.fen}")
+
+    def _invalidatePossibleMoves(self, *changedSquares: int) -> None:
+        if not self._incremental:
+            return
+        squares = self._attackMap.squares
+        for side, possibleMoves in self._possibleMoves.items():
+            for square in list(possibleMoves):
+                code = squares[square]
+                if code * side <= 0 or any(square in _INFLUENCED_SQUARES[code][changedSquare] for changedSquare in changedSquares):
+                    del possibleMoves[square]
+
+    def _perft(self, depth: int) -> int:
+        if depth == 1:
+            return sum(len(ends) for ends in self._validMoves.values())
+        nodes = 0
+        for start, ends in list(self._validMoves.items()):
+            startMove = start << 8
+            for end in ends:
+                nodes += self._perftMove(startMove | end, depth - 1)
+        return nodes
+
+    def _perftMove(self, move: int, depth: int) -> int:
+        if depth == 0:
+            return 1
+        self.makeMove(move)
+        try:
+            return self._perft(depth)
+        finally:
+            self.unmakeMove()
+
+    def _getChecks(self, general: int) -> List[int]:
+        return self._attackMap.attackers(general, self.currentSide.opponent)
+
+    def _getPossibleMoves(self, square: int, piece: Type[Piece]) -> List[int]:
+        if self.isCompact:
+            return self.board.getPossibleEnds(square)
+        return [end.rank * Board.fileCount + end.file for end in piece.getPossibleMoves(self.board, POSITIONS[square])]
+
+    def _getAllPossibleMoves(self) -> Dict[int, List[int]]:
+        if self._incremental:
+            cachedPossibleMoves = self._possibleMoves[self.currentSide]
+            allPossibleMoves = {}
+            for position, piece in self.board[self.currentSide].items():
+                square = position.rank * Board.fileCount + position.file
+                possibleMoves = cachedPossibleMoves.get(square)
+                if possibleMoves is None:
+                    possibleMoves = cachedPossibleMoves[square] = self._getPossibleMoves(square, piece)
+                if len(possibleMoves) > 0:
+                    allPossibleMoves[square] = list(possibleMoves)
+            return allPossibleMoves
+        if self.isCompact:
+            return self.board.getAllPossibleEnds(self.currentSide)
         allPossibleMoves = {}
         for position, piece in self.board[self.currentSide].items():
             possibleMoves = piece.getPossibleMoves(self.board, position)
             if len(possibleMoves) > 0:
-                allPossibleMoves[position] = possibleMoves
+                allPossibleMoves[position.rank * Board.fileCount + position.file] = [end.rank * Board.fileCount + end.file for end in possibleMoves]
         return allPossibleMoves
 
-    def _getAllValidMoves(self, checks: List[Position], pins: Dict[Position, List[Position]]) -> Dict[Position, List[Position]]:
-        possibleMoves: Dict[Position, List[Position]] = {}
+    def _getPins(self, generalSquare: int, profile: Optional[EngineProfile] = None) -> Tuple[Dict[int, Set[int]], Set[int]]:
+        if profile is None:
+            return ({}, set()) if len(self._checks) > 0 else self._attackMap.getPins(generalSquare)
+        startedAt = perf_counter()
+        pins = self._getPins(generalSquare)
+        _recordPhase(profile, PINS, startedAt)
+        return pins
+
+    def _getValidEnds(self, start: int, generalSquare: int, pins: Dict[int, Set[int]], blocked: Set[int]) -> List[int]:
+        code = self._attackMap.squares[start]
+        if code * self.currentSide <= 0:
+            return []
+        piece = CODE_TO_PIECE[abs(code)]
+        profile = self.profile
+        if profile is None:
+            return self._filterEnds(start, self._getPieceEnds(start, piece), generalSquare, pins, blocked)
+        startedAt = perf_counter()
+        ends = self._getPieceEnds(start, piece)
+        startedAt = _recordPhase(profile, f"{POSSIBLE_MOVES}.{piece.__name__}", startedAt)
+        validEnds = self._filterEnds(start, ends, generalSquare, pins, blocked)
+        _recordPhase(profile, self._filterPhase(start, generalSquare), startedAt)
+        return validEnds
+
+    def _getPieceEnds(self, start: int, piece: Type[Piece]) -> List[int]:
+        if self._incremental:
+            cachedPossibleMoves = self._possibleMoves[self.currentSide]
+            possibleMoves = cachedPossibleMoves.get(start)
+            if possibleMoves is None:
+                possibleMoves = cachedPossibleMoves[start] = self._getPossibleMoves(start, piece)
+            return list(possibleMoves)
+        return self._getPossibleMoves(start, piece)
+
+    def _filterEnds(self, start: int, ends: List[int], generalSquare: int, pins: Dict[int, Set[int]], blocked: Set[int]) -> List[int]:
+        attackMap = self._attackMap
+        if start == generalSquare:
+            return [end for end in ends if attackMap.isSafeGeneralMove(start, end)]
+        elif len(self._checks) > 0:
+            return [end for end in ends if attackMap.isSafeMove(start, end, generalSquare)]
+        allowedEnds = pins.get(start)
+        if allowedEnds is None and len(blocked) == 0:
+            return ends
+        # NOTE: Without check a move can only expose the general by leaving a pin or by screening a cannon
+        return [end for end in ends if (allowedEnds is None or end in allowedEnds) and end not in blocked]
+
+    def _filterPhase(self, start: int, generalSquare: int) -> str:
+        return GENERAL_SAFETY if start == generalSquare or len(self._checks) > 0 else PIN_FILTER
+
+    def _getAllValidMoves(self, profile: Optional[EngineProfile] = None) -> Dict[int, List[int]]:
+        generalSquare = squareIndex(self.generals[self.currentSide])
+        pins, blocked = self._getPins(generalSquare, profile)
+        startedAt = perf_counter() if profile is not None else 0.0
+        allPossibleMoves = self._getAllPossibleMoves()
+        if profile is not None:
+            # NOTE: Possible moves are generated in bulk here, only lazily generated pieces are timed per piece class
+            startedAt = _recordPhase(profile, POSSIBLE_MOVES, startedAt)
+        validMoves = {}
+        for start, ends in allPossibleMoves.items():
+            validEnds = self._filterEnds(start, ends, generalSquare, pins, blocked)
+            if profile is not None:
+                startedAt = _recordPhase(profile, self._filterPhase(start, generalSquare), startedAt)
+            if len(validEnds) > 0:
+                validMoves[start] = validEnds
+        return validMoves
 
-        if len(self._checks) > 1:
-            possibleMoves[self.generals[self.currentSide]] = General.getPossibleMoves(self.board, self.generals[self.currentSide])
-        else:
-            possibleMoves = self._getAllPossibleMoves()
-
-            for pinned, pinning in pins.items():
-                if pinned in possibleMoves:
-                    if len(pinning) >= 2:
-                        del possibleMoves[pinned]
-                    else:
-                        pinningGeneralDeltaNorm = (pinning[0] - self.generals[self.currentSide]).normalize()
-                        for end in list(possibleMoves[pinned]):
-                            if end != pinning[0]:
-                                pinningEndDeltaNorm = (pinning[0] - end).normalize()
-                                generalEndDeltaNorm = (self.generals[self.currentSide] - end).normalize()
-                                if not (pinningGeneralDeltaNorm == pinningEndDeltaNorm and pinningGeneralDeltaNorm != generalEndDeltaNorm):
-                                    possibleMoves[pinned].remove(end)
-
-            if len(checks) == 1:
-                validEnds = [checks[0]]
-                checkGeneralDelta = checks[0] - self.generals[self.currentSide]
-                if self.board[checks[0]].piece == Horse:
-                    checkGeneralDeltaNorm = (checkGeneralDelta/2).round()
-                    validEnds.append(self.generals[self.currentSide] + checkGeneralDeltaNorm)
-                else:
-                    checkGeneralDeltaNorm = checkGeneralDelta.normalize()
-                    end = self.generals[self.currentSide]
-                    while (end := end + checkGeneralDeltaNorm) != checks[0]:
-                        validEnds.append(end)
-                for start, ends in possibleMoves.items():
-                    if start != self.generals[self.currentSide]:
-                        if self.board[checks[0]].piece == Cannon and start.isBetween(checks[0], self.generals[self.currentSide]):
-                            for end in list(ends):
-                                checkEndDeltaNorm = (checks[0] - end).normalize()
-                                generalEndDeltaNorm = (self.generals[self.currentSide] - end).normalize()
-                                if checkGeneralDeltaNorm == checkEndDeltaNorm and checkGeneralDeltaNorm != generalEndDeltaNorm:
-                                    possibleMoves[start].remove(end)
-                        else:
-                            for end in list(ends):
-                                if end not in validEnds:
-                                    possibleMoves[start].remove(end)
-
-        if self.generals[self.currentSide] in possibleMoves:
-            for possibleGeneralMove in list(possibleMoves[self.generals[self.currentSide]]):
-                self._move(self.generals[self.currentSide], possibleGeneralMove)
-                checksAfterMove, _ = self._getChecksAndPins()
-                self._undoMove()
-                if len(checksAfterMove) > 0:
-                    possibleMoves[self.generals[self.currentSide]].remove(possibleGeneralMove)
-
-        for piece in list(possibleMoves):
-            if len(possibleMoves[piece]) == 0:
-                del possibleMoves[piece]
-
-        return possibleMoves
 
 if __name__ == "__main__":
     from aiBoardGame.logic.engine.utility import prettyBoard
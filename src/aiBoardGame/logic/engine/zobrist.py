@@ -0,0 +1,79 @@
+"""Zobrist hashing of positions. Keys are generated from a fixed seed, so hashes are stable between runs"""
+
+from random import Random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aiBoardGame.logic.engine.auxiliary import Board, BoardEntity, Position, Side
+from aiBoardGame.logic.engine.compactBoard import EMPTY, SENTINEL, CODE_TO_PIECE
+from aiBoardGame.logic.engine.tables import SQUARE_COUNT, squareIndex
+
+
+ZOBRIST_SEED = 0x58514E47
+"""Seed of the key generator"""
+
+_random = Random(ZOBRIST_SEED)
+
+
+def _pieceKeys() -> Tuple[Tuple[int, ...], ...]:
+    # NOTE: Negative codes index the table from the end, like the code tables of CompactBoard
+    table: List[Tuple[int, ...]] = [(0,) * (SQUARE_COUNT + 1)] * (2 * SENTINEL)
+    for code in range(1 - SENTINEL, SENTINEL):
+        if code != EMPTY:
+            table[code] = tuple(_random.getrandbits(64) for _ in range(SQUARE_COUNT)) + (0,)
+    return tuple(table)
+
+
+PIECE_KEYS: Tuple[Tuple[int, ...], ...] = _pieceKeys()
+"""64 bit key of each piece code on each square, empty squares and :data:`~aiBoardGame.logic.engine.tables.OFF_BOARD` have 0 keys"""
+ENTITY_KEYS: Dict[BoardEntity, Tuple[int, ...]] = {
+    BoardEntity(side, piece): PIECE_KEYS[code * side]
+    for code, piece in CODE_TO_PIECE.items() for side in Side
+}
+"""Keys of :data:`PIECE_KEYS` for each board entity"""
+SIDE_KEY: int = _random.getrandbits(64)
+"""Key that is part of the hash when black is to move"""
+
+
+def pieceKey(boardEntity: Optional[BoardEntity], position: Position) -> int:
+    """Get key of a board entity on a position
+
+    :param boardEntity: Board entity, None for an empty square
+    :type boardEntity: Optional[BoardEntity]
+    :param position: Position of the board entity
+    :type position: Position
+    :return: Key of the board entity, 0 for an empty square
+    :rtype: int
+    """
+    return 0 if boardEntity is None else ENTITY_KEYS[boardEntity][squareIndex(position)]
+
+
+def zobristHash(board: Board, side: Side) -> int:
+    """Calculate hash of a position from scratch
+
+    :param board: Board to hash
+    :type board: Board
+    :param side: Side to move
+    :type side: Side
+    :return: 64 bit hash of the position
+    :rtype: int
+    """
+    positionHash = SIDE_KEY if side == Side.BLACK else 0
+    for position, boardEntity in board.pieces:
+        positionHash ^= pieceKey(boardEntity, position)
+    return positionHash
+
+
+def squaresHash(squares: Sequence[int], side: Side) -> int:
+    """Calculate hash of a position from signed piece codes, equal to :func:`zobristHash` of the same position
+
+    :param squares: Signed piece code of every square indexed by square index, see :func:`~aiBoardGame.logic.engine.compactBoard.fenToSquares`
+    :type squares: Sequence[int]
+    :param side: Side to move
+    :type side: Side
+    :return: 64 bit hash of the position
+    :rtype: int
+    """
+    positionHash = SIDE_KEY if side == Side.BLACK else 0
+    for square in range(SQUARE_COUNT):
+        positionHash ^= PIECE_KEYS[squares[square]][square]
+    return positionHash
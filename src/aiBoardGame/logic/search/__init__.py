@@ -0,0 +1,14 @@
+"""In-process move search modules"""
+
+from aiBoardGame.logic.search.alphaBetaSearch import AlphaBetaSearch, SearchResult
+from aiBoardGame.logic.search.openingBook import OpeningBook, BookMove, BOOK_PLIES, buildOpeningBook
+from aiBoardGame.logic.search.tablebase import Tablebase, TablebaseResult, generateTablebases
+from aiBoardGame.logic.search.mateSearch import MateSearch, MateResult, MatePuzzle, readMatePuzzles
+
+
+__all__ = [
+    "AlphaBetaSearch", "SearchResult",
+    "OpeningBook", "BookMove", "BOOK_PLIES", "buildOpeningBook",
+    "Tablebase", "TablebaseResult", "generateTablebases",
+    "MateSearch", "MateResult", "MatePuzzle", "readMatePuzzles"
+]
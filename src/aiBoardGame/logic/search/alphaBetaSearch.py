@@ -0,0 +1,250 @@
+"""Alpha-beta search on top of the rules engine, an in-process alternative to Fairy-Stockfish"""
+
+# pylint: disable=protected-access
+
+import logging
+from dataclasses import dataclass
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+from aiBoardGame.logic.engine import XiangqiEngine, Position
+from aiBoardGame.logic.engine.move import moveToPositions
+from aiBoardGame.logic.engine.tables import POSITIONS
+from aiBoardGame.logic.engine.evaluation import PIECE_VALUES
+from aiBoardGame.logic.engine.positionCache import PositionCache
+from aiBoardGame.logic.stockfish.fairyStockfish import Difficulty
+
+
+MATE_SCORE = 100000
+"""Score of a checkmated side, reduced by the number of plies to the mate"""
+
+_SEARCH_ARGS = {
+    Difficulty.EASY: (3, 500),
+    Difficulty.MEDIUM: (5, 2000),
+    Difficulty.HARD: (8, 4000)
+}
+
+_EXACT, _LOWER_BOUND, _UPPER_BOUND = range(3)
+_MAX_MATE_PLY = 1000
+
+Move = Tuple[Position, Position]
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """Outcome of a search"""
+    move: Optional[Move]
+    """Best move found, None if the side to move has no valid moves"""
+    score: int
+    """Score of the best move from the side to move's view"""
+    depth: int
+    """Deepest fully searched depth"""
+    nodes: int
+    """Number of visited nodes, including quiescence nodes"""
+    seconds: float
+    """Elapsed wall clock time"""
+
+    @property
+    def nodesPerSecond(self) -> float:
+        """Visited nodes per second"""
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+class _SearchAborted(Exception):
+    pass
+
+
+class AlphaBetaSearch:
+    """Iterative deepening alpha-beta search with quiescence search on captures and a transposition table.
+    Provides the same :meth:`nextMove` interface as :class:`~aiBoardGame.logic.stockfish.FairyStockfish`"""
+
+    difficulty: Difficulty
+    """Defines maximum depth and move time"""
+    maxDepth: Optional[int]
+    """Maximum depth, overrides the one defined by difficulty"""
+    moveTime: Optional[int]
+    """Time limit in milliseconds, overrides the one defined by difficulty"""
+    maxNodes: Optional[int]
+    """Maximum number of visited nodes"""
+    lastResult: Optional[SearchResult]
+    """Result of the last search"""
+
+    def __init__(self, difficulty: Difficulty = Difficulty.EASY, maxDepth: Optional[int] = None, moveTime: Optional[int] = None, maxNodes: Optional[int] = None, tableSize: int = 2**16) -> None:
+        """
+        :param difficulty: Defines maximum depth and move time, defaults to Difficulty.EASY
+        :type difficulty: Difficulty, optional
+        :param maxDepth: Maximum depth, overrides the one defined by difficulty, defaults to None
+        :type maxDepth: Optional[int], optional
+        :param moveTime: Time limit in milliseconds, overrides the one defined by difficulty, defaults to None
+        :type moveTime: Optional[int], optional
+        :param maxNodes: Maximum number of visited nodes, defaults to None which means no limit
+        :type maxNodes: Optional[int], optional
+        :param tableSize: Number of positions stored in the transposition table, defaults to 2**16
+        :type tableSize: int, optional
+        """
+        self.difficulty = difficulty
+        self.maxDepth = maxDepth
+        self.moveTime = moveTime
+        self.maxNodes = maxNodes
+        self.lastResult = None
+        self._table: PositionCache[Tuple[int, int, int, Optional[int]]] = PositionCache(tableSize)
+        self._nodes = 0
+        self._deadline = 0.0
+
+    def nextMove(self, fen: str) -> Optional[Move]:
+        """Search a move in a position
+
+        :param fen: Boardgame's FEN
+        :type fen: str
+        :return: Move's start and end position or nothing if there is no valid move
+        :rtype: Optional[Tuple[Position, Position]]
+        """
+        return self.search(XiangqiEngine.fromFen(fen, compact=True)).move
+
+    def search(self, engine: XiangqiEngine) -> SearchResult:
+        """Search the best move of the engine's current position, the engine is restored afterwards
+
+        :param engine: Engine in the position to search
+        :type engine: XiangqiEngine
+        :return: Best move with search statistics
+        :rtype: SearchResult
+        """
+        maxDepth, moveTime = _SEARCH_ARGS[self.difficulty]
+        maxDepth = maxDepth if self.maxDepth is None else self.maxDepth
+        moveTime = moveTime if self.moveTime is None else self.moveTime
+
+        startTime = perf_counter()
+        self._deadline = startTime + moveTime / 1000
+        self._nodes = 0
+
+        moves = self._orderedMoves(engine, None)
+        bestMove = moves[0] if len(moves) > 0 else None
+        bestScore = -MATE_SCORE if bestMove is None else 0
+        depth = 0
+        try:
+            while bestMove is not None and depth < maxDepth:
+                bestScore, bestMove = self._searchRoot(engine, depth + 1, bestMove)
+                depth += 1
+                if abs(bestScore) >= MATE_SCORE - _MAX_MATE_PLY:
+                    break
+        except _SearchAborted:
+            pass
+
+        self.lastResult = SearchResult(None if bestMove is None else moveToPositions(bestMove), bestScore, depth, self._nodes, perf_counter() - startTime)
+        logging.debug(f"Searched depth {self.lastResult.depth} with {self.lastResult.nodes} nodes ({self.lastResult.nodesPerSecond:.0f} nodes/s), score {bestScore}")
+        return self.lastResult
+
+    def _searchRoot(self, engine: XiangqiEngine, depth: int, previousBestMove: int) -> Tuple[int, int]:
+        alpha = -MATE_SCORE - 1
+        bestMove = previousBestMove
+        for move in self._orderedMoves(engine, previousBestMove):
+            score = -self._searchMove(engine, move, depth - 1, -MATE_SCORE - 1, -alpha, 1)
+            if score > alpha:
+                alpha, bestMove = score, move
+        self._table.put(engine.hash, (depth, alpha, _EXACT, bestMove))
+        return alpha, bestMove
+
+    def _searchMove(self, engine: XiangqiEngine, move: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        engine.makeMove(move)
+        try:
+            if depth <= 0:
+                return self._quiescence(engine, alpha, beta, ply)
+            return self._alphaBeta(engine, depth, alpha, beta, ply)
+        finally:
+            engine.unmakeMove()
+
+    def _alphaBeta(self, engine: XiangqiEngine, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self._visitNode()
+        if engine.isOver:
+            return -MATE_SCORE + ply
+
+        entry = self._table.get(engine.hash)
+        tableMove = None
+        if entry is not None:
+            entryDepth, entryScore, entryBound, tableMove = entry
+            entryScore = _scoreFromTable(entryScore, ply)
+            if entryDepth >= depth and (entryBound == _EXACT or (entryBound == _LOWER_BOUND and entryScore >= beta) or (entryBound == _UPPER_BOUND and entryScore <= alpha)):
+                return entryScore
+
+        originalAlpha = alpha
+        bestScore, bestMove = -MATE_SCORE - 1, None
+        for move in self._orderedMoves(engine, tableMove):
+            score = -self._searchMove(engine, move, depth - 1, -beta, -alpha, ply + 1)
+            if score > bestScore:
+                bestScore, bestMove = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        bound = _LOWER_BOUND if bestScore >= beta else _UPPER_BOUND if bestScore <= originalAlpha else _EXACT
+        self._table.put(engine.hash, (depth, _scoreToTable(bestScore, ply), bound, bestMove))
+        return bestScore
+
+    def _quiescence(self, engine: XiangqiEngine, alpha: int, beta: int, ply: int) -> int:
+        self._visitNode()
+        if engine.isOver:
+            return -MATE_SCORE + ply
+
+        # NOTE: Material and piece-square scores are kept incrementally by the engine
+        standPat = engine.score * engine.currentSide
+        if standPat >= beta:
+            return standPat
+        alpha = max(alpha, standPat)
+
+        for move in self._orderedMoves(engine, None, capturesOnly=True):
+            score = -self._searchMove(engine, move, 0, -beta, -alpha, ply + 1)
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def _orderedMoves(self, engine: XiangqiEngine, firstMove: Optional[int], capturesOnly: bool = False) -> List[int]:
+        board = engine.board
+        scoredMoves = []
+        for start, ends in engine._validMoves.items():
+            movedValue = PIECE_VALUES[board[POSITIONS[start]].piece]
+            startMove = start << 8
+            for end in ends:
+                capturedEntity = board[POSITIONS[end]]
+                if capturedEntity is not None:
+                    # NOTE: Most valuable victim, least valuable attacker
+                    scoredMoves.append((10 * PIECE_VALUES[capturedEntity.piece] - movedValue, startMove | end))
+                elif not capturesOnly:
+                    scoredMoves.append((-MATE_SCORE, startMove | end))
+        scoredMoves.sort(key=lambda scoredMove: scoredMove[0], reverse=True)
+        moves = [move for _, move in scoredMoves]
+        if firstMove is not None and firstMove in moves:
+            moves.remove(firstMove)
+            moves.insert(0, firstMove)
+        return moves
+
+    def _visitNode(self) -> None:
+        self._nodes += 1
+        if (self.maxNodes is not None and self._nodes >= self.maxNodes) or (self._nodes & 1023 == 0 and perf_counter() >= self._deadline):
+            raise _SearchAborted()
+
+
+def _scoreToTable(score: int, ply: int) -> int:
+    # NOTE: Mate scores are stored relative to the node, so they stay valid when reached through another path
+    if score >= MATE_SCORE - _MAX_MATE_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + _MAX_MATE_PLY:
+        return score - ply
+    return score
+
+
+def _scoreFromTable(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - _MAX_MATE_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + _MAX_MATE_PLY:
+        return score + ply
+    return score
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="")
+    alphaBetaSearch = AlphaBetaSearch(difficulty=Difficulty.MEDIUM)
+    logging.info(alphaBetaSearch.nextMove("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"))
+    logging.info(alphaBetaSearch.lastResult)
@@ -0,0 +1,411 @@
+"""Forced mate search with depth-limited df-pn (depth-first proof-number search) on top of the rules engine.
+The side to move is the attacker, it has to mate within a number of its own moves against every defence. Proof and disproof numbers
+are kept in a transposition table keyed by position hash and remaining plies, mate lengths are deepened one attacker move at a time,
+so the first mate found is the shortest. Repetition rules are not modelled, the ply limit keeps perpetual checks finite"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.sharedctypes import Synchronized
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aiBoardGame.logic.engine import XiangqiEngine, Position, Side
+from aiBoardGame.logic.engine.compactBoard import EMPTY
+from aiBoardGame.logic.engine.move import moveToPositions
+from aiBoardGame.logic.engine.positionCache import PositionCache
+from aiBoardGame.logic.engine.tables import squareIndex
+from aiBoardGame.logic.engine.tactics import squareAttackers
+from aiBoardGame.logic.engine.zobrist import PIECE_KEYS, SIDE_KEY
+
+
+DEFAULT_MAX_MOVES = 3
+"""Number of attacker moves a mate is searched within by default"""
+PUZZLE_OPCODE = "dm"
+"""EPD operation giving the number of moves of a mate puzzle"""
+
+_INFINITY = 2**30
+# NOTE: Initial disproof effort of a quiet attacker move relative to a check, checks are tried first
+_QUIET_EFFORT = 2
+
+# NOTE: Filled by the initializer of each worker process with the shared bound on the mate length
+_WORKER_STATE: Dict[str, Synchronized] = {}
+
+Move = Tuple[Position, Position]
+_Child = Tuple[int, Tuple[int, int], int, int]
+# NOTE: Proof and disproof numbers of a side to move that is proven to lose, and of one that is proven to win
+_LOST = (_INFINITY, 0)
+_WON = (0, _INFINITY)
+
+
+@dataclass(frozen=True)
+class MateResult:
+    """Outcome of a mate search"""
+    line: Tuple[Move, ...]
+    """Attacker's moves and the defender's longest resistance from the root until mate, empty if no mate was found"""
+    isDisproven: bool
+    """No mate exists within the move limit, False if a mate was found or the search ran out of time or nodes"""
+    nodes: int
+    """Number of expanded nodes"""
+    seconds: float
+    """Elapsed wall clock time"""
+
+    @property
+    def isMate(self) -> bool:
+        """A forced mate was found"""
+        return len(self.line) > 0
+
+    @property
+    def moves(self) -> Optional[int]:
+        """Number of attacker moves until mate, None if no mate was found"""
+        return (len(self.line) + 1) // 2 if self.isMate else None
+
+    @property
+    def nodesPerSecond(self) -> float:
+        """Expanded nodes per second"""
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class MatePuzzle:
+    """Position with a known forced mate"""
+    fen: str
+    """Game FEN of the position, the side to move mates"""
+    moves: int
+    """Number of attacker moves of the shortest mate"""
+
+
+class _SearchAborted(Exception):
+    pass
+
+
+class MateSearch:
+    """Depth-limited df-pn mate solver, far cheaper than a full width alpha-beta search to the same depth because
+    it only expands the moves most likely to prove or refute the mate"""
+
+    maxMoves: int
+    """Maximum number of attacker moves of a mate"""
+    moveTime: Optional[int]
+    """Time limit in milliseconds"""
+    maxNodes: Optional[int]
+    """Maximum number of expanded nodes"""
+    processes: int
+    """Number of processes the root moves are split across"""
+    checksOnly: bool
+    """Only consider attacker moves that give check or leave the defender without moves"""
+    lastResult: Optional[MateResult]
+    """Result of the last search"""
+
+    def __init__(self, maxMoves: int = DEFAULT_MAX_MOVES, moveTime: Optional[int] = None, maxNodes: Optional[int] = None, tableSize: int = 2**18, processes: int = 1, checksOnly: bool = False) -> None:
+        """
+        :param maxMoves: Maximum number of attacker moves of a mate, defaults to DEFAULT_MAX_MOVES
+        :type maxMoves: int, optional
+        :param moveTime: Time limit in milliseconds, defaults to None which means no limit
+        :type moveTime: Optional[int], optional
+        :param maxNodes: Maximum number of expanded nodes, split evenly between processes, defaults to None which means no limit
+        :type maxNodes: Optional[int], optional
+        :param tableSize: Number of positions stored in the transposition table, defaults to 2**18
+        :type tableSize: int, optional
+        :param processes: Number of processes the root moves are split across, defaults to 1
+        :type processes: int, optional
+        :param checksOnly: Only consider attacker moves that give check or leave the defender without moves, defaults to False
+        :type checksOnly: bool, optional
+        :raises ValueError: Maximum number of moves or number of processes is less than 1
+        """
+        if maxMoves < 1:
+            raise ValueError(f"Maximum number of moves must be at least 1, was {maxMoves}")
+        if processes < 1:
+            raise ValueError(f"Number of processes must be at least 1, was {processes}")
+        self.maxMoves = maxMoves
+        self.moveTime = moveTime
+        self.maxNodes = maxNodes
+        self.processes = processes
+        self.checksOnly = checksOnly
+        self.lastResult = None
+        self._tableSize = tableSize
+        self._table: PositionCache[Tuple[int, int]] = PositionCache(tableSize)
+        self._attacker = Side.RED
+        self._nodes = 0
+        self._deadline = 0.0
+        self._isLimited = True
+        self._moves = 0
+        self._sharedMoves: Optional[Synchronized] = None
+
+    def solve(self, fen: str) -> MateResult:
+        """Search a forced mate of the side to move in a position
+
+        :param fen: Boardgame's FEN
+        :type fen: str
+        :return: Mating line with search statistics
+        :rtype: MateResult
+        """
+        return self.search(XiangqiEngine.fromFen(fen, compact=True, lazy=True))
+
+    def search(self, engine: XiangqiEngine) -> MateResult:
+        """Search a forced mate of the side to move in the engine's current position, the engine is restored afterwards
+
+        :param engine: Engine in the position to search
+        :type engine: XiangqiEngine
+        :return: Mating line with search statistics
+        :rtype: MateResult
+        """
+        startTime = perf_counter()
+        if self.processes > 1:
+            line, isDisproven, nodes = self._searchParallel(engine, startTime)
+        else:
+            line, isDisproven, nodes = self._searchMoves(engine, None, startTime)
+        self.lastResult = MateResult(tuple(moveToPositions(move) for move in line), isDisproven, nodes, perf_counter() - startTime)
+        logging.debug(f"Mate search of {self.lastResult.nodes} nodes ({self.lastResult.nodesPerSecond:.0f} nodes/s), mate in {self.lastResult.moves}")
+        return self.lastResult
+
+    def _searchMoves(self, engine: XiangqiEngine, rootMoves: Optional[List[int]], startTime: float) -> Tuple[List[int], bool, int]:
+        self._table.clear()
+        self._attacker = engine.currentSide
+        self._nodes = 0
+        self._deadline = startTime + self.moveTime / 1000 if self.moveTime is not None else float("inf")
+        self._isLimited = True
+        try:
+            for moves in range(1, self.maxMoves + 1):
+                self._moves = moves
+                self._checkShared()
+                if self._isMate(engine, 2 * moves - 1, rootMoves):
+                    self._isLimited = False
+                    return self._mateLine(engine, 2 * moves - 1, rootMoves), False, self._nodes
+        except _SearchAborted:
+            return [], False, self._nodes
+        return [], True, self._nodes
+
+    def _searchParallel(self, engine: XiangqiEngine, startTime: float) -> Tuple[List[int], bool, int]:
+        moves = _validMoves(engine)
+        chunks = [moves[index::self.processes] for index in range(self.processes)]
+        moveTime = None if self.moveTime is None else max(self.moveTime - int((perf_counter() - startTime) * 1000), 0)
+        maxNodes = None if self.maxNodes is None else max(self.maxNodes // self.processes, 1)
+        settings = (self.maxMoves, moveTime, maxNodes, self._tableSize, self.checksOnly)
+        lines, isDisproven, nodes = [], True, 0
+        # NOTE: Workers share the shortest mate found so far, so they stop searching longer mates in their own moves
+        sharedMoves = multiprocessing.Value("i", self.maxMoves + 1)
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_initWorker, initargs=(sharedMoves,)) as executor:
+            for line, isChunkDisproven, chunkNodes in executor.map(_searchChunk, [engine.fen] * self.processes, chunks, [settings] * self.processes):
+                if len(line) > 0:
+                    lines.append(line)
+                isDisproven &= isChunkDisproven
+                nodes += chunkNodes
+        if len(lines) > 0:
+            return min(lines, key=len), False, nodes
+        return [], isDisproven, nodes
+
+    def _isMate(self, engine: XiangqiEngine, remaining: int, rootMoves: Optional[List[int]] = None) -> bool:
+        entry = self._table.get((engine.hash, remaining)) if rootMoves is None else None
+        if entry is None or (entry[0] != 0 and entry[1] != 0):
+            entry = self._mid(engine, remaining, _INFINITY, _INFINITY, rootMoves)
+        return entry[0 if engine.currentSide == self._attacker else 1] == 0
+
+    def _mid(self, engine: XiangqiEngine, remaining: int, phiThreshold: int, deltaThreshold: int, rootMoves: Optional[List[int]] = None) -> Tuple[int, int]:
+        # NOTE: Phi is the proof number of the side to move winning and delta its disproof number,
+        # so the phi of a child is the delta of its parent from the other side's view
+        self._visitNode()
+        key = (engine.hash, remaining)
+        table = self._table
+        if engine.isOver:
+            table.put(key, _LOST)
+            return _LOST
+        if remaining == 0:
+            # NOTE: Out of plies, the defender escapes
+            entry = _LOST if engine.currentSide == self._attacker else _WON
+            table.put(key, entry)
+            return entry
+        children = self._children(engine, remaining, rootMoves)
+        while True:
+            phi, delta = _INFINITY, 0
+            bestChild, bestPhi, secondDelta = None, 0, _INFINITY
+            for child in children:
+                entry = table.get(child[1])
+                childPhi, childDelta = (child[2], child[3]) if entry is None else entry
+                delta = min(delta + childPhi, _INFINITY)
+                if childDelta < phi:
+                    bestChild, bestPhi, secondDelta, phi = child, childPhi, phi, childDelta
+                elif childDelta < secondDelta:
+                    secondDelta = childDelta
+            if phi >= phiThreshold or delta >= deltaThreshold or bestChild is None:
+                table.put(key, (phi, delta))
+                return phi, delta
+            childPhiThreshold = _INFINITY if deltaThreshold >= _INFINITY else deltaThreshold - delta + bestPhi
+            childDeltaThreshold = min(phiThreshold, secondDelta + 1)
+            engine.makeMove(bestChild[0])
+            try:
+                self._mid(engine, remaining - 1, childPhiThreshold, childDeltaThreshold)
+            finally:
+                engine.unmakeMove()
+
+    def _children(self, engine: XiangqiEngine, remaining: int, rootMoves: Optional[List[int]]) -> List[_Child]:
+        # NOTE: Children are not made until they are selected, their hashes are found by the incremental Zobrist update
+        # and checks by the attack tables, so an expansion costs no moves on the engine
+        moves = _validMoves(engine) if rootMoves is None else rootMoves
+        squares = engine.squares
+        childHash = engine.hash ^ SIDE_KEY
+        childRemaining = remaining - 1
+        if engine.currentSide != self._attacker:
+            return [(move, (childHash ^ _moveKey(squares, move), childRemaining), 1, 1) for move in moves]
+        scratch = array("b", squares)
+        general = squareIndex(engine.generals[engine.currentSide.opponent])
+        children = []
+        for move in moves:
+            key = (childHash ^ _moveKey(squares, move), childRemaining)
+            if _givesCheck(scratch, move, general, engine.currentSide):
+                children.append((move, key, 1, 1))
+            elif not self.checksOnly:
+                children.append((move, key, 1, _QUIET_EFFORT))
+        return children
+
+    def _mateLine(self, engine: XiangqiEngine, remaining: int, rootMoves: Optional[List[int]]) -> List[int]:
+        # NOTE: The attacker plays a move proven to mate within the remaining plies, usually found in the table,
+        # the defender the move delaying the mate the longest, tried from the longest possible distance down
+        line: List[int] = []
+        while not engine.isOver:
+            moves = _validMoves(engine) if rootMoves is None else rootMoves
+            if engine.currentSide == self._attacker:
+                childHash = engine.hash ^ SIDE_KEY
+                squares = engine.squares
+                move = next((move for move in moves if self._table.get((childHash ^ _moveKey(squares, move), remaining - 1)) == _LOST), None)
+                if move is None:
+                    move = next(move for move in moves if self._isMateAfter(engine, move, remaining - 1))
+            else:
+                for distance in range(remaining - 1, 1, -2):
+                    move = next((move for move in moves if not self._isMateAfter(engine, move, distance - 2)), None)
+                    if move is not None:
+                        break
+                else:
+                    move, distance = moves[0], 1
+                remaining = distance + 1
+            line.append(move)
+            engine.makeMove(move)
+            remaining -= 1
+            rootMoves = None
+        for _ in line:
+            engine.unmakeMove()
+        return line
+
+    def _isMateAfter(self, engine: XiangqiEngine, move: int, remaining: int) -> bool:
+        engine.makeMove(move)
+        try:
+            return self._isMate(engine, remaining)
+        finally:
+            engine.unmakeMove()
+
+    def _visitNode(self) -> None:
+        self._nodes += 1
+        if self._isLimited and ((self.maxNodes is not None and self._nodes >= self.maxNodes) or (self._nodes & 1023 == 0 and perf_counter() >= self._deadline)):
+            raise _SearchAborted()
+        if self._nodes & 1023 == 0:
+            self._checkShared()
+
+    def _checkShared(self) -> None:
+        if self._sharedMoves is not None and self._sharedMoves.value <= self._moves:
+            raise _SearchAborted()
+
+
+def _validMoves(engine: XiangqiEngine) -> List[int]:
+    return [start << 8 | end for start, ends in engine._validMoves.items() for end in ends]  # pylint: disable=protected-access
+
+
+def _moveKey(squares: array, move: int) -> int:
+    start, end = move >> 8, move & 0xFF
+    movedKeys = PIECE_KEYS[squares[start]]
+    return movedKeys[start] ^ movedKeys[end] ^ PIECE_KEYS[squares[end]][end]
+
+
+def _givesCheck(squares: array, move: int, general: int, side: Side) -> bool:
+    start, end = move >> 8, move & 0xFF
+    movedCode, capturedCode = squares[start], squares[end]
+    squares[end], squares[start] = movedCode, EMPTY
+    try:
+        return len(squareAttackers(squares, general, side)) > 0
+    finally:
+        squares[start], squares[end] = movedCode, capturedCode
+
+
+def _initWorker(sharedMoves: Synchronized) -> None:
+    _WORKER_STATE["sharedMoves"] = sharedMoves
+
+
+def _searchChunk(fen: str, moves: List[int], settings: Tuple[int, Optional[int], Optional[int], int, bool]) -> Tuple[List[int], bool, int]:
+    maxMoves, moveTime, maxNodes, tableSize, checksOnly = settings
+    if len(moves) == 0:
+        return [], True, 0
+    sharedMoves = _WORKER_STATE.get("sharedMoves")
+    mateSearch = MateSearch(maxMoves=maxMoves, moveTime=moveTime, maxNodes=maxNodes, tableSize=tableSize, checksOnly=checksOnly)
+    mateSearch._sharedMoves = sharedMoves  # pylint: disable=protected-access
+    line, isDisproven, nodes = mateSearch._searchMoves(XiangqiEngine.fromFen(fen, compact=True, lazy=True), moves, perf_counter())  # pylint: disable=protected-access
+    if len(line) > 0 and sharedMoves is not None:
+        with sharedMoves.get_lock():
+            sharedMoves.value = min(sharedMoves.value, (len(line) + 1) // 2)
+    return line, isDisproven, nodes
+
+
+def readMatePuzzles(path: Path) -> List[MatePuzzle]:
+    """Read mate puzzles from an EPD file, each line holds a position and its mate length like ``<board> w - - dm 2;``
+
+    :param path: EPD file
+    :type path: Path
+    :raises ValueError: A line has no mate length
+    :return: Puzzles in file order
+    :rtype: List[MatePuzzle]
+    """
+    puzzles = []
+    with path.open(mode="r") as puzzleFile:
+        for line in puzzleFile:
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith("#"):
+                continue
+            operations = dict(operation.strip().split(" ", 1) for operation in " ".join(fields[4:]).split(";") if operation.strip() != "")
+            if PUZZLE_OPCODE not in operations:
+                raise ValueError(f"No {PUZZLE_OPCODE} operation in {line.rstrip()}")
+            puzzles.append(MatePuzzle(" ".join(fields[:4] + ["0", "1"]), int(operations[PUZZLE_OPCODE])))
+    return puzzles
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Solve mates from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code, 1 if a puzzle was not solved with its known mate length
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Search forced mates of the side to move in Xiangqi positions")
+    parser.add_argument("fens", nargs="*", help="positions to solve")
+    parser.add_argument("--puzzles", type=Path, help="EPD file of mate puzzles with dm operations, solved after the given positions")
+    parser.add_argument("--moves", type=int, default=DEFAULT_MAX_MOVES, help="maximum number of attacker moves, raised to the length of a puzzle (default: %(default)s)")
+    parser.add_argument("--time", type=int, help="time limit of each position in milliseconds")
+    parser.add_argument("--nodes", type=int, help="node limit of each position")
+    parser.add_argument("--processes", type=int, default=1, help="split root moves across a process pool of this size (default: %(default)s)")
+    parser.add_argument("--checks-only", action="store_true", help="only consider attacker moves that give check")
+    args = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format="")
+
+    puzzles = [MatePuzzle(fen, 0) for fen in args.fens] + ([] if args.puzzles is None else readMatePuzzles(args.puzzles))
+    isCorrect = True
+    totalSeconds = 0.0
+    for puzzle in puzzles:
+        mateSearch = MateSearch(maxMoves=max(args.moves, puzzle.moves), moveTime=args.time, maxNodes=args.nodes, processes=args.processes, checksOnly=args.checks_only)
+        result = mateSearch.solve(puzzle.fen)
+        totalSeconds += result.seconds
+        line = " ".join(f"{*start,}->{*end,}" for start, end in result.line)
+        outcome = f"mate in {result.moves}: {line}" if result.isMate else "no mate" if result.isDisproven else "unknown"
+        logging.info(f"{puzzle.fen}: {outcome} ({result.nodes} nodes, {result.seconds:.3f} s)")
+        if puzzle.moves > 0 and result.moves != puzzle.moves:
+            logging.error(f"Expected mate in {puzzle.moves}")
+            isCorrect = False
+    logging.info(f"{len(puzzles)} positions in {totalSeconds:.3f} s")
+    return 0 if isCorrect else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,247 @@
+"""Opening book compiled from game records into a sorted fixed-width binary file, read through a memory map.
+Each entry stores a position hash, an encoded move and its weight; entries are sorted by hash, so the moves
+of a position are found with a binary search without loading the book into memory"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import mmap
+import struct
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from random import Random
+from types import TracebackType
+from typing import ClassVar, Dict, List, Optional, Sequence, Tuple, Type
+
+from aiBoardGame.logic.engine import Position, Side
+from aiBoardGame.logic.engine.compactBoard import fenToSquares
+from aiBoardGame.logic.engine.move import moveStart, moveToPositions
+from aiBoardGame.logic.engine.notation import readWxfGames
+from aiBoardGame.logic.engine.zobrist import squaresHash
+from aiBoardGame.logic.stockfish.fairyStockfish import Difficulty
+
+
+BOOK_MAGIC = b"XQOB"
+"""First bytes of every opening book file"""
+BOOK_VERSION = 1
+"""Version of the file layout"""
+DEFAULT_BUILD_PLIES = 30
+"""Number of plies of each game record compiled into a book"""
+MAX_WEIGHT = 0xFFFF
+"""Largest storable weight, larger weights are clamped"""
+
+BOOK_PLIES: Dict[Difficulty, int] = {
+    Difficulty.EASY: 6,
+    Difficulty.MEDIUM: 16,
+    Difficulty.HARD: 30
+}
+"""Number of plies from the start of the game the book is consulted on each difficulty"""
+
+# NOTE: Header is magic, version, entry size and entry count, an entry is position hash, move and weight
+_HEADER = struct.Struct("<4sHHI")
+_ENTRY = struct.Struct("<QHH")
+_HASH = struct.Struct("<Q")
+
+
+@dataclass(frozen=True)
+class BookMove:
+    """Move stored in an opening book"""
+    move: int
+    """Move encoded with :func:`~aiBoardGame.logic.engine.move.encodeMove`"""
+    weight: int
+    """Number of times the move was played in the position, doubled for moves of the winning side"""
+
+    @property
+    def positions(self) -> Tuple[Position, Position]:
+        """Start and end position of the move"""
+        return moveToPositions(self.move)
+
+
+class _HashColumn(Sequence[int]):
+    # NOTE: Read-only view of the entry hashes for bisect, unpacked on access
+    def __init__(self, buffer: mmap.mmap, count: int) -> None:
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        return _HASH.unpack_from(self._buffer, _HEADER.size + index * _ENTRY.size)[0]
+
+
+class OpeningBook:
+    """Memory-mapped opening book built with :func:`buildOpeningBook`.
+    Provides the same :meth:`nextMove` interface as :class:`~aiBoardGame.logic.stockfish.FairyStockfish`, but only knows book positions"""
+
+    basePath: ClassVar[Path] = Path("src/aiBoardGame/logic/search/openingBook.bin")
+    """Default opening book path"""
+
+    path: Path
+    """Path of the opened book"""
+
+    def __init__(self, path: Path = basePath, random: Optional[Random] = None) -> None:
+        """
+        :param path: Opening book file, defaults to basePath
+        :type path: Path, optional
+        :param random: Random generator choosing between weighted book moves, defaults to None which creates an unseeded one
+        :type random: Optional[Random], optional
+        :raises FileNotFoundError: Book does not exist
+        :raises ValueError: File is not an opening book of the supported version or is truncated
+        """
+        self.path = path
+        self._random = Random() if random is None else random
+        with path.open(mode="rb") as bookFile:
+            self._buffer = mmap.mmap(bookFile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._buffer) < _HEADER.size:
+                raise ValueError(f"{path} is not an opening book")
+            magic, version, entrySize, count = _HEADER.unpack_from(self._buffer)
+            if magic != BOOK_MAGIC or version != BOOK_VERSION or entrySize != _ENTRY.size:
+                raise ValueError(f"{path} is not an opening book of version {BOOK_VERSION}")
+            if len(self._buffer) != _HEADER.size + count * _ENTRY.size:
+                raise ValueError(f"{path} is truncated, expected {count} entries")
+        except ValueError:
+            self._buffer.close()
+            raise
+        self._hashes = _HashColumn(self._buffer, count)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __enter__(self) -> OpeningBook:
+        return self
+
+    def __exit__(self, excType: Optional[Type[BaseException]], excValue: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the book file"""
+        self._buffer.close()
+
+    def lookup(self, positionHash: int) -> List[BookMove]:
+        """Find the book moves of a position with a binary search
+
+        :param positionHash: Zobrist hash of the position, see :attr:`~aiBoardGame.logic.engine.XiangqiEngine.hash`
+        :type positionHash: int
+        :return: Book moves ordered by encoded move, empty if the position is not in the book
+        :rtype: List[BookMove]
+        """
+        moves = []
+        index = bisect_left(self._hashes, positionHash)
+        while index < len(self._hashes):
+            entryHash, move, weight = _ENTRY.unpack_from(self._buffer, _HEADER.size + index * _ENTRY.size)
+            if entryHash != positionHash:
+                break
+            moves.append(BookMove(move, weight))
+            index += 1
+        return moves
+
+    def chooseMove(self, positionHash: int) -> Optional[int]:
+        """Choose a book move of a position randomly, proportionally to the weights
+
+        :param positionHash: Zobrist hash of the position
+        :type positionHash: int
+        :return: Encoded move, None if the position is not in the book
+        :rtype: Optional[int]
+        """
+        moves = self.lookup(positionHash)
+        if len(moves) == 0:
+            return None
+        return self._random.choices([bookMove.move for bookMove in moves], weights=[bookMove.weight for bookMove in moves])[0]
+
+    def nextMove(self, fen: str, maxPly: Optional[int] = None) -> Optional[Tuple[Position, Position]]:
+        """Choose a book move in a position
+
+        :param fen: Boardgame's FEN, the ply is counted from its full move number
+        :type fen: str
+        :param maxPly: The book is not consulted from this ply on, defaults to None which means no limit
+        :type maxPly: Optional[int], optional
+        :return: Move's start and end position or nothing if the position is not in the book
+        :rtype: Optional[Tuple[Position, Position]]
+        """
+        fenParts = fen.split(" ")
+        side = Side.BLACK if len(fenParts) > 1 and fenParts[1] == Side.BLACK.fen else Side.RED
+        if maxPly is not None and _fenPly(fenParts, side) >= maxPly:
+            return None
+        squares = fenToSquares(fen)
+        move = self.chooseMove(squaresHash(squares, side))
+        # NOTE: Guards against hash collisions with positions that are not in the book
+        if move is None or squares[moveStart(move)] * side <= 0:
+            return None
+        return moveToPositions(move)
+
+
+def buildOpeningBook(source: Path, output: Path, maxPly: int = DEFAULT_BUILD_PLIES, minWeight: int = 1) -> int:
+    """Compile game records into an opening book. Records with an invalid move are skipped
+
+    :param source: Directory, zip or tar archive or a single game record, see :func:`~aiBoardGame.logic.engine.replay.readGameRecords`
+    :type source: Path
+    :param output: Path of the book file, overwritten if it exists
+    :type output: Path
+    :param maxPly: Number of plies of each game compiled into the book, defaults to DEFAULT_BUILD_PLIES
+    :type maxPly: int, optional
+    :param minWeight: Moves with a smaller weight are left out, defaults to 1
+    :type minWeight: int, optional
+    :raises ValueError: Number of plies or minimum weight is less than 1
+    :raises FileNotFoundError: Source does not exist
+    :return: Number of entries written
+    :rtype: int
+    """
+    if maxPly < 1:
+        raise ValueError(f"Number of plies must be at least 1, was {maxPly}")
+    if minWeight < 1:
+        raise ValueError(f"Minimum weight must be at least 1, was {minWeight}")
+    if not source.exists():
+        raise FileNotFoundError(f"Game records not found at {source}")
+
+    weights: Dict[Tuple[int, int], int] = defaultdict(int)
+    for _, moves, engine in readWxfGames(source):
+        winner = engine.winner
+        # NOTE: Positions are hashed while unmaking, the result is only known after the whole game is replayed
+        while len(engine.moveHistory) > 0:
+            engine.unmakeMove()
+            ply = len(engine.moveHistory)
+            if ply < maxPly:
+                weights[(engine.hash, moves[ply])] += 2 if engine.currentSide == winner else 1
+
+    entries = sorted((positionHash, move, min(weight, MAX_WEIGHT)) for (positionHash, move), weight in weights.items() if weight >= minWeight)
+    with output.open(mode="wb") as bookFile:
+        bookFile.write(_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, _ENTRY.size, len(entries)))
+        for entry in entries:
+            bookFile.write(_ENTRY.pack(*entry))
+    return len(entries)
+
+
+def _fenPly(fenParts: List[str], side: Side) -> int:
+    fullMoveNumber = int(fenParts[5]) if len(fenParts) == 6 else 1
+    return 2 * (fullMoveNumber - 1) + (1 if side == Side.BLACK else 0)
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Build an opening book from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Compile Xiangqi game records into an opening book")
+    parser.add_argument("source", type=Path, help="game record, directory of records, or zip or tar archive of records")
+    parser.add_argument("--output", type=Path, default=OpeningBook.basePath, help="book file (default: %(default)s)")
+    parser.add_argument("--plies", type=int, default=DEFAULT_BUILD_PLIES, help="number of plies of each game compiled into the book (default: %(default)s)")
+    parser.add_argument("--min-weight", type=int, default=1, help="leave out moves with a smaller weight (default: %(default)s)")
+    args = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format="")
+
+    entryCount = buildOpeningBook(args.source, args.output, maxPly=args.plies, minWeight=args.min_weight)
+    logging.info(f"{entryCount} entries written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
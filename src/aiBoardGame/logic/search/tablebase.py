@@ -0,0 +1,454 @@
+"""Endgame tablebases of small material signatures, generated by retrograde analysis with the batched move generator.
+A signature lists the FEN letters of every piece, red uppercase and black lowercase (``KRk`` is chariot against a lone general).
+Each table stores the distance to mate of every position of a signature from the view of the side to move, tables of
+signatures reached by captures are generated first. Repetition rules are not modelled, repeating positions count as draws"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+from collections import Counter
+from dataclasses import dataclass
+from multiprocessing import Pool
+from pathlib import Path
+from time import perf_counter
+from typing import ClassVar, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aiBoardGame.logic.engine import XiangqiEngine, Position, Side, CompactBoard, createXiangqiBoard
+from aiBoardGame.logic.engine.batchMoves import generateBatchMoves, detectChecks
+from aiBoardGame.logic.engine.compactBoard import EMPTY, FEN_TO_CODE, CODE_TO_PIECE, fenToSquares
+from aiBoardGame.logic.engine.move import moveToPositions, positionsToMove
+from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Soldier
+from aiBoardGame.logic.engine.tables import FILE_COUNT, RANK_COUNT, SQUARE_COUNT, GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_MOVES, SOLDIER_MOVES
+
+
+TABLEBASE_SUFFIX = ".npy"
+"""Suffix of table files, each table is a NumPy array of int16 values indexed by position index"""
+DEFAULT_SIGNATURES = ("KRk", "KRka", "KRkaa", "KRkb", "KCAk", "KNPk")
+"""Signatures generated by the command line tool if none are given"""
+DEFAULT_CHUNK_SIZE = 2**14
+"""Number of positions whose moves are generated together, a chunk is the unit of parallel and resumable work"""
+
+_MATED = -1
+_UNINDEXABLE = np.iinfo(np.int16).min
+_KEY_BOUND = 2**15
+_NO_MOVE = -_KEY_BOUND
+_LETTER_ORDER = {letter: order for order, letter in enumerate("KRCNPAB")}
+_CODE_TO_LETTER = {code: letter for letter, code in FEN_TO_CODE.items()}
+
+
+@dataclass(frozen=True)
+class TablebaseResult:
+    """Outcome of a position with perfect play from the view of the side to move"""
+    value: int
+    """Positive if the side to move wins, negative if it loses, 0 for a draw. The absolute value is one more than the number of plies to mate"""
+
+    @property
+    def isWin(self) -> bool:
+        """Side to move mates the opponent"""
+        return self.value > 0
+
+    @property
+    def isLoss(self) -> bool:
+        """Side to move is mated"""
+        return self.value < 0
+
+    @property
+    def isDraw(self) -> bool:
+        """Neither side can force mate"""
+        return self.value == 0
+
+    @property
+    def plies(self) -> Optional[int]:
+        """Number of plies until mate, None for a draw"""
+        return None if self.value == 0 else abs(self.value) - 1
+
+
+def _allowedSquares() -> Dict[int, np.ndarray]:
+    # NOTE: Squares a piece can ever stand on, found by walking its move tables from the start position
+    startBoard, _ = createXiangqiBoard(CompactBoard)
+    allowedSquares = {}
+    for code, piece in ((code * side, piece) for code, piece in CODE_TO_PIECE.items() for side in Side):
+        side = Side(1 if code > 0 else -1)
+        neighbours = {
+            General: lambda square, side=side: GENERAL_MOVES[side][square],
+            Advisor: lambda square, side=side: ADVISOR_MOVES[side][square],
+            Elephant: lambda square, side=side: [end for end, _ in ELEPHANT_MOVES[side][square]],
+            Soldier: lambda square, side=side: SOLDIER_MOVES[side][square]
+        }.get(piece)
+        if neighbours is None:
+            allowedSquares[code] = np.arange(SQUARE_COUNT)
+            continue
+        reached = {square for square in range(SQUARE_COUNT) if startBoard.squares[square] == code}
+        frontier = list(reached)
+        while len(frontier) > 0:
+            for end in neighbours(frontier.pop()):
+                if end not in reached:
+                    reached.add(end)
+                    frontier.append(end)
+        allowedSquares[code] = np.array(sorted(reached))
+    return allowedSquares
+
+
+_ALLOWED_SQUARES = _allowedSquares()
+_MIRRORED_SQUARES = np.array([(RANK_COUNT - 1 - square // FILE_COUNT) * FILE_COUNT + square % FILE_COUNT for square in range(SQUARE_COUNT)])
+_MAX_COUNTS = Counter(_CODE_TO_LETTER[code] for code in createXiangqiBoard(CompactBoard)[0].squares[:SQUARE_COUNT] if code != EMPTY)
+
+
+def canonicalSignature(signature: str) -> str:
+    """Get the signature of the table that stores the positions of a signature.
+    Pieces are ordered, and a signature whose colours are swapped is stored in the same table
+
+    :param signature: FEN letters of every piece, in any order
+    :type signature: str
+    :raises ValueError: Unknown letter, missing general or more pieces of a kind than in the start position
+    :return: Canonical signature
+    :rtype: str
+    """
+    counts = Counter(signature)
+    if any(letter not in FEN_TO_CODE for letter in counts) or counts["K"] != 1 or counts["k"] != 1 or any(count > _MAX_COUNTS[letter] for letter, count in counts.items()):
+        raise ValueError(f"Invalid tablebase signature {signature}")
+    return min(_ordered(signature), _ordered(signature.swapcase()), key=lambda ordered: (-sum(letter.isupper() for letter in ordered), ordered))
+
+
+def _ordered(signature: str) -> str:
+    return "".join(sorted(signature, key=lambda letter: (letter.islower(), _LETTER_ORDER[letter.upper()])))
+
+
+def _canonicalSlots(signature: str, pieceSquares: np.ndarray, sides: np.ndarray) -> Tuple[str, np.ndarray, np.ndarray]:
+    # NOTE: Reorders the pieces into the slots of the canonical table, swapping colours and flipping ranks if the table is mirrored
+    tableSignature = canonicalSignature(signature)
+    if _ordered(signature) != tableSignature:
+        signature, pieceSquares, sides = signature.swapcase(), _MIRRORED_SQUARES[pieceSquares], -sides
+    order = sorted(range(len(signature)), key=lambda slot: (signature[slot].islower(), _LETTER_ORDER[signature[slot].upper()]))
+    return tableSignature, pieceSquares[:, order], sides
+
+
+class _Layout:
+    # NOTE: Position index is a mixed radix number of the side to move and the allowed square index of each piece
+    def __init__(self, signature: str) -> None:
+        self.signature = signature
+        self.codes = np.array([FEN_TO_CODE[letter] for letter in signature], dtype=np.int8)
+        self.squares = [_ALLOWED_SQUARES[code] for code in self.codes]
+        self.shape = (len(Side),) + tuple(len(squares) for squares in self.squares)
+        self.size = int(np.prod(self.shape))
+        self.strides = np.array([int(np.prod(self.shape[axis + 1:])) for axis in range(len(self.shape))], dtype=np.int64)
+        self.locals = np.full((len(signature), SQUARE_COUNT), -1, dtype=np.int64)
+        for slot, squares in enumerate(self.squares):
+            self.locals[slot, squares] = np.arange(len(squares))
+
+    def decode(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert position indices to the side to move and the square of each piece"""
+        coordinates = np.unravel_index(indices, self.shape)
+        sides = np.where(coordinates[0] == 0, 1, -1).astype(np.int8)
+        return sides, np.stack([squares[coordinate] for squares, coordinate in zip(self.squares, coordinates[1:])], axis=1)
+
+    def encode(self, sides: np.ndarray, pieceSquares: np.ndarray) -> np.ndarray:
+        """Convert the side to move and the square of each piece to position indices, -1 if a piece is on a square it cannot reach"""
+        localSquares = self.locals[np.arange(len(self.codes)), pieceSquares]
+        indices = np.where(sides > 0, 0, 1) * self.strides[0] + (localSquares * self.strides[1:]).sum(axis=1)
+        return np.where(np.all(localSquares >= 0, axis=1), indices, -1)
+
+
+class Tablebase:
+    """Endgame tablebases generated with :func:`generateTablebases`, tables are memory-mapped when first probed.
+    Provides the same :meth:`nextMove` interface as :class:`~aiBoardGame.logic.stockfish.FairyStockfish`, but only knows positions of its signatures"""
+
+    basePath: ClassVar[Path] = Path("src/aiBoardGame/logic/search/tablebases")
+    """Default tablebase directory"""
+
+    directory: Path
+    """Directory of the table files"""
+    signatures: FrozenSet[str]
+    """Canonical signatures of the available tables"""
+
+    def __init__(self, directory: Path = basePath) -> None:
+        """
+        :param directory: Directory of the table files, defaults to basePath
+        :type directory: Path, optional
+        """
+        self.directory = directory
+        self.signatures = frozenset(path.name[:-len(TABLEBASE_SUFFIX)] for path in directory.glob(f"*{TABLEBASE_SUFFIX}")) if directory.is_dir() else frozenset()
+        self._maxPieces = max((len(signature) for signature in self.signatures), default=0)
+        self._tables: Dict[str, np.ndarray] = {}
+
+    def probe(self, fen: str) -> Optional[TablebaseResult]:
+        """Look up the outcome of a position
+
+        :param fen: Boardgame's FEN
+        :type fen: str
+        :return: Outcome with perfect play, None if the signature of the position has no table
+        :rtype: Optional[TablebaseResult]
+        """
+        fenParts = fen.split(" ")
+        return self.probeSquares(fenToSquares(fen), Side.BLACK if len(fenParts) > 1 and fenParts[1] == Side.BLACK.fen else Side.RED)
+
+    def probeSquares(self, squares: Sequence[int], side: Side) -> Optional[TablebaseResult]:
+        """Look up the outcome of a position given by signed piece codes, like :attr:`~aiBoardGame.logic.engine.XiangqiEngine.squares`
+
+        :param squares: Signed piece code of every square indexed by square index
+        :type squares: Sequence[int]
+        :param side: Side to move
+        :type side: Side
+        :return: Outcome with perfect play, None if the signature of the position has no table
+        :rtype: Optional[TablebaseResult]
+        """
+        pieces = [(square, squares[square]) for square in range(SQUARE_COUNT) if squares[square] != EMPTY]
+        if len(pieces) > self._maxPieces:
+            return None
+        signature = "".join(_CODE_TO_LETTER[code] for _, code in pieces)
+        try:
+            if canonicalSignature(signature) not in self.signatures:
+                return None
+        except ValueError:
+            return None
+        value = self._probeSlots(signature, np.array([[square for square, _ in pieces]]), np.array([side], dtype=np.int8))[0]
+        return None if value == _UNINDEXABLE else TablebaseResult(int(value))
+
+    def nextMove(self, fen: str) -> Optional[Tuple[Position, Position]]:
+        """Choose the move with the best outcome, the fastest mate when winning and the slowest when losing
+
+        :param fen: Boardgame's FEN
+        :type fen: str
+        :return: Move's start and end position or nothing if the position is not in the tablebase or there is no valid move
+        :rtype: Optional[Tuple[Position, Position]]
+        """
+        if self.probe(fen) is None:
+            return None
+        engine = XiangqiEngine.fromFen(fen, compact=True, cacheSize=0)
+        bestMove, bestKey = None, _NO_MOVE
+        for start, ends in engine.validMoves.items():
+            for end in ends:
+                move = positionsToMove(start, end)
+                engine.makeMove(move)
+                result = self.probeSquares(engine.squares, engine.currentSide)
+                engine.unmakeMove()
+                key = int(_key(_negated(np.array([0 if result is None else result.value])))[0])
+                if key > bestKey:
+                    bestMove, bestKey = move, key
+        return None if bestMove is None else moveToPositions(bestMove)
+
+    def _probeSlots(self, signature: str, pieceSquares: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        tableSignature, pieceSquares, sides = _canonicalSlots(signature, pieceSquares, sides)
+        table = self._tables.get(tableSignature)
+        if table is None:
+            table = self._tables[tableSignature] = np.load(self.directory / f"{tableSignature}{TABLEBASE_SUFFIX}", mmap_mode="r")
+        indices = _Layout(tableSignature).encode(sides, pieceSquares)
+        return np.where(indices >= 0, table[np.maximum(indices, 0)], _UNINDEXABLE)
+
+
+def generateTablebases(signatures: Iterable[str], directory: Path = Tablebase.basePath, processes: int = 1, chunkSize: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """Generate the tables of signatures and of every signature reachable from them by captures.
+    Existing tables are kept, and the finished chunks of an interrupted generation are reused
+
+    :param signatures: Signatures to generate, see :func:`canonicalSignature`
+    :type signatures: Iterable[str]
+    :param directory: Directory of the table files, created if it does not exist, defaults to Tablebase.basePath
+    :type directory: Path, optional
+    :param processes: Number of processes generating chunks of a table, defaults to 1 which generates in the calling process
+    :type processes: int, optional
+    :param chunkSize: Number of positions whose moves are generated together, defaults to DEFAULT_CHUNK_SIZE
+    :type chunkSize: int, optional
+    :raises ValueError: Invalid signature, number of processes or chunk size is less than 1
+    :return: Canonical signatures of the generated tables in generation order
+    :rtype: List[str]
+    """
+    if processes < 1:
+        raise ValueError(f"Number of processes must be at least 1, was {processes}")
+    if chunkSize < 1:
+        raise ValueError(f"Chunk size must be at least 1, was {chunkSize}")
+
+    required = set()
+    pending = [canonicalSignature(signature) for signature in signatures]
+    while len(pending) > 0:
+        signature = pending.pop()
+        if signature not in required:
+            required.add(signature)
+            pending.extend(canonicalSignature(signature[:slot] + signature[slot + 1:]) for slot, letter in enumerate(signature) if letter not in "Kk")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    generated = []
+    for signature in sorted(required, key=lambda signature: (len(signature), signature)):
+        if not (directory / f"{signature}{TABLEBASE_SUFFIX}").exists():
+            startTime = perf_counter()
+            _generateTable(signature, directory, processes, chunkSize)
+            logging.info(f"Generated {signature} in {perf_counter() - startTime:.1f} s")
+            generated.append(signature)
+    return generated
+
+
+def _generateTable(signature: str, directory: Path, processes: int, chunkSize: int) -> None:
+    layout = _Layout(signature)
+    workDirectory = directory / f"{signature}.work"
+    workDirectory.mkdir(exist_ok=True)
+    chunks = [(start, min(start + chunkSize, layout.size)) for start in range(0, layout.size, chunkSize)]
+    chunkPaths = [workDirectory / f"{start}-{end}.npz" for start, end in chunks]
+    tasks = [(signature, directory, start, end) for (start, end), path in zip(chunks, chunkPaths) if not path.exists()]
+    if processes == 1:
+        for task in tasks:
+            _generateChunk(task)
+    else:
+        with Pool(processes) as pool:
+            for _ in pool.imap_unordered(_generateChunk, tasks):
+                pass
+
+    values = _solve(layout, chunkPaths)
+    temporaryPath = directory / f"{signature}.partial{TABLEBASE_SUFFIX}"
+    np.save(temporaryPath, values)
+    os.replace(temporaryPath, directory / f"{signature}{TABLEBASE_SUFFIX}")
+    shutil.rmtree(workDirectory)
+
+
+def _generateChunk(task: Tuple[str, Path, int, int]) -> None:
+    # NOTE: Stores the legal positions of the chunk, the in-table successor of each quiet move and the outcome of each capture
+    signature, directory, start, end = task
+    layout = _Layout(signature)
+    indices = np.arange(start, end, dtype=np.int64)
+    sides, pieceSquares = layout.decode(indices)
+    sortedSquares = np.sort(pieceSquares, axis=1)
+    isLegal = np.all(sortedSquares[:, 1:] != sortedSquares[:, :-1], axis=1)
+    squares = np.zeros((len(indices), SQUARE_COUNT), dtype=np.int8)
+    squares[np.arange(len(indices))[:, None], pieceSquares] = layout.codes
+    boards = squares.reshape(-1, RANK_COUNT, FILE_COUNT)
+    # NOTE: Positions where the side that just moved is in check cannot arise
+    isLegal[isLegal] = ~detectChecks(boards[isLegal], -sides[isLegal])
+    legalRows = np.flatnonzero(isLegal)
+    batchMoves = generateBatchMoves(boards[legalRows], sides[legalRows])
+
+    rows, starts, ends = legalRows[batchMoves.boardIndices], batchMoves.starts, batchMoves.ends
+    movedSlots = np.argmax(pieceSquares[rows] == starts[:, None], axis=1)
+    isCapture = squares[rows, ends] != EMPTY
+    quiet = ~isCapture
+    quietTargets = (
+        indices[rows[quiet]]
+        + (layout.locals[movedSlots[quiet], ends[quiet]] - layout.locals[movedSlots[quiet], starts[quiet]]) * layout.strides[movedSlots[quiet] + 1]
+        + np.where(sides[rows[quiet]] > 0, 1, -1) * layout.strides[0]
+    )
+
+    tablebase = Tablebase(directory)
+    captureRows, captureKeys = [], []
+    capturedSlots = np.argmax(pieceSquares[rows] == ends[:, None], axis=1)
+    for capturedSlot in np.unique(capturedSlots[isCapture]):
+        isSlotCapture = isCapture & (capturedSlots == capturedSlot)
+        slotRows = rows[isSlotCapture]
+        madeSquares = pieceSquares[slotRows]
+        madeSquares[np.arange(len(slotRows)), movedSlots[isSlotCapture]] = ends[isSlotCapture]
+        values = tablebase._probeSlots(signature[:capturedSlot] + signature[capturedSlot + 1:], np.delete(madeSquares, capturedSlot, axis=1), -sides[slotRows])  # pylint: disable=protected-access
+        captureRows.append(slotRows)
+        captureKeys.append(_key(_negated(values)))
+
+    moveCounts = np.bincount(batchMoves.boardIndices, minlength=len(legalRows))
+    chunkPath = directory / f"{signature}.work" / f"{start}-{end}.npz"
+    temporaryPath = chunkPath.with_name(f"{start}-{end}.partial.npz")
+    np.savez(
+        temporaryPath,
+        legal=indices[legalRows],
+        terminal=indices[legalRows[moveCounts == 0]],
+        quietSources=indices[rows[quiet]],
+        quietTargets=quietTargets,
+        captureSources=indices[np.concatenate(captureRows)] if len(captureRows) > 0 else np.zeros(0, dtype=np.int64),
+        captureKeys=np.concatenate(captureKeys) if len(captureKeys) > 0 else np.zeros(0, dtype=np.int32)
+    )
+    os.replace(temporaryPath, chunkPath)
+
+
+def _solve(layout: _Layout, chunkPaths: List[Path]) -> np.ndarray:
+    # NOTE: Retrograde analysis, positions are resolved in order of their distance to mate, starting from the mated ones.
+    # A resolved loss makes its predecessors wins one ply further, a resolved win counts down the unresolved quiet moves
+    # of its predecessors, which are lost once none is left and no capture saves them. Unresolved positions are draws
+    isTerminal = np.zeros(layout.size, dtype=bool)
+    captureKeys = np.full(layout.size, _NO_MOVE, dtype=np.int32)
+    quietSources, quietTargets = [], []
+    for chunkPath in chunkPaths:
+        with np.load(chunkPath) as chunk:
+            isTerminal[chunk["terminal"]] = True
+            np.maximum.at(captureKeys, chunk["captureSources"], chunk["captureKeys"])
+            quietSources.append(chunk["quietSources"])
+            quietTargets.append(chunk["quietTargets"])
+    sources, targets = np.concatenate(quietSources), np.concatenate(quietTargets)
+    unresolvedMoves = np.bincount(sources, minlength=layout.size)
+    # NOTE: Predecessors of each position, the quiet moves ordered by target
+    order = np.argsort(targets, kind="stable")
+    predecessors = sources[order]
+    predecessorEnds = np.cumsum(np.bincount(targets, minlength=layout.size))
+    predecessorStarts = predecessorEnds - np.bincount(targets, minlength=layout.size)
+
+    # NOTE: Absolute values of wins are even and those of losses odd, so a level of the queue holds only one kind.
+    # Captures lead out of the table, their outcome is known and queued at its own distance
+    hasCapture = captureKeys != _NO_MOVE
+    captureValues = np.where(hasCapture, _key(captureKeys), 0)
+    captureLevels = np.abs(captureValues)
+    levels: Dict[int, List[np.ndarray]] = {1: [np.flatnonzero(isTerminal)]}
+    captureWins = np.flatnonzero(captureValues > 0)
+    captureLosses = np.flatnonzero((captureValues < 0) & (unresolvedMoves == 0))
+    for positions in (captureWins, captureLosses):
+        for level in np.unique(captureLevels[positions]):
+            levels.setdefault(int(level), []).append(positions[captureLevels[positions] == level])
+
+    values = np.zeros(layout.size, dtype=np.int32)
+    isResolved = np.zeros(layout.size, dtype=bool)
+    while len(levels) > 0:
+        level = min(levels)
+        if level >= _KEY_BOUND:
+            raise RuntimeError(f"Distance to mate of {layout.signature} does not fit the table")
+        positions = np.unique(np.concatenate(levels.pop(level)))
+        positions = positions[~isResolved[positions]]
+        isResolved[positions] = True
+        values[positions] = level if level % 2 == 0 else -level
+        counts = predecessorEnds[positions] - predecessorStarts[positions]
+        if counts.sum() == 0:
+            continue
+        edges = np.repeat(predecessorStarts[positions] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        parents = predecessors[edges]
+        parents = parents[~isResolved[parents]]
+        if level % 2 == 1:
+            levels.setdefault(level + 1, []).append(parents)
+            continue
+        np.subtract.at(unresolvedMoves, parents, 1)
+        parents = np.unique(parents)
+        parents = parents[(unresolvedMoves[parents] == 0) & (~hasCapture[parents] | (captureValues[parents] < 0))]
+        lossLevels = np.maximum(level + 1, captureLevels[parents])
+        for lossLevel in np.unique(lossLevels):
+            levels.setdefault(int(lossLevel), []).append(parents[lossLevels == lossLevel])
+    return values.astype(np.int16)
+
+
+def _negated(values: np.ndarray) -> np.ndarray:
+    # NOTE: Value of a position from the view of the side that moved into it, one ply further from mate
+    values = values.astype(np.int32)
+    return -values - np.sign(values)
+
+
+def _key(values: np.ndarray) -> np.ndarray:
+    # NOTE: Orders values by preference, fast wins first and slow losses last; the mapping is its own inverse
+    return np.where(values > 0, _KEY_BOUND - values, np.where(values < 0, -_KEY_BOUND - values, 0)).astype(np.int32)
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    """Generate tablebases from the command line
+
+    :param arguments: Command line arguments, defaults to None which uses sys.argv
+    :type arguments: Optional[Sequence[str]], optional
+    :return: Exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Generate Xiangqi endgame tablebases")
+    parser.add_argument("signatures", nargs="*", default=list(DEFAULT_SIGNATURES), help="FEN letters of the pieces, like KRk (default: %(default)s)")
+    parser.add_argument("--directory", type=Path, default=Tablebase.basePath, help="directory of the table files (default: %(default)s)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="generate chunks in a process pool of this size (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="number of positions generated together (default: %(default)s)")
+    args = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format="")
+
+    generated = generateTablebases(args.signatures, args.directory, processes=args.processes, chunkSize=args.chunk_size)
+    logging.info(f"{len(generated)} tables generated in {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
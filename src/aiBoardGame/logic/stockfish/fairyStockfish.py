@@ -60,7 +60,9 @@ class FairyStockfish:
         return self._currentFen
 
     def __del__(self) -> None:
-        self._process.terminate()
+        # NOTE: Process is missing if the binary could not be started
+        if hasattr(self, "_process"):
+            self._process.terminate()
 
     def _write(self, inputStr: str) -> None:
         self._process.stdin.write(f"{inputStr}\n")
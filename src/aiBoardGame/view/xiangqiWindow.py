@@ -137,6 +137,7 @@ class XianqiWindow(QMainWindow, Ui_xiangqiWindow):
         self.game.turnChanged.connect(self.updateTurnLabel)
         self.game.engineUpdated.connect(self.updateBoardFENLabel)
         self.game.over.connect(self.onGameOver)
+        self.game.drawn.connect(self.onGameDrawn)
         self.game.newBoardImage.connect(self.updateGameCameraView)
         self.game.invalidStartPosition.connect(self.onInvalidStartPosition)
         self.game.invalidMove.connect(self.onInvalidMove)
@@ -187,6 +188,11 @@ class XianqiWindow(QMainWindow, Ui_xiangqiWindow):
         QMessageBox.information(self, "Game Over", f"{side.name} {player.__class__.__name__} won!", defaultButton=QMessageBox.StandardButton.Ok)
         self.newGameButton.setEnabled(True)
 
+    @pyqtSlot(str)
+    def onGameDrawn(self, reason: str) -> None:
+        QMessageBox.information(self, "Game Over", f"The game has ended in a draw: {reason}", defaultButton=QMessageBox.StandardButton.Ok)
+        self.newGameButton.setEnabled(True)
+
     @pyqtSlot(str)
     def onCalibrateCorner(self, corner: str) -> None:
         QMessageBox.information(self, "Robot Arm Calibration", f"Press OK if you've moved the robot arm to the {corner} corner (from the perspective of the RED side)", defaultButton=QMessageBox.StandardButton.Ok)
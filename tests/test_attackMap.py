@@ -0,0 +1,111 @@
+import pytest
+from pathlib import Path
+
+from aiBoardGame.logic.engine.attackMap import AttackMap
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.replay import replayGame
+from aiBoardGame.logic.engine.tables import squareIndex
+from aiBoardGame.logic.engine.utility import fenToBoard
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+class TestAttackMap:
+    def testStartPosition(self) -> None:
+        game = XiangqiEngine()
+        assert game.isSquareAttacked(squareIndex((0,1)), Side.RED)
+        assert not game.isSquareAttacked(squareIndex((1,5)), Side.RED)
+        # NOTE: Cannon attacks the black horse through the soldier screen
+        assert game.isSquareAttacked(squareIndex((1,9)), Side.RED)
+        assert not game.isSquareAttacked(squareIndex((4,9)), Side.RED)
+
+    def testCounts(self) -> None:
+        attackMap = AttackMap(fenToBoard("4k4/9/9/9/R3c4/9/9/4R4/9/3K1R3"))
+        assert attackMap.attackCount(squareIndex((4,6)), Side.RED) == 0
+        assert attackMap.attackCount(squareIndex((4,5)), Side.RED) == 2
+        assert attackMap.attackers(squareIndex((4,5)), Side.RED) == [squareIndex((4,2)), squareIndex((0,5))]
+        assert attackMap.attackers(squareIndex((4,9)), Side.RED) == []
+        assert attackMap.isSquareAttacked(squareIndex((4,1)), Side.BLACK)
+
+    def testFromSquares(self) -> None:
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/4c4/9/4N4/4Rn3/5A3/3cK4"))
+        copy = AttackMap.fromSquares(attackMap.squares)
+        assert copy.squares == attackMap.squares and copy.squares is not attackMap.squares
+        for side in Side:
+            for square in range(90):
+                assert copy.attackCount(square, side) == attackMap.attackCount(square, side)
+                assert copy.attackers(square, side) == [start for start in range(90) if square in attackMap.pieceAttacks(start) and attackMap.squares[start] * side > 0]
+
+    def testFlyingGeneral(self) -> None:
+        attackMap = AttackMap(fenToBoard("4k4/9/9/9/9/9/9/9/9/4K4"))
+        assert attackMap.attackCount(squareIndex((4,9)), Side.RED) == 0
+        assert attackMap.isSquareAttacked(squareIndex((4,9)), Side.RED)
+        assert attackMap.attackers(squareIndex((4,0)), Side.BLACK) == [squareIndex((4,9))]
+        assert not attackMap.isSquareAttacked(squareIndex((4,5)), Side.RED)
+
+    def testPins(self) -> None:
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/4c4/9/4N4/4Rn3/5A3/3cK4"))
+        pins, blocked = attackMap.getPins(squareIndex((4,0)))
+        # NOTE: Both screens of the cannon are pinned, capturing the cannon or staying in front of the other screen is allowed
+        assert pins == {
+            squareIndex((4,2)): {squareIndex(position) for position in ((4,1), (4,2), (4,4), (4,5))},
+            squareIndex((4,3)): {squareIndex(position) for position in ((4,1), (4,3), (4,4), (4,5))},
+            squareIndex((5,1)): {squareIndex((5,2))}
+        }
+        assert blocked == set()
+
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/9/9/9/9/9/1c2K4"))
+        pins, blocked = attackMap.getPins(squareIndex((4,0)))
+        assert pins == {}
+        assert blocked == {squareIndex((2,0)), squareIndex((3,0))}
+
+        # NOTE: An opponent's cannon can be the other screen of a cannon behind it
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/9/9/9/9/9/4KcCc1"))
+        pins, blocked = attackMap.getPins(squareIndex((4,0)))
+        assert pins == {squareIndex((6,0)): {squareIndex((6,0)), squareIndex((7,0))}}
+        assert blocked == set()
+
+    def testSafeMove(self) -> None:
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/4r4/9/9/9/4K4/9"))
+        squares = attackMap.squares.tobytes()
+        # NOTE: Moving away from the chariot along its file is still attacked
+        assert not attackMap.isSafeGeneralMove(squareIndex((4,1)), squareIndex((4,0)))
+        assert not attackMap.isSafeGeneralMove(squareIndex((4,1)), squareIndex((4,2)))
+        assert attackMap.isSafeGeneralMove(squareIndex((4,1)), squareIndex((5,1)))
+        assert not attackMap.isSafeGeneralMove(squareIndex((4,1)), squareIndex((3,1)))
+        assert attackMap.isSafeMove(squareIndex((4,1)), squareIndex((5,1)), squareIndex((4,1)))
+        assert attackMap.squares.tobytes() == squares
+
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/4c4/9/9/9/4K4/9"))
+        # NOTE: The general was the screen of the cannon
+        assert attackMap.isSafeGeneralMove(squareIndex((4,1)), squareIndex((4,0)))
+        assert attackMap.isSafeGeneralMove(squareIndex((4,1)), squareIndex((4,2)))
+
+        attackMap = AttackMap(fenToBoard("3k5/9/9/9/4r4/9/4R4/9/9/4K4"))
+        assert not attackMap.isSafeMove(squareIndex((4,3)), squareIndex((3,3)), squareIndex((4,0)))
+        assert attackMap.isSafeMove(squareIndex((4,3)), squareIndex((4,4)), squareIndex((4,0)))
+        assert attackMap.isSafeMove(squareIndex((4,3)), squareIndex((4,5)), squareIndex((4,0)))
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testIncremental(self, compact: bool) -> None:
+        for gameFile in ("game1.txt", "game2.txt"):
+            game = replayGame(Path("tests/data/games") / gameFile, game=XiangqiEngine(compact=compact, verifyIncremental=True, cacheSize=0))
+            while len(game.moveHistory) > 0:
+                game.undoMove()
+                game._attackMap.verify()
+
+    def testCheckedGeneral(self) -> None:
+        game = XiangqiEngine.fromFen("3k5/9/9/9/9/9/9/9/9/3RK4 b - - 0 1")
+        assert game.isCurrentPlayerChecked
+        game = XiangqiEngine.fromFen("4k4/9/9/9/9/9/9/9/4A4/3K1R3 b - - 0 1")
+        assert not game.isCurrentPlayerChecked
+        game = XiangqiEngine.fromFen("4k4/9/9/9/9/9/9/4C4/9/3K5 b - - 0 1")
+        assert not game.isCurrentPlayerChecked
+        game = XiangqiEngine.fromFen("4k4/9/9/9/4p4/9/9/4C4/9/3K5 b - - 0 1")
+        assert game.isCurrentPlayerChecked
+        assert squareIndex((4,2)) in game._checks
+
+    def testSharedHorseLeg(self) -> None:
+        # NOTE: Both horses are blocked by the chariot, capturing either one lets the other give check
+        game = XiangqiEngine.fromFen("3k5/9/9/9/9/9/9/5n3/5Rn2/4K4 w - - 0 1")
+        assert game._attackMap.getPins(squareIndex((4,0))) == ({squareIndex((5,1)): set()}, set())
+        assert game.validMovesOf((5,1)) == []
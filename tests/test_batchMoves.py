@@ -0,0 +1,89 @@
+import random
+from typing import List, Set, Tuple
+
+import numpy as np
+import pytest
+
+from aiBoardGame.logic.engine.batchMoves import generateBatchMoves, detectChecks, boardsToArray, fensToArrays
+from aiBoardGame.logic.engine.perft import KNOWN_PERFT, START_FEN
+from aiBoardGame.logic.engine.utility import createXiangqiBoard
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+def randomPositions(seed: int, gameCount: int, maxPlies: int) -> List[Tuple[str, Set[Tuple[int, int]], bool]]:
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(gameCount):
+        engine = XiangqiEngine(compact=True, cacheSize=0)
+        for _ in range(rng.randint(1, maxPlies)):
+            positions.append((engine.fen, {(start, end) for start, ends in engine._validMoves.items() for end in ends}, engine.isCurrentPlayerChecked))
+            if engine.isOver:
+                break
+            start = rng.choice(list(engine._validMoves))
+            engine.makeMove(start << 8 | rng.choice(engine._validMoves[start]))
+    return positions
+
+
+class TestBatchMoves:
+    def testStartPosition(self) -> None:
+        boards, sides = fensToArrays([START_FEN, START_FEN.replace(" w ", " b ")])
+        batchMoves = generateBatchMoves(boards, sides)
+        assert list(batchMoves.moveCounts) == [44, 44]
+        assert not batchMoves.inCheck.any()
+        assert batchMoves.masks.shape == (2, 90, 90)
+        assert batchMoves.masks.sum() == 88
+        assert set(batchMoves.moves[batchMoves.boardIndices == 0]) == {start << 8 | end for start, ends in XiangqiEngine(compact=True)._validMoves.items() for end in ends}
+
+    def testBoardsToArray(self) -> None:
+        boards, _ = fensToArrays([START_FEN])
+        dictBoard, _ = createXiangqiBoard()
+        assert np.array_equal(boardsToArray([dictBoard]), boards)
+        assert boards[0, 0, 4] == -boards[0, 9, 4] > 0
+
+    @pytest.mark.parametrize("seed", [0, 1])
+    def testRandomPositions(self, seed: int) -> None:
+        positions = randomPositions(seed, 15, 150)
+        boards, sides = fensToArrays([fen for fen, _, _ in positions])
+        batchMoves = generateBatchMoves(boards, sides, chunkSize=100)
+        moves: List[Set[Tuple[int, int]]] = [set() for _ in positions]
+        for boardIndex, start, end in zip(batchMoves.boardIndices, batchMoves.starts, batchMoves.ends):
+            moves[boardIndex].add((int(start), int(end)))
+        for (fen, validMoves, isChecked), boardMoves, inCheck in zip(positions, moves, batchMoves.inCheck):
+            assert boardMoves == validMoves, fen
+            assert inCheck == isChecked, fen
+
+    def testKnownPositions(self) -> None:
+        boards, sides = fensToArrays(list(KNOWN_PERFT))
+        assert list(generateBatchMoves(boards, sides).moveCounts) == [knownNodes[0] for knownNodes in KNOWN_PERFT.values()]
+
+    def testMate(self) -> None:
+        boards, sides = fensToArrays(["3k5/9/9/9/9/9/9/9/9/3RK4 b - - 0 1", "3k5/9/9/9/9/9/9/9/9/3R1K3 b - - 0 1"])
+        batchMoves = generateBatchMoves(boards, sides)
+        assert list(batchMoves.inCheck) == [True, True]
+        assert list(batchMoves.moveCounts) == [0, 1]
+        assert list(detectChecks(boards, sides)) == [True, True]
+        assert list(detectChecks(boards, -sides)) == [False, False]
+
+    def testInvalidInput(self) -> None:
+        boards, sides = fensToArrays([START_FEN])
+        with pytest.raises(ValueError):
+            generateBatchMoves(boards.reshape(1, 90), sides)
+        with pytest.raises(ValueError):
+            generateBatchMoves(boards, np.array([0]))
+        with pytest.raises(ValueError):
+            generateBatchMoves(np.zeros_like(boards), sides)
+        assert generateBatchMoves(boards[:0], sides[:0]).boardCount == 0
+
+
+class TestBatchMovesBenchmark:
+    @pytest.mark.benchmark(group="batchMoves")
+    def testBatch(self, benchmark) -> None:
+        positions = randomPositions(2, 10, 100)
+        boards, sides = fensToArrays([fen for fen, _, _ in positions])
+        assert benchmark(generateBatchMoves, boards, sides).boardCount == len(positions)
+
+    @pytest.mark.benchmark(group="batchMoves")
+    def testEngine(self, benchmark) -> None:
+        fens = [fen for fen, _, _ in randomPositions(2, 10, 100)]
+        assert len(benchmark(lambda: [XiangqiEngine.fromFen(fen, compact=True, cacheSize=0).isOver for fen in fens])) == len(fens)
+
@@ -0,0 +1,91 @@
+import copy
+import pickle
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Board, BoardEntity, Position, Side
+from aiBoardGame.logic.engine.boardCodec import BOARD_SIZE, boardFromBytes, boardToBytes, squaresView
+from aiBoardGame.logic.engine.compactBoard import CompactBoard
+from aiBoardGame.logic.engine.pieces import Cannon, Soldier
+from aiBoardGame.logic.engine.utility import createXiangqiBoard, fenMoveNotationToMove
+from aiBoardGame.logic.engine.tables import squareIndex
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+ROUND_TRIPS = 100_000
+
+
+def gameBoards(boardType: type = Board) -> List[Board]:
+    game = XiangqiEngine()
+    boards = [CompactBoard.fromBoard(game.board) if boardType is CompactBoard else copy.deepcopy(game.board)]
+    with Path("tests/data/games/game1.txt").open(mode="r") as gameRecordFile:
+        for notation in gameRecordFile:
+            game.move(*fenMoveNotationToMove(game.board, game.currentSide, notation.rstrip("\n")))
+            boards.append(boardFromBytes(game.snapshot().squares, boardType))
+    return boards
+
+
+def dictRoundTrip(board: Board) -> Board:
+    # NOTE: Side states are pickled as nested dictionaries, like boards were before they had an encoding
+    restored = Board()
+    dict.update(restored, pickle.loads(pickle.dumps(dict(board))))
+    return restored
+
+
+class TestBoardCodec:
+    @pytest.mark.parametrize("boardType", [Board, CompactBoard])
+    def testRoundTrip(self, boardType: type) -> None:
+        for board in gameBoards(boardType):
+            data = board.toBytes()
+            assert len(data) == BOARD_SIZE and data == boardToBytes(CompactBoard.fromBoard(board))
+            for decodedType in (Board, CompactBoard):
+                decoded = decodedType.fromBytes(data)
+                assert type(decoded) is decodedType and decoded == board and decoded.fen == board.fen
+
+    def testEncoding(self) -> None:
+        board, _ = createXiangqiBoard()
+        data = board.toBytes()
+        assert data[0] == 3 and data[1 * Board.fileCount + 7] == 0 and data[9 * Board.fileCount + 4] == 256 - 5
+        assert boardFromBytes(bytes(BOARD_SIZE)) == Board()
+        for invalid in (data[:-1], data + b"\x00", bytes([9]) + data[1:], bytes([256 - 8]) + data[1:], bytes([8]) + data[1:]):
+            with pytest.raises(ValueError):
+                Board.fromBytes(invalid)
+
+    def testPickle(self) -> None:
+        for boardType in (Board, CompactBoard):
+            board = gameBoards(boardType)[40]
+            data = pickle.dumps(board)
+            assert len(data) < len(pickle.dumps(dict(board))) / 3
+            restored = pickle.loads(data)
+            assert type(restored) is boardType and restored == board
+            copied = copy.deepcopy(board)
+            copied[Position(4,4)] = BoardEntity(Side.RED, Soldier)
+            assert copied != board and copy.copy(board) == board
+
+    def testSquaresView(self) -> None:
+        board = CompactBoard.fromBoard(createXiangqiBoard()[0])
+        view = squaresView(board)
+        assert view.shape == (Board.rankCount, Board.fileCount) and view.dtype == np.int8
+        assert np.array_equal(view, squaresView(board.toBytes()))
+        board.movePiece(squareIndex((1,2)), squareIndex((4,2)))
+        assert (view[2, 1], view[2, 4]) == (0, 2) and board[4,2] == BoardEntity(Side.RED, Cannon)
+        with pytest.raises(ValueError):
+            view[0, 0] = 0
+        assert np.count_nonzero(squaresView(bytearray(BOARD_SIZE))) == 0
+
+
+class TestBoardCodecBenchmark:
+    @pytest.mark.parametrize("encoding", ["dict", "bytes"])
+    @pytest.mark.benchmark(group="boardCodec")
+    def testPickleRoundTrip(self, benchmark, encoding: str) -> None:
+        boards = gameBoards()
+
+        def roundTrip() -> int:
+            if encoding == "dict":
+                return sum(len(dictRoundTrip(boards[index % len(boards)])) for index in range(ROUND_TRIPS))
+            return sum(len(pickle.loads(pickle.dumps(boards[index % len(boards)]))) for index in range(ROUND_TRIPS))
+
+        assert benchmark.pedantic(roundTrip, rounds=1, iterations=1) == 2 * ROUND_TRIPS
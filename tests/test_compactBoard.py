@@ -0,0 +1,143 @@
+import copy
+import pickle
+from pathlib import Path
+from typing import Dict, List, Set
+
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Board, BoardEntity, Side, Position
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, fenToSquares
+from aiBoardGame.logic.engine.pieces import General, Horse, Chariot, Soldier
+from aiBoardGame.logic.engine.utility import createXiangqiBoard, fenToBoard, fenMoveNotationToMove
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.engine.zobrist import squaresHash, zobristHash
+
+
+def asSets(moves: Dict[Position, List[Position]]) -> Dict[Position, Set[Position]]:
+    return {start: set(ends) for start, ends in moves.items()}
+
+
+def dictBoardMoves(board: Board, side: Side) -> Dict[Position, List[Position]]:
+    allPossibleMoves = {}
+    for position, piece in board[side].items():
+        possibleMoves = piece.getPossibleMoves(board, position)
+        if len(possibleMoves) > 0:
+            allPossibleMoves[position] = possibleMoves
+    return allPossibleMoves
+
+
+class TestCompactBoard:
+    def testBoardCreation(self) -> None:
+        board, _ = createXiangqiBoard(CompactBoard)
+        dictBoard, _ = createXiangqiBoard()
+        assert isinstance(board, CompactBoard)
+        assert board == dictBoard
+        assert dictBoard == board
+        assert board.pieces == dictBoard.pieces
+        assert board.fen == dictBoard.fen
+
+    def testGetItem(self) -> None:
+        board = CompactBoard()
+        board[Side.RED][4,0] = General
+        board[Side.BLACK][4,1] = Soldier
+        assert board[4,0] == BoardEntity(Side.RED, General)
+        assert board[Position(4,1)] == BoardEntity(Side.BLACK, Soldier)
+        assert board[4,2] is None
+        assert board[-1,0] is None
+        assert board[Side.RED][4,0] == General
+        assert board[Side.RED][4,1] is None
+        assert board[Side.BLACK][4,1] == Soldier
+        assert dict(board[Side.RED]) == {Position(4,0): General}
+
+    def testSetItem(self) -> None:
+        board = CompactBoard()
+        board[2,2] = BoardEntity(Side.RED, Horse)
+        board[2,2] = BoardEntity(Side.BLACK, Chariot)
+        assert board[2,2] == BoardEntity(Side.BLACK, Chariot)
+        assert len(board[Side.RED]) == 0
+        board[2,2] = None
+        assert board[2,2] is None
+        assert len(board.pieces) == 0
+        with pytest.raises(TypeError):
+            board[Side.RED][2,2] = BoardEntity(Side.RED, Horse)
+
+    def testFromBoard(self) -> None:
+        fen = "3akab2/9/4b4/p3p3p/2p6/6P2/P3P3P/4B4/4A4/2BAK4 w - - 0 1"
+        assert CompactBoard.fromBoard(fenToBoard(fen)).fen == fen.split(" ")[0]
+        assert fenToBoard(fen, CompactBoard) == fenToBoard(fen)
+
+    def testFenToSquares(self) -> None:
+        fen = "3akab2/9/4b4/p3p3p/2p6/6P2/P3P3P/4B4/4A4/2BAK4 b - - 0 1"
+        assert fenToSquares(fen) == fenToBoard(fen, CompactBoard).squares
+        assert squaresHash(fenToSquares(fen), Side.BLACK) == zobristHash(fenToBoard(fen), Side.BLACK)
+        for invalidFen in ["3akab2/9", "3akab2/9/4b4/p3p3p/2p6/6P2/P3P3P/4B4/4A4/2BAK5", "3akab2/9/4b4/p3p3p/2p6/6P2/P3P3P/4B4/4A4/2BAX4"]:
+            with pytest.raises(ValueError):
+                fenToSquares(invalidFen)
+
+    def testCopy(self) -> None:
+        board, _ = createXiangqiBoard(CompactBoard)
+        for copiedBoard in [pickle.loads(pickle.dumps(board)), copy.deepcopy(board)]:
+            assert isinstance(copiedBoard, CompactBoard)
+            assert copiedBoard == board
+            copiedBoard[0,0] = None
+            assert board[0,0] == BoardEntity(Side.RED, Chariot)
+
+    def testStartPossibleMoves(self) -> None:
+        board, _ = createXiangqiBoard(CompactBoard)
+        for side in Side:
+            assert asSets(board.getAllPossibleMoves(side)) == asSets(dictBoardMoves(board, side))
+
+    @pytest.mark.parametrize("gameRecord", [Path("tests/data/games/game1.txt"), Path("tests/data/games/game2.txt")])
+    def testGamePossibleMoves(self, gameRecord: Path) -> None:
+        game = XiangqiEngine()
+        compactGame = XiangqiEngine(compact=True)
+        with gameRecord.open(mode="r") as gameRecordFile:
+            for notation in gameRecordFile:
+                board = CompactBoard.fromBoard(game.board)
+                for side in Side:
+                    assert asSets(board.getAllPossibleMoves(side)) == asSets(dictBoardMoves(game.board, side))
+                assert asSets(compactGame._validMoves) == asSets(game._validMoves)
+                start, end = fenMoveNotationToMove(game.board, game.currentSide, notation.rstrip("\n"))
+                game.move(start, end)
+                compactGame.move(start, end)
+        assert compactGame.board == game.board
+        assert compactGame.isOver == game.isOver
+
+
+class TestMoveGenerationBenchmark:
+    fen = "r1bakab1r/9/1cn3nc1/p1p1p1p1p/9/9/P1P1P1P1P/1CN3NC1/9/R1BAKAB1R w - - 0 1"
+
+    @pytest.mark.benchmark(group="possibleMoves")
+    def testDictBoard(self, benchmark) -> None:
+        board = fenToBoard(self.fen)
+        assert len(benchmark(dictBoardMoves, board, Side.RED)) > 0
+
+    @pytest.mark.benchmark(group="possibleMoves")
+    def testCompactBoard(self, benchmark) -> None:
+        board = fenToBoard(self.fen, CompactBoard)
+        assert len(benchmark(board.getAllPossibleMoves, Side.RED)) > 0
+
+    @pytest.mark.benchmark(group="possibleMoves")
+    def testCompactBoardSquares(self, benchmark) -> None:
+        board = fenToBoard(self.fen, CompactBoard)
+        assert len(benchmark(board.getAllPossibleEnds, Side.RED)) > 0
+
+    @pytest.mark.benchmark(group="validMoves")
+    def testDictEngine(self, benchmark) -> None:
+        benchmark(XiangqiEngine(cacheSize=0)._calculateValidMoves)
+
+    @pytest.mark.benchmark(group="validMoves")
+    def testCompactEngine(self, benchmark) -> None:
+        benchmark(XiangqiEngine(compact=True, cacheSize=0)._calculateValidMoves)
+
+    @pytest.mark.benchmark(group="validMoves")
+    def testCachedEngine(self, benchmark) -> None:
+        benchmark(XiangqiEngine()._calculateValidMoves)
+
+    @pytest.mark.benchmark(group="validMoves")
+    def testMidgameDictEngine(self, benchmark) -> None:
+        benchmark(XiangqiEngine.fromFen(self.fen, cacheSize=0)._calculateValidMoves)
+
+    @pytest.mark.benchmark(group="validMoves")
+    def testMidgameCompactEngine(self, benchmark) -> None:
+        benchmark(XiangqiEngine.fromFen(self.fen, compact=True, cacheSize=0)._calculateValidMoves)
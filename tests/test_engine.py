@@ -1,12 +1,22 @@
-import pytest
+import copy
+import dataclasses
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
 
-from aiBoardGame.logic.engine.utility import createXiangqiBoard
+from aiBoardGame.logic.engine.utility import createXiangqiBoard, fenMoveNotationToMove
 from aiBoardGame.logic.engine.auxiliary import BoardEntity, Side, Position
-from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.engine.xiangqiEngine import DEFAULT_MIN_CONFIDENCE, XiangqiEngine
+from aiBoardGame.logic.engine.snapshot import PositionSnapshot
 from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
 from aiBoardGame.logic.engine.replay import replayGame
-from aiBoardGame.logic.engine.move import InvalidMove, MoveRecord
+from aiBoardGame.logic.engine.move import InvalidMove, MoveRecord, UndoStack, encodeMove, moveStart, moveEnd, positionsToMove, moveToPositions
+from aiBoardGame.logic.engine.positionCache import PositionCache
+from aiBoardGame.logic.engine.zobrist import zobristHash
+from aiBoardGame.logic.engine.tables import POSITIONS, squareIndex
 
 
 class TestEngine:
@@ -125,6 +135,20 @@ class TestEngine:
     def testFEN(self) -> None:
         assert XiangqiEngine().fen == "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
 
+    @pytest.mark.parametrize("fen, side", [
+        ("4k4/9/9/9/9/9/9/9/9/3K5", Side.RED),
+        ("4k4/9/9/9/9/9/9/9/9/3K5 b", Side.BLACK),
+        ("4k4/9/9/9/9/9/9/9/9/3K5 b - - 0 1", Side.BLACK)
+    ])
+    def testFromFen(self, fen: str, side: Side) -> None:
+        game = XiangqiEngine.fromFen(fen)
+        assert game.fen == f"4k4/9/9/9/9/9/9/9/9/3K5 {side.fen} - - 0 1"
+
+    @pytest.mark.parametrize("fen", ["4k4/9/9/9/9/9/9/9/9/3K5 b -", "4k4/9/9/9/9/9/9/9/9/3K5 r", "4k4/9/9/9/9/9/9/9/3K5 w", "4k4/9/9/9/9/9/9/9/9/9 w"])
+    def testInvalidFen(self, fen: str) -> None:
+        with pytest.raises(ValueError, match=".+"):
+            XiangqiEngine.fromFen(fen)
+
     def testGame1(self) -> None:
         gameRecord = Path("tests/data/games/game1.txt")
         game = replayGame(gameRecord)
@@ -135,3 +159,301 @@ class TestEngine:
         game = replayGame(gameRecord)
         assert game.isOver
         assert game.winner == Side.RED
+
+
+class TestIncrementalEngine:
+    @pytest.mark.parametrize("compact", [False, True])
+    def testGame1(self, compact: bool) -> None:
+        gameRecord = Path("tests/data/games/game1.txt")
+        game = replayGame(gameRecord, game=XiangqiEngine(compact=compact, incremental=True, verifyIncremental=True, cacheSize=0))
+        assert not game.isOver
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testGame2(self, compact: bool) -> None:
+        gameRecord = Path("tests/data/games/game2.txt")
+        game = replayGame(gameRecord, game=XiangqiEngine(compact=compact, incremental=True, verifyIncremental=True, cacheSize=0))
+        assert game.isOver
+        assert game.winner == Side.RED
+
+    def testUndoMove(self) -> None:
+        game = replayGame(Path("tests/data/games/game1.txt"), game=XiangqiEngine(incremental=True, verifyIncremental=True, cacheSize=0))
+        fullGame = replayGame(Path("tests/data/games/game1.txt"))
+        while len(game.moveHistory) > 0:
+            game.undoMove()
+            fullGame.undoMove()
+            assert game._validMoves == fullGame._validMoves
+
+    def testValidMoves(self) -> None:
+        game = XiangqiEngine()
+        validMoves = game.validMoves
+        assert Position(1,9) in validMoves[Position(1,2)]
+        assert sum(len(ends) for ends in validMoves.values()) == 44
+        assert set(game._validMoves[squareIndex((1,2))]) == {squareIndex(end) for end in validMoves[Position(1,2)]}
+
+    def testNewGame(self) -> None:
+        game = XiangqiEngine(compact=True, incremental=True)
+        game.move((0,0),(0,1))
+        game.newGame()
+        assert game.isCompact and game.isIncremental
+        assert game._validMoves == XiangqiEngine(compact=True)._validMoves
+
+
+class TestLazyEngine:
+    @pytest.mark.parametrize("compact", [False, True])
+    @pytest.mark.parametrize("incremental", [False, True])
+    def testGame2(self, compact: bool, incremental: bool) -> None:
+        game = XiangqiEngine(compact=compact, incremental=incremental, cacheSize=0, lazy=True)
+        fullGame = XiangqiEngine()
+        with Path("tests/data/games/game2.txt").open(mode="r") as gameRecordFile:
+            for notation in gameRecordFile:
+                start, end = fenMoveNotationToMove(fullGame.board, fullGame.currentSide, notation.rstrip("\n"))
+                assert game.validMovesOf(start) == fullGame.validMoves[start] and not game.isOver
+                game.move(start, end)
+                fullGame.move(start, end)
+        assert game.isLazy and game.isOver and game.winner == Side.RED
+        while len(game.moveHistory) > 0:
+            game.undoMove()
+            fullGame.undoMove()
+            assert game._validMoves == fullGame._validMoves and game.validMoves == fullGame.validMoves
+
+    def testOnDemandGeneration(self) -> None:
+        game = XiangqiEngine(lazy=True)
+        assert not game.isOver and 0 < len(game._validMoves._moves) < len(game.board[Side.RED])
+        assert game.validMovesOf((0,3)) == [Position(0,4)] and game.validMovesOf((0,6)) == []
+        with pytest.raises(InvalidMove):
+            game.move((1,0),(1,1))
+        assert game.perft(3) == XiangqiEngine().perft(3)
+
+    def testLeftPosition(self) -> None:
+        game = XiangqiEngine(lazy=True, cacheSize=0)
+        validMoves = game._validMoves
+        game.move((0,3),(0,4))
+        with pytest.raises(RuntimeError):
+            validMoves[squareIndex((1,2))]
+        game.undoMove()
+        assert validMoves[squareIndex((1,2))] == game._validMoves[squareIndex((1,2))]
+
+
+class TestPositionCache:
+    def testEviction(self) -> None:
+        cache = PositionCache(2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        assert cache.get(1) == "a"
+        cache.put(3, "c")
+        assert 1 in cache and 3 in cache and 2 not in cache
+        assert cache.get(2) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+        with pytest.raises(ValueError):
+            PositionCache(0)
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testHash(self, compact: bool) -> None:
+        game = XiangqiEngine(compact=compact)
+        startHash = game.hash
+        assert startHash == zobristHash(game.board, Side.RED)
+        with Path("tests/data/games/game1.txt").open(mode="r") as gameRecordFile:
+            for notation in gameRecordFile:
+                game.move(*fenMoveNotationToMove(game.board, game.currentSide, notation.rstrip("\n")))
+                assert game.hash == zobristHash(game.board, game.currentSide)
+        while len(game.moveHistory) > 0:
+            game.undoMove()
+        assert game.hash == startHash
+
+    def testCachedValidMoves(self) -> None:
+        game = replayGame(Path("tests/data/games/game1.txt"))
+        uncachedGame = replayGame(Path("tests/data/games/game1.txt"), game=XiangqiEngine(cacheSize=0))
+        assert uncachedGame.positionCache is None
+        hits, misses = game.positionCache.hits, game.positionCache.misses
+        while len(game.moveHistory) > 0:
+            game.undoMove()
+            uncachedGame.undoMove()
+            assert game._validMoves == uncachedGame._validMoves
+            assert game._checks == uncachedGame._checks
+        # NOTE: Undo restores the stacked valid moves without looking up the cache
+        assert game.positionCache.misses == misses
+        assert game.positionCache.hits == hits
+
+    def testNewGameKeepsCache(self) -> None:
+        game = XiangqiEngine()
+        game.move((0,0),(0,1))
+        game.newGame()
+        assert game.positionCache.hits == 1
+
+
+class TestMakeMove:
+    def testEncoding(self) -> None:
+        move = positionsToMove(Position(8,9), Position(0,0))
+        assert move == encodeMove(89, 0)
+        assert move < 2**16
+        assert (moveStart(move), moveEnd(move)) == (89, 0)
+        assert moveToPositions(move) == (Position(8,9), Position(0,0))
+
+    def testUndoStack(self) -> None:
+        undoStack = UndoStack(capacity=1)
+        undoStack.push(encodeMove(0, 9), 3, 0)
+        undoStack.push(encodeMove(19, 9), -2, 3)
+        assert len(undoStack) == 2
+        assert undoStack.moves == [encodeMove(0, 9), encodeMove(19, 9)]
+        assert undoStack[-1] == MoveRecord(Position(1,2), Position(0,1), BoardEntity(Side.BLACK, Cannon), BoardEntity(Side.RED, Chariot))
+        assert undoStack[:1] == [MoveRecord(Position(0,0), Position(0,1), BoardEntity(Side.RED, Chariot), None)]
+        assert undoStack.pop() == (encodeMove(19, 9), -2, 3)
+        undoStack.clear()
+        with pytest.raises(IndexError):
+            undoStack.pop()
+        with pytest.raises(ValueError):
+            UndoStack(capacity=0)
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testMakeUnmake(self, compact: bool) -> None:
+        game = XiangqiEngine(compact=compact, cacheSize=0)
+        with Path("tests/data/games/game1.txt").open(mode="r") as gameRecordFile:
+            for notation in gameRecordFile:
+                fen, positionHash, validMoves = game.fen, game.hash, game._validMoves
+                for start, ends in validMoves.items():
+                    for end in ends:
+                        game.makeMove(encodeMove(start, end))
+                        assert game.hash == zobristHash(game.board, game.currentSide)
+                        game.unmakeMove()
+                assert (game.fen, game.hash, game._validMoves) == (fen, positionHash, validMoves)
+                game.makeMove(positionsToMove(*fenMoveNotationToMove(game.board, game.currentSide, notation.rstrip("\n"))))
+        assert game.board == replayGame(Path("tests/data/games/game1.txt")).board
+
+
+def snapshotPerft(snapshot: PositionSnapshot, depth: int) -> int:
+    return XiangqiEngine.fromSnapshot(snapshot, compact=True, cacheSize=0).perft(depth)
+
+
+def midgameEngine() -> XiangqiEngine:
+    game = XiangqiEngine(compact=True)
+    with Path("tests/data/games/game1.txt").open(mode="r") as gameRecordFile:
+        for notation in list(gameRecordFile)[:21]:
+            game.makeMove(positionsToMove(*fenMoveNotationToMove(game.board, game.currentSide, notation.rstrip("\n"))))
+    return game
+
+
+class TestSnapshot:
+    @pytest.mark.parametrize("compact", [False, True])
+    def testRoundTrip(self, compact: bool) -> None:
+        game = midgameEngine()
+        snapshot = game.snapshot()
+        assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+        assert (snapshot.fen, snapshot.hash, snapshot.side, snapshot.ply) == (game.fen, game.hash, Side.BLACK, 21)
+        restored = XiangqiEngine.fromSnapshot(pickle.loads(pickle.dumps(snapshot)), compact=compact)
+        assert restored.isCompact == compact and len(restored.moveHistory) == 0
+        assert (restored.board, restored.generals, restored.currentSide, restored.hash, restored.score, restored._validMoves) == (game.board, game.generals, game.currentSide, game.hash, game.score, game._validMoves)
+        assert restored.snapshot() == XiangqiEngine.fromFen(game.fen).snapshot() == dataclasses.replace(snapshot, ply=0)
+
+    def testIndependence(self) -> None:
+        game = midgameEngine()
+        snapshot = game.snapshot()
+        restored = XiangqiEngine.fromSnapshot(snapshot)
+        restored.makeMove(encodeMove(*next((start, ends[0]) for start, ends in restored._validMoves.items())))
+        game.undoMove()
+        assert XiangqiEngine.fromSnapshot(snapshot).hash == snapshot.hash != game.hash != restored.hash
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            snapshot.side = Side.RED
+
+    def testInvalidSnapshots(self) -> None:
+        snapshot = XiangqiEngine().snapshot()
+        with pytest.raises(ValueError):
+            dataclasses.replace(snapshot, squares=snapshot.squares[:-1])
+        with pytest.raises(ValueError):
+            XiangqiEngine.fromSnapshot(dataclasses.replace(snapshot, squares=snapshot.squares.replace(bytes([5]), bytes([0]))))
+
+    def testProcesses(self) -> None:
+        game = midgameEngine()
+        snapshots = []
+        for start, ends in list(game._validMoves.items())[:4]:
+            game.makeMove(encodeMove(start, ends[0]))
+            snapshots.append(game.snapshot())
+            game.unmakeMove()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(snapshotPerft, snapshots, [2] * len(snapshots))) == [XiangqiEngine.fromFen(snapshot.fen, compact=True).perft(2) for snapshot in snapshots]
+
+
+class TestSnapshotBenchmark:
+    @pytest.mark.benchmark(group="snapshot")
+    def testDeepCopy(self, benchmark) -> None:
+        game = midgameEngine()
+        assert benchmark(copy.deepcopy, game).hash == game.hash
+
+    @pytest.mark.benchmark(group="snapshot")
+    def testSnapshot(self, benchmark) -> None:
+        game = midgameEngine()
+        assert benchmark(lambda: XiangqiEngine.fromSnapshot(game.snapshot(), compact=True)).hash == game.hash
+
+
+def observedBoard(game: XiangqiEngine, start: Position, end: Position, misread: Dict[Position, Optional[BoardEntity]]):
+    board = game.snapshot().toBoard()
+    board[end], board[start] = board[start], None
+    for position, boardEntity in misread.items():
+        board[position] = boardEntity
+    return board
+
+
+class TestUpdate:
+    @pytest.mark.parametrize("compact", [False, True])
+    def testExactMatch(self, compact: bool) -> None:
+        game = XiangqiEngine(compact=compact)
+        board = observedBoard(game, Position(1,2), Position(4,2), {})
+        match = game.update(board)
+        assert (match.start, match.end, match.distance, match.confidence) == (Position(1,2), Position(4,2), 0, 1.0)
+        assert game.board == board and game.currentSide == Side.BLACK
+
+    def testMisreadSquare(self) -> None:
+        game = midgameEngine()
+        start, ends = next((start, ends) for start, ends in game._validMoves.items() if len(ends) > 1)
+        end = POSITIONS[ends[0]]
+        emptyPosition = next(position for position in POSITIONS if game.board[position] is None and squareIndex(position) not in ends)
+        board = observedBoard(game, POSITIONS[start], end, {emptyPosition: BoardEntity(Side.RED, Soldier)})
+        fen = game.fen
+        match = game.update(board)
+        assert (match.start, match.end, match.distance) == (POSITIONS[start], end, 1) and match.confidence >= DEFAULT_MIN_CONFIDENCE
+        game.undoMove()
+        assert game.fen == fen
+
+    def testRejectedBoards(self) -> None:
+        game = XiangqiEngine()
+        with pytest.raises(InvalidMove):
+            game.update(game.snapshot().toBoard())
+        # NOTE: A horse cannot move straight, so every horse destination is equally near
+        with pytest.raises(InvalidMove):
+            game.update(observedBoard(game, Position(1,0), Position(1,1), {}))
+        board = observedBoard(game, Position(1,2), Position(4,2), {Position(0,5): BoardEntity(Side.RED, Soldier), Position(8,5): BoardEntity(Side.RED, Soldier)})
+        assert game.matchBoard(board).confidence < DEFAULT_MIN_CONFIDENCE
+        with pytest.raises(InvalidMove):
+            game.update(board)
+        assert game.update(board, minConfidence=0.0).distance == 2
+
+
+class TestUpdateBenchmark:
+    @pytest.mark.benchmark(group="update")
+    def testUpdate(self, benchmark) -> None:
+        game = midgameEngine()
+        start, ends = next(iter(game._validMoves.items()))
+        board = observedBoard(game, POSITIONS[start], POSITIONS[ends[0]], {})
+
+        def updateAndUndo() -> None:
+            game.update(board)
+            game.undoMove()
+
+        benchmark(updateAndUndo)
+        assert game.update(board).distance == 0
+
+
+class TestLazyEngineBenchmark:
+    @pytest.mark.parametrize("lazy", [False, True])
+    @pytest.mark.benchmark(group="lazy")
+    def testValidateMove(self, benchmark, lazy: bool) -> None:
+        game = XiangqiEngine(cacheSize=0, lazy=lazy)
+        move, reply = positionsToMove(Position(1,2), Position(4,2)), positionsToMove(Position(1,9), Position(2,7))
+
+        def validateReply() -> bool:
+            game.makeMove(move)
+            try:
+                return not game.isOver and game.isValidMove(reply)
+            finally:
+                game.unmakeMove()
+
+        assert benchmark(validateReply)
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Board
+from aiBoardGame.logic.engine.batchMoves import boardsToArray, fensToArrays
+from aiBoardGame.logic.engine.compactBoard import CompactBoard
+from aiBoardGame.logic.engine.evaluation import Evaluation, evaluate, evaluateBatch, staticScores
+from aiBoardGame.logic.engine.perft import KNOWN_PERFT, START_FEN
+from aiBoardGame.logic.engine.utility import fenToBoard, fenMoveNotationToMove
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+class TestEvaluation:
+    def testStartPosition(self) -> None:
+        assert evaluate(fenToBoard(START_FEN)) == Evaluation(0, 0, 0, 0)
+        assert XiangqiEngine().score == 0
+
+    def testMaterial(self) -> None:
+        evaluation = evaluate(fenToBoard("3k5/9/9/9/9/9/9/9/9/4K3R"))
+        assert evaluation.material == 900
+        assert evaluation.score > 0
+        assert evaluate(fenToBoard("3k4r/9/9/9/9/9/9/9/9/4K4")).material == -900
+
+    def testMirrored(self) -> None:
+        # NOTE: Swapping the sides and flipping the ranks negates every term
+        boards, _ = fensToArrays(list(KNOWN_PERFT))
+        assert np.array_equal(evaluateBatch(-boards[:, ::-1]), -evaluateBatch(boards))
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testBoards(self, compact: bool) -> None:
+        for fen in KNOWN_PERFT:
+            assert evaluate(fenToBoard(fen, CompactBoard if compact else Board)) == evaluate(fenToBoard(fen))
+
+    def testBatch(self) -> None:
+        boards, _ = fensToArrays(list(KNOWN_PERFT))
+        terms = evaluateBatch(boards)
+        assert terms.shape == (len(KNOWN_PERFT), 4)
+        for fen, boardTerms in zip(KNOWN_PERFT, terms):
+            evaluation = evaluate(fenToBoard(fen))
+            assert tuple(boardTerms) == (evaluation.material, evaluation.placement, evaluation.mobility, evaluation.generalSafety)
+        assert np.array_equal(terms.sum(axis=1), [evaluate(fenToBoard(fen)).score for fen in KNOWN_PERFT])
+        with pytest.raises(ValueError):
+            evaluateBatch(boards.reshape(-1, 90))
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testIncremental(self, compact: bool) -> None:
+        game = XiangqiEngine(compact=compact, cacheSize=0)
+        with Path("tests/data/games/game1.txt").open(mode="r") as gameRecordFile:
+            for notation in gameRecordFile:
+                game.move(*fenMoveNotationToMove(game.board, game.currentSide, notation.rstrip("\n")))
+                assert game.score == sum(staticScores(game.board))
+                assert game.evaluate() == evaluate(game.board)
+        while len(game.moveHistory) > 0:
+            game.undoMove()
+            assert game.score == sum(staticScores(game.board))
+        assert game.score == 0
+        assert np.array_equal(evaluateBatch(boardsToArray([game.board]))[0], [0, 0, 0, 0])
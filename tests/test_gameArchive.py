@@ -0,0 +1,146 @@
+from pathlib import Path
+from random import Random
+
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.gameArchive import GameArchive, GameArchiveWriter, archiveGameRecords, main, INDEX_SUFFIX
+from aiBoardGame.logic.engine.move import encodeMove
+from aiBoardGame.logic.engine.notation import wxfGameToMoves
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.stockfish.fairyStockfish import Difficulty
+
+
+GAMES = Path("tests/data/games")
+
+
+def readGames():
+    return [wxfGameToMoves((GAMES / name).read_text().split()) for name in ("game1.txt", "game2.txt")]
+
+
+class TestGameArchive:
+    @pytest.mark.parametrize("keyframeInterval", [1, 7, 16, 1000])
+    def testPositions(self, tmp_path: Path, keyframeInterval: int) -> None:
+        games = readGames()
+        with GameArchiveWriter(tmp_path / "games.xqa", keyframeInterval) as writer:
+            assert writer.append(games[0], Side.RED, Difficulty.EASY, None, startedAt=10.0, timings=[0.25] * len(games[0])) == 0
+            assert writer.append(games[1], Side.RED, None, Difficulty.HARD, startedAt=20.0) == 1
+        with GameArchive(tmp_path / "games.xqa") as archive:
+            assert len(archive) == 2 and archive.keyframeInterval == keyframeInterval
+            assert [archive.plies(index) for index in range(2)] == [len(game) for game in games]
+            first, second = archive
+            assert (first.moves, first.timings, first.winner, first.redDifficulty, first.blackDifficulty, first.startedAt) == (games[0], [0.25] * len(games[0]), Side.RED, Difficulty.EASY, None, 10.0)
+            assert (second.plies, second.timings[0], second.redDifficulty, second.blackDifficulty, second.startedAt) == (len(games[1]), 0.0, None, Difficulty.HARD, 20.0)
+            assert first.start == archive.position(0, 0) == XiangqiEngine().snapshot()
+            for index, moves in enumerate(games):
+                engine = XiangqiEngine(compact=True, cacheSize=0)
+                for ply, move in enumerate(moves):
+                    assert archive.position(index, ply) == engine.snapshot()
+                    engine.makeMove(move)
+                assert archive.position(index - 2, len(moves)) == engine.snapshot()
+                assert archive.position(index, len(moves)).fen == engine.fen
+
+    def testStartPosition(self, tmp_path: Path) -> None:
+        engine = XiangqiEngine.fromFen("3k5/9/9/9/9/9/9/9/4R4/3K5 b - - 0 1")
+        start = engine.snapshot()
+        moves = [encodeMove(84, 85), encodeMove(13, 85)]
+        with GameArchiveWriter(tmp_path / "games.xqa", keyframeInterval=1) as writer:
+            writer.append(moves, Side.RED, start=start)
+        for move in moves:
+            engine.makeMove(move)
+        with GameArchive(tmp_path / "games.xqa") as archive:
+            assert archive[-1].start == start
+            assert archive.position(0, 2) == engine.snapshot() and archive.position(0, 2).side == Side.BLACK
+
+    def testAppendAndRecover(self, tmp_path: Path) -> None:
+        path = tmp_path / "games.xqa"
+        game1, game2 = readGames()
+        with GameArchiveWriter(path) as writer:
+            writer.append(game1)
+        with GameArchive(path) as archive:
+            with GameArchiveWriter(path, keyframeInterval=3) as writer:
+                assert writer.keyframeInterval == 16
+                writer.append(game2)
+            assert len(archive) == 1
+        # NOTE: Simulates a writer interrupted while appending a record and its index entry
+        size = path.stat().st_size
+        with path.open(mode="ab") as archiveFile:
+            archiveFile.write(b"\x01" * 100)
+        with Path(str(path) + INDEX_SUFFIX).open(mode="ab") as indexFile:
+            indexFile.write(b"\x02" * 3)
+        with GameArchiveWriter(path) as writer:
+            assert len(writer) == 2 and path.stat().st_size == size
+            writer.append(game1[:5])
+        with GameArchive(path) as archive:
+            assert [game.moves for game in archive[1:]] == [game2, game1[:5]]
+
+    def testMissingIndex(self, tmp_path: Path) -> None:
+        path = tmp_path / "games.xqa"
+        indexPath = Path(str(path) + INDEX_SUFFIX)
+        game1, game2 = readGames()
+        with GameArchiveWriter(path, keyframeInterval=7) as writer:
+            writer.append(game1)
+            writer.append(game2)
+            writer.append(game1[:5])
+        size = path.stat().st_size
+        with path.open(mode="ab") as archiveFile:
+            archiveFile.write(b"\x01" * 20)
+        indexPath.unlink()
+        with GameArchiveWriter(path) as writer:
+            assert len(writer) == 3 and writer.keyframeInterval == 7 and path.stat().st_size == size
+        with GameArchive(path) as archive:
+            assert [game.moves for game in archive] == [game1, game2, game1[:5]]
+        path.unlink()
+        with pytest.raises(ValueError):
+            GameArchiveWriter(path)
+        assert indexPath.exists()
+
+    def testErrors(self, tmp_path: Path) -> None:
+        game1, _ = readGames()
+        with GameArchiveWriter(tmp_path / "games.xqa") as writer:
+            with pytest.raises(ValueError):
+                writer.append(game1, timings=[1.0])
+            with pytest.raises(ValueError):
+                writer.append(game1[1:])
+            assert len(writer) == 0
+            writer.append(game1[:3])
+        with GameArchive(tmp_path / "games.xqa") as archive:
+            with pytest.raises(IndexError):
+                archive.position(0, 4)
+            with pytest.raises(IndexError):
+                archive.position(1, 0)
+        with pytest.raises(ValueError):
+            GameArchiveWriter(tmp_path / "other.xqa", keyframeInterval=0)
+        (tmp_path / "invalid.xqa").write_bytes(b"not an archive")
+        (tmp_path / f"invalid.xqa{INDEX_SUFFIX}").write_bytes(b"not an index")
+        with pytest.raises(ValueError):
+            GameArchive(tmp_path / "invalid.xqa")
+        with pytest.raises(ValueError):
+            GameArchiveWriter(tmp_path / "invalid.xqa")
+        with pytest.raises(FileNotFoundError):
+            GameArchive(tmp_path / "missing.xqa")
+
+    def testMain(self, tmp_path: Path) -> None:
+        (tmp_path / "records").mkdir()
+        (tmp_path / "records" / "illegal.txt").write_text("R1+9\n")
+        assert archiveGameRecords(tmp_path / "records", tmp_path / "games.xqa") == 0
+        assert main([str(GAMES), "--output", str(tmp_path / "games.xqa"), "--keyframe-interval", "8"]) == 0
+        with GameArchive(tmp_path / "games.xqa") as archive:
+            assert [game.moves for game in archive] == readGames() and archive.keyframeInterval == 16
+            assert [game.winner for game in archive] == [XiangqiEngine.fromSnapshot(archive.position(index, game.plies)).winner for index, game in enumerate(archive)]
+
+
+class TestGameArchiveBenchmark:
+    @pytest.mark.benchmark(group="gameArchive")
+    def testPosition(self, benchmark, tmp_path: Path) -> None:
+        games = readGames()
+        random = Random(0)
+        with GameArchiveWriter(tmp_path / "games.xqa") as writer:
+            for index in range(5000):
+                writer.append(games[index % 2])
+        with GameArchive(tmp_path / "games.xqa") as archive:
+            def position():
+                game = random.randrange(len(archive))
+                return archive.position(game, random.randint(0, archive.plies(game)))
+
+            assert benchmark(position).hash != 0
@@ -0,0 +1,100 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.search.alphaBetaSearch import AlphaBetaSearch, MATE_SCORE
+from aiBoardGame.logic.search.mateSearch import MatePuzzle, MateSearch, main, readMatePuzzles
+
+
+PUZZLES = readMatePuzzles(Path("tests/data/mates.epd"))
+SHORT_PUZZLES = [puzzle for puzzle in PUZZLES if puzzle.moves <= 3]
+
+
+def assertMates(puzzle: MatePuzzle, line: List) -> None:
+    engine = XiangqiEngine.fromFen(puzzle.fen)
+    attacker = engine.currentSide
+    for start, end in line:
+        engine.move(start, end)
+    assert len(line) == 2 * puzzle.moves - 1 and engine.isOver and engine.winner == attacker
+
+
+class TestMateSearch:
+    @pytest.mark.parametrize("puzzle", SHORT_PUZZLES, ids=[puzzle.fen for puzzle in SHORT_PUZZLES])
+    def testPuzzle(self, puzzle: MatePuzzle) -> None:
+        result = MateSearch(maxMoves=puzzle.moves).solve(puzzle.fen)
+        assert result.isMate and result.moves == puzzle.moves and not result.isDisproven
+        assertMates(puzzle, result.line)
+
+    def testShortestMate(self) -> None:
+        # NOTE: A longer move limit still finds the shortest mate, a shorter one proves there is none
+        puzzle = next(puzzle for puzzle in PUZZLES if puzzle.moves == 2)
+        assert MateSearch(maxMoves=4).solve(puzzle.fen).moves == 2
+        result = MateSearch(maxMoves=1).solve(puzzle.fen)
+        assert not result.isMate and result.isDisproven and result.moves is None
+
+    def testEngineRestored(self) -> None:
+        puzzle = SHORT_PUZZLES[-1]
+        engine = XiangqiEngine.fromFen(puzzle.fen, compact=True, lazy=True)
+        fen, positionHash = engine.fen, engine.hash
+        assert MateSearch(maxMoves=puzzle.moves).search(engine).isMate
+        assert engine.fen == fen and engine.hash == positionHash and len(engine.moveHistory) == 0
+        assert not MateSearch(maxMoves=1).search(XiangqiEngine()).isMate
+
+    def testLimits(self) -> None:
+        puzzle = PUZZLES[-1]
+        result = MateSearch(maxMoves=puzzle.moves, maxNodes=10).solve(puzzle.fen)
+        assert not result.isMate and not result.isDisproven and result.nodes == 10
+        result = MateSearch(maxMoves=puzzle.moves, moveTime=0).solve(puzzle.fen)
+        assert not result.isMate and not result.isDisproven
+        with pytest.raises(ValueError):
+            MateSearch(maxMoves=0)
+        with pytest.raises(ValueError):
+            MateSearch(processes=0)
+
+    def testChecksOnly(self) -> None:
+        for puzzle in SHORT_PUZZLES:
+            result = MateSearch(maxMoves=puzzle.moves, checksOnly=True).solve(puzzle.fen)
+            engine = XiangqiEngine.fromFen(puzzle.fen)
+            for index, (start, end) in enumerate(result.line):
+                engine.move(start, end)
+                assert index % 2 == 1 or engine.isCurrentPlayerChecked or engine.isOver
+            # NOTE: Quiet moves can be needed, then only a longer mate or none is found
+            assert not result.isMate or result.moves >= puzzle.moves
+
+    def testParallel(self) -> None:
+        for puzzle in SHORT_PUZZLES[:3]:
+            result = MateSearch(maxMoves=puzzle.moves, processes=2).solve(puzzle.fen)
+            assert result.moves == puzzle.moves
+            assertMates(puzzle, result.line)
+        assert MateSearch(maxMoves=1, processes=2).solve(SHORT_PUZZLES[-1].fen).isDisproven
+
+    def testMain(self, tmp_path: Path) -> None:
+        puzzlePath = tmp_path / "mates.epd"
+        boardFen, side, *_ = SHORT_PUZZLES[0].fen.split(" ")
+        puzzlePath.write_text(f"# NOTE: comment\n{boardFen} {side} - - dm {SHORT_PUZZLES[0].moves};\n\n")
+        assert readMatePuzzles(puzzlePath) == [SHORT_PUZZLES[0]]
+        assert main(["--puzzles", str(puzzlePath)]) == 0
+        puzzlePath.write_text(f"{boardFen} {side} - - dm {SHORT_PUZZLES[0].moves + 1};\n")
+        assert main(["--puzzles", str(puzzlePath)]) == 1
+        puzzlePath.write_text(f"{boardFen} {side} - - bm a0a1;\n")
+        with pytest.raises(ValueError):
+            readMatePuzzles(puzzlePath)
+
+
+class TestMateSearchBenchmark:
+    @pytest.mark.parametrize("solver", ["alphaBeta", "proofNumber"])
+    @pytest.mark.benchmark(group="mateSearch")
+    def testPuzzles(self, benchmark, solver: str) -> None:
+        def solve() -> int:
+            solved = 0
+            for puzzle in PUZZLES:
+                if solver == "alphaBeta":
+                    result = AlphaBetaSearch(maxDepth=2 * puzzle.moves - 1, moveTime=10**8).search(XiangqiEngine.fromFen(puzzle.fen, compact=True))
+                    solved += result.score == MATE_SCORE - 2 * puzzle.moves + 1
+                else:
+                    solved += MateSearch(maxMoves=puzzle.moves).solve(puzzle.fen).moves == puzzle.moves
+            return solved
+
+        assert benchmark.pedantic(solve, rounds=1, iterations=1) == len(PUZZLES)
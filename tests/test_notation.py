@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from aiBoardGame.logic.engine.move import InvalidMove, encodeMove, positionsToMove
+from aiBoardGame.logic.engine.notation import wxfToMove, moveToWxf, iccsToMove, moveToIccs, wxfGameToMoves, movesToWxfGame
+from aiBoardGame.logic.engine.tables import squareIndex
+from aiBoardGame.logic.engine.utility import fenMoveNotationToMove
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+GAMES = [Path("tests/data/games/game1.txt"), Path("tests/data/games/game2.txt")]
+
+
+def readNotations(path: Path):
+    return [line.strip() for line in path.read_text().splitlines() if len(line.strip()) > 0]
+
+
+def midgamePosition():
+    game = XiangqiEngine(compact=True, cacheSize=0)
+    wxfGameToMoves(readNotations(GAMES[0])[:20], game)
+    return game, [moveToWxf(game, positionsToMove(start, end)) for start, ends in game.validMoves.items() for end in ends]
+
+
+class TestNotation:
+    @pytest.mark.parametrize("path", GAMES)
+    def testGameRecords(self, path: Path) -> None:
+        notations = readNotations(path)
+        moves = wxfGameToMoves(notations)
+        game = XiangqiEngine(compact=True, cacheSize=0)
+        for notation, move in zip(notations, moves):
+            assert move == positionsToMove(*fenMoveNotationToMove(game.board, game.currentSide, notation))
+            game.makeMove(move)
+        assert movesToWxfGame(moves) == notations
+
+    def testWxf(self) -> None:
+        game = XiangqiEngine()
+        assert wxfToMove(game, "C2=5") == wxfToMove(game, "C2.5") == encodeMove(squareIndex((7, 2)), squareIndex((4, 2)))
+        assert wxfToMove(game, "H2+3") == wxfToMove(game, "N2+3") == encodeMove(squareIndex((7, 0)), squareIndex((6, 2)))
+        assert wxfToMove(game, "A4+5") == encodeMove(squareIndex((5, 0)), squareIndex((4, 1)))
+        game.makeMove(wxfToMove(game, "E3+5"))
+        assert moveToWxf(game, wxfToMove(game, "r1+2")) == "r1+2"
+        assert wxfToMove(game, "e7+5") == encodeMove(squareIndex((6, 9)), squareIndex((4, 7)))
+
+    def testTandem(self) -> None:
+        game = XiangqiEngine.fromFen("4k4/9/9/9/9/9/4R4/9/4R4/3K5 w - - 0 1")
+        front, rear = encodeMove(squareIndex((4, 3)), squareIndex((4, 4))), encodeMove(squareIndex((4, 1)), squareIndex((8, 1)))
+        assert (wxfToMove(game, "+R+1"), wxfToMove(game, "-R=1")) == (front, rear)
+        assert (moveToWxf(game, front), moveToWxf(game, rear)) == ("+R+1", "-R=1")
+
+        game = XiangqiEngine.fromFen("3k5/4r4/9/4r4/9/9/9/9/9/4K4 b - - 0 1")
+        front = encodeMove(squareIndex((4, 6)), squareIndex((4, 5)))
+        assert wxfToMove(game, "+r+1") == front and moveToWxf(game, front) == "+r+1"
+
+        game = XiangqiEngine.fromFen("4k4/9/9/4P4/4P4/4P4/9/9/9/3K5 w - - 0 1")
+        moves = [encodeMove(squareIndex((4, rank)), squareIndex((5, rank))) for rank in (6, 5, 4)]
+        assert [moveToWxf(game, move) for move in moves] == ["+P=4", "P5=4", "-P=4"]
+        assert [wxfToMove(game, moveToWxf(game, move)) for move in moves] == moves
+
+    def testTandemFiles(self) -> None:
+        # NOTE: Soldiers in tandem on two files need the file in the notation
+        game = XiangqiEngine.fromFen("3k5/9/9/P1P6/P1P6/9/9/9/9/4K4 w - - 0 1")
+        moves = [encodeMove(start, end) for start, ends in game._validMoves.items() for end in ends]
+        assert [wxfToMove(game, moveToWxf(game, move)) for move in moves] == moves
+        move = encodeMove(squareIndex((2, 6)), squareIndex((2, 7)))
+        assert moveToWxf(game, move) == "+P7+1" and wxfToMove(game, "+P7+1") == move
+        with pytest.raises(ValueError):
+            wxfToMove(game, "+P+1")
+
+    def testIccs(self) -> None:
+        move = encodeMove(squareIndex((7, 2)), squareIndex((4, 2)))
+        assert iccsToMove("h2e2") == iccsToMove("H2-E2") == move
+        assert moveToIccs(move) == "h2e2"
+        assert all(iccsToMove(moveToIccs(encodeMove(start, end))) == encodeMove(start, end) for start in range(90) for end in (0, 89))
+
+    def testErrors(self) -> None:
+        game = XiangqiEngine()
+        for notation in ("XYZ", "X1+1", "c2=5", "R0+1", "+C+1", "R5+1", "S1-9"):
+            with pytest.raises(ValueError):
+                wxfToMove(game, notation)
+        with pytest.raises(ValueError):
+            iccsToMove("j0a0")
+        with pytest.raises(ValueError):
+            moveToWxf(game, encodeMove(squareIndex((4, 4)), squareIndex((4, 5))))
+        with pytest.raises(InvalidMove):
+            wxfGameToMoves(["R1+9"])
+        with pytest.raises(InvalidMove):
+            movesToWxfGame([encodeMove(squareIndex((0, 0)), squareIndex((0, 9)))])
+
+
+class TestNotationBenchmark:
+    @pytest.mark.benchmark(group="notation")
+    def testFenMoveNotationToMove(self, benchmark) -> None:
+        notations = readNotations(GAMES[0])
+
+        def convert():
+            game = XiangqiEngine(compact=True, cacheSize=0)
+            for notation in notations:
+                game.makeMove(positionsToMove(*fenMoveNotationToMove(game.board, game.currentSide, notation)))
+            return game
+
+        assert len(benchmark(convert).moveHistory) == len(notations)
+
+    @pytest.mark.benchmark(group="notation")
+    def testWxfGameToMoves(self, benchmark) -> None:
+        notations = readNotations(GAMES[0])
+        assert len(benchmark(wxfGameToMoves, notations)) == len(notations)
+
+    @pytest.mark.benchmark(group="notationPosition")
+    def testFenMoveNotationToMovePosition(self, benchmark) -> None:
+        game, notations = midgamePosition()
+        assert len(benchmark(lambda: [fenMoveNotationToMove(game.board, game.currentSide, notation) for notation in notations])) == len(notations)
+
+    @pytest.mark.benchmark(group="notationPosition")
+    def testWxfToMovePosition(self, benchmark) -> None:
+        game, notations = midgamePosition()
+        assert len(benchmark(lambda: [wxfToMove(game, notation) for notation in notations])) == len(notations)
@@ -0,0 +1,70 @@
+from pathlib import Path
+from random import Random
+
+import pytest
+
+from aiBoardGame.logic.engine.notation import wxfGameToMoves
+from aiBoardGame.logic.engine.perft import START_FEN
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.search.openingBook import OpeningBook, BookMove, buildOpeningBook, main
+
+
+GAMES = Path("tests/data/games")
+
+
+@pytest.fixture
+def bookPath(tmp_path: Path) -> Path:
+    path = tmp_path / "book.bin"
+    buildOpeningBook(GAMES, path, maxPly=10)
+    return path
+
+
+class TestOpeningBook:
+    def testBuild(self, bookPath: Path) -> None:
+        game1, game2 = (wxfGameToMoves((GAMES / name).read_text().split()) for name in ("game1.txt", "game2.txt"))
+        with OpeningBook(bookPath) as book:
+            assert len(book) == 20
+            # NOTE: Red won game2, so its moves weigh double
+            assert book.lookup(XiangqiEngine().hash) == sorted([BookMove(game1[0], 1), BookMove(game2[0], 2)], key=lambda bookMove: bookMove.move)
+            game = XiangqiEngine(compact=True, cacheSize=0)
+            game.makeMove(game2[0])
+            for ply, move in enumerate(game2[1:10], start=1):
+                assert book.lookup(game.hash) == [BookMove(move, 1 if ply % 2 else 2)]
+                game.makeMove(move)
+            assert book.lookup(game.hash) == []
+
+    def testNextMove(self, bookPath: Path) -> None:
+        game2 = wxfGameToMoves((GAMES / "game2.txt").read_text().split())
+        with OpeningBook(bookPath, random=Random(0)) as book:
+            assert {book.nextMove(START_FEN) for _ in range(50)} == {book.lookup(XiangqiEngine().hash)[0].positions, book.lookup(XiangqiEngine().hash)[1].positions}
+            game = XiangqiEngine()
+            for move in game2[:3]:
+                game.makeMove(move)
+            assert book.nextMove(game.fen) == BookMove(game2[3], 1).positions
+            assert book.nextMove(game.fen, maxPly=3) is None
+            assert book.nextMove("3k5/9/9/9/9/9/9/9/9/4K3R w - - 0 1") is None
+
+    def testInvalidFiles(self, tmp_path: Path) -> None:
+        (tmp_path / "invalid.bin").write_bytes(b"not a book")
+        with pytest.raises(ValueError):
+            OpeningBook(tmp_path / "invalid.bin")
+        with pytest.raises(FileNotFoundError):
+            OpeningBook(tmp_path / "missing.bin")
+        (tmp_path / "illegal.txt").write_text("R1+9\n")
+        assert buildOpeningBook(tmp_path / "illegal.txt", tmp_path / "empty.bin") == 0
+        with OpeningBook(tmp_path / "empty.bin") as book:
+            assert len(book) == 0 and book.lookup(0) == []
+        with pytest.raises(ValueError):
+            buildOpeningBook(GAMES, tmp_path / "book.bin", maxPly=0)
+
+    def testMain(self, tmp_path: Path) -> None:
+        assert main([str(GAMES), "--output", str(tmp_path / "book.bin"), "--plies", "4"]) == 0
+        with OpeningBook(tmp_path / "book.bin") as book:
+            assert len(book) == 8
+
+
+class TestOpeningBookBenchmark:
+    @pytest.mark.benchmark(group="openingBook")
+    def testNextMove(self, benchmark, bookPath: Path) -> None:
+        with OpeningBook(bookPath) as book:
+            assert benchmark(book.nextMove, START_FEN) is not None
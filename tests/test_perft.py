@@ -0,0 +1,39 @@
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Position
+from aiBoardGame.logic.engine.perft import KNOWN_PERFT, START_FEN, perft, main
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+class TestPerft:
+    @pytest.mark.parametrize("fen", list(KNOWN_PERFT))
+    def testKnownPositions(self, fen: str) -> None:
+        knownNodes = KNOWN_PERFT[fen]
+        engine = XiangqiEngine.fromFen(fen, compact=True)
+        assert [engine.perft(depth) for depth in range(1, 3)] == list(knownNodes[:2])
+        assert engine.fen.split(" ")[:2] == fen.split(" ")[:2]
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def testStartPosition(self, compact: bool) -> None:
+        engine = XiangqiEngine(compact=compact, cacheSize=0)
+        assert engine.perft(0) == 1
+        assert engine.perft(3) == KNOWN_PERFT[START_FEN][2]
+        assert engine.fen == START_FEN
+
+    def testDivide(self) -> None:
+        engine = XiangqiEngine()
+        divide = engine.divide(2)
+        assert len(divide) == KNOWN_PERFT[START_FEN][0]
+        assert sum(divide.values()) == KNOWN_PERFT[START_FEN][1]
+        assert divide[Position(4,0), Position(4,1)] == 44
+        with pytest.raises(ValueError):
+            engine.divide(0)
+
+    def testProcesses(self) -> None:
+        result = perft(START_FEN, 2, processes=2)
+        assert result.divide == perft(START_FEN, 2).divide
+        assert result.nodes == KNOWN_PERFT[START_FEN][1]
+
+    def testMain(self) -> None:
+        assert main(["2", "--known"]) == 0
+        assert main(["1", "--fen", "4k4/9/9/9/9/9/9/9/9/3K5 b - - 0 1"]) == 0
@@ -2,6 +2,7 @@ from typing import List
 
 from aiBoardGame.logic.engine.auxiliary import Board, Side, Position
 from aiBoardGame.logic.engine.pieces import General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from aiBoardGame.logic.engine.tables import PALACE, OWN_HALF, POSITIONS, HORSE_MOVES, ELEPHANT_MOVES, SOLDIER_MOVES, RAYS, FORWARD_RAYS, DIRECTIONS, BETWEEN, SAME_LINE, OFF_BOARD, squareIndex
 
 
 def sortMoves(moveList: List[Position]) -> List[Position]:
@@ -256,3 +257,48 @@ class TestSoldier:
         board[Side.RED][4,2] = Soldier
         board[Side.BLACK][4,3] = Soldier
         assert Position(4,3) in Soldier.getPossibleMoves(board, Position(4,2))
+
+
+class TestTables:
+    def testSquareIndex(self) -> None:
+        for square, position in enumerate(POSITIONS):
+            assert squareIndex(position) == square
+        assert squareIndex((9,0)) == OFF_BOARD
+        assert squareIndex((0,-1)) == OFF_BOARD
+
+    def testMasks(self) -> None:
+        for side in Side:
+            assert sum(PALACE[side]) == 9
+            assert sum(OWN_HALF[side]) == 45
+            assert not PALACE[side][OFF_BOARD] and not OWN_HALF[side][OFF_BOARD]
+        assert PALACE[Side.RED][squareIndex((4,1))] and PALACE[Side.BLACK][squareIndex((4,8))]
+        assert OWN_HALF[Side.RED][squareIndex((0,4))] and not OWN_HALF[Side.RED][squareIndex((0,5))]
+
+    def testBlockingSquares(self) -> None:
+        horseMoves = dict(HORSE_MOVES[Side.RED][squareIndex((4,2))])
+        assert horseMoves[squareIndex((5,4))] == squareIndex((4,3))
+        assert horseMoves[squareIndex((6,1))] == squareIndex((5,2))
+        assert len(HORSE_MOVES[Side.RED][squareIndex((0,0))]) == 2
+        elephantMoves = dict(ELEPHANT_MOVES[Side.BLACK][squareIndex((2,5))])
+        assert elephantMoves == {squareIndex((0,7)): squareIndex((1,6)), squareIndex((4,7)): squareIndex((3,6))}
+
+    def testSoldierMoves(self) -> None:
+        assert SOLDIER_MOVES[Side.RED][squareIndex((0,4))] == (squareIndex((0,5)),)
+        assert set(SOLDIER_MOVES[Side.BLACK][squareIndex((0,4))]) == {squareIndex((0,3)), squareIndex((1,4))}
+        assert SOLDIER_MOVES[Side.RED][squareIndex((4,9))] == (squareIndex((5,9)), squareIndex((3,9)))
+
+    def testRays(self) -> None:
+        rays = RAYS[squareIndex((4,2))]
+        assert [len(ray) for ray in rays] == [4, 4, 7, 2]
+        assert rays[3] == (squareIndex((4,1)), squareIndex((4,0)))
+        assert FORWARD_RAYS[Side.BLACK][squareIndex((4,9))] == RAYS[squareIndex((4,9))][3]
+        assert RAYS[OFF_BOARD] == ((), (), (), ())
+
+    def testLines(self) -> None:
+        assert DIRECTIONS[squareIndex((0,0))][squareIndex((8,0))] == 1
+        assert DIRECTIONS[squareIndex((4,9))][squareIndex((4,0))] == -9
+        assert DIRECTIONS[squareIndex((0,0))][squareIndex((1,1))] == 0
+        assert BETWEEN[squareIndex((4,0))][squareIndex((4,4))] == (squareIndex((4,1)), squareIndex((4,2)), squareIndex((4,3)))
+        assert BETWEEN[squareIndex((4,0))][squareIndex((4,1))] == ()
+        assert SAME_LINE[squareIndex((2,3))][squareIndex((2,9))] and not SAME_LINE[squareIndex((2,3))][squareIndex((2,3))]
+        assert not SAME_LINE[squareIndex((2,3))][OFF_BOARD]
@@ -0,0 +1,93 @@
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from aiBoardGame.logic.engine.gameArchive import GameArchiveWriter
+from aiBoardGame.logic.engine.notation import wxfGameToMoves
+from aiBoardGame.logic.engine.perft import START_FEN
+from aiBoardGame.logic.engine.positionIndex import PositionIndex, PositionOccurrence, buildPositionIndex, main
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+GAMES = Path("tests/data/games")
+
+
+def readGames():
+    return [wxfGameToMoves((GAMES / name).read_text().split()) for name in ("game1.txt", "game2.txt")]
+
+
+@pytest.fixture
+def archivePath(tmp_path: Path) -> Path:
+    game1, game2 = readGames()
+    with GameArchiveWriter(tmp_path / "games.xqa") as writer:
+        for moves in (game1, game2, game1[:30]):
+            writer.append(moves)
+    return tmp_path / "games.xqa"
+
+
+class TestPositionIndex:
+    def testFind(self, archivePath: Path, tmp_path: Path) -> None:
+        game1, game2 = readGames()
+        assert buildPositionIndex(archivePath, tmp_path / "games.xqi") == 3
+        index = PositionIndex(tmp_path / "games.xqi")
+        assert len(index) == len(game1) + len(game2) + 30 + 3 and index.gameCount == 3
+        matches = index.find(START_FEN)
+        assert matches.games == [0, 1, 2] and matches.moveCounts == dict(Counter([game1[0], game2[0], game1[0]]))
+        for gameIndex, moves in enumerate((game1, game2, game1[:30])):
+            engine = XiangqiEngine(compact=True, cacheSize=0)
+            for ply, move in enumerate(moves):
+                assert PositionOccurrence(gameIndex, ply, move) in index.find(engine).occurrences
+                engine.makeMove(move)
+            assert PositionOccurrence(gameIndex, len(moves), None) in index.find(engine.fen).occurrences
+        engine = XiangqiEngine()
+        for move in game1[:30]:
+            engine.makeMove(move)
+        assert index.find(engine).occurrences[-2:] == [PositionOccurrence(0, 30, game1[30]), PositionOccurrence(2, 30, None)]
+        assert index.find("3k5/9/9/9/9/9/9/9/9/4K3R w - - 0 1").occurrences == []
+
+    def testIncremental(self, archivePath: Path, tmp_path: Path) -> None:
+        game1, _ = readGames()
+        assert buildPositionIndex(archivePath, tmp_path / "incremental.xqi", chunkSize=1) == 3
+        opened = PositionIndex(tmp_path / "incremental.xqi")
+        with GameArchiveWriter(archivePath) as writer:
+            writer.append(game1[:10])
+        assert buildPositionIndex(archivePath, tmp_path / "incremental.xqi") == 1
+        assert buildPositionIndex(archivePath, tmp_path / "incremental.xqi") == 0
+        assert buildPositionIndex(archivePath, tmp_path / "full.xqi") == 4
+        assert buildPositionIndex(archivePath, tmp_path / "parallel.xqi", processes=2, chunkSize=1) == 4
+        assert (tmp_path / "incremental.xqi").read_bytes() == (tmp_path / "full.xqi").read_bytes() == (tmp_path / "parallel.xqi").read_bytes()
+        assert opened.find(START_FEN).games == [0, 1, 2] and PositionIndex(tmp_path / "incremental.xqi").find(START_FEN).games == [0, 1, 2, 3]
+
+    def testErrors(self, archivePath: Path, tmp_path: Path) -> None:
+        buildPositionIndex(archivePath, tmp_path / "games.xqi")
+        with GameArchiveWriter(tmp_path / "other.xqa"):
+            pass
+        with pytest.raises(ValueError):
+            buildPositionIndex(tmp_path / "other.xqa", tmp_path / "games.xqi")
+        with pytest.raises(ValueError):
+            buildPositionIndex(archivePath, tmp_path / "games.xqi", processes=0)
+        assert buildPositionIndex(tmp_path / "other.xqa", tmp_path / "empty.xqi") == 0
+        assert len(PositionIndex(tmp_path / "empty.xqi")) == 0 and PositionIndex(tmp_path / "empty.xqi").find(START_FEN).games == []
+        (tmp_path / "invalid.xqi").write_bytes(b"not an index")
+        with pytest.raises(ValueError):
+            PositionIndex(tmp_path / "invalid.xqi")
+
+    def testMain(self, archivePath: Path, tmp_path: Path) -> None:
+        assert main(["--archive", str(archivePath), "--output", str(tmp_path / "games.xqi"), "--processes", "2"]) == 0
+        assert PositionIndex(tmp_path / "games.xqi").gameCount == 3
+
+
+class TestPositionIndexBenchmark:
+    @pytest.mark.benchmark(group="positionIndex")
+    def testFind(self, benchmark, tmp_path: Path) -> None:
+        games = readGames()
+        with GameArchiveWriter(tmp_path / "games.xqa") as writer:
+            for index in range(5000):
+                writer.append(games[index % 2][:index % 97 + 1])
+        buildPositionIndex(tmp_path / "games.xqa", tmp_path / "games.xqi")
+        index = PositionIndex(tmp_path / "games.xqi")
+        engine = XiangqiEngine()
+        for move in games[0][:40]:
+            engine.makeMove(move)
+        assert len(benchmark(index.find, engine).games) > 0
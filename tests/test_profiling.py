@@ -0,0 +1,89 @@
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+
+from aiBoardGame.logic.engine.perft import KNOWN_PERFT, START_FEN, main, perft
+from aiBoardGame.logic.engine.profiling import CACHED, CHECKS, GENERAL_SAFETY, PIN_FILTER, PINS, POSSIBLE_MOVES, PSTATS_FILE, EngineProfile
+from aiBoardGame.logic.engine.replay import replayGame
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+class TestProfiling:
+    @pytest.mark.parametrize("compact", [False, True])
+    def testPhases(self, compact: bool) -> None:
+        engine = XiangqiEngine(compact=compact, cacheSize=0)
+        with engine.profiled() as profile:
+            assert engine.profile is profile
+            assert engine.perft(2) == KNOWN_PERFT[START_FEN][1]
+        assert engine.profile is None
+        # NOTE: Every position below the root is generated once and each of its pieces is filtered once, 2 moves capture a horse
+        positions = KNOWN_PERFT[START_FEN][0]
+        assert profile.phases[CHECKS].calls == profile.phases[PINS].calls == profile.phases[POSSIBLE_MOVES].calls == positions
+        assert profile.phases[PIN_FILTER].calls + profile.phases[GENERAL_SAFETY].calls == 16 * positions - 2
+        assert 0 < profile.seconds and CACHED not in profile.phases
+        assert not any(name.startswith(f"{POSSIBLE_MOVES}.") for name in profile.phases)
+
+    def testLazyPhases(self) -> None:
+        engine = XiangqiEngine(cacheSize=0, lazy=True)
+        with engine.profiled() as profile:
+            assert engine.perft(2) == KNOWN_PERFT[START_FEN][1]
+        # NOTE: Lazily generated pieces are timed per piece class, the pieces of the root are generated inside the context too
+        positions = KNOWN_PERFT[START_FEN][0] + 1
+        assert sum(stats.calls for name, stats in profile.phases.items() if name.startswith(f"{POSSIBLE_MOVES}.")) == 16 * positions - 2
+        assert profile.phases[f"{POSSIBLE_MOVES}.Soldier"].calls == 5 * positions
+        assert profile.phases[PIN_FILTER].calls + profile.phases[GENERAL_SAFETY].calls == 16 * positions - 2
+        assert POSSIBLE_MOVES not in profile.phases
+
+    def testProfiledMoves(self) -> None:
+        engine = XiangqiEngine(cacheSize=0)
+        with engine.profiled():
+            profiledGame = replayGame(Path("tests/data/games/game1.txt"), game=engine)
+        game = replayGame(Path("tests/data/games/game1.txt"), game=XiangqiEngine(cacheSize=0))
+        assert profiledGame._validMoves == game._validMoves
+        while len(game.moveHistory) > 0:
+            with profiledGame.profiled():
+                profiledGame.undoMove()
+            game.undoMove()
+            assert profiledGame._validMoves == game._validMoves
+
+    def testLazyAndCached(self) -> None:
+        engine = XiangqiEngine(lazy=True)
+        profile = EngineProfile()
+        with engine.profiled(profile):
+            engine.move((1,2),(4,2))
+            assert engine.validMovesOf((1,9)) != []
+            engine.undoMove()
+            engine.move((1,2),(4,2))
+        assert profile.phases[CHECKS].calls == profile.phases[CACHED].calls == 1
+        # NOTE: Only the pieces needed to see that the game is not over and the asked horse were generated
+        assert 0 < sum(stats.calls for name, stats in profile.phases.items() if name.startswith("possibleMoves.")) < 16
+        assert profile.phases["possibleMoves.Horse"].calls >= 1
+        profile.reset()
+        assert profile.phases == {} and profile.seconds == 0
+
+    def testExport(self, tmp_path: Path) -> None:
+        profile = EngineProfile()
+        perft(START_FEN, 2, profile=profile)
+        profile.toJson(tmp_path / "profile.json")
+        with (tmp_path / "profile.json").open(mode="r") as jsonFile:
+            assert json.load(jsonFile)["phases"] == profile.asDict()
+        profile.toPstats(tmp_path / "profile.prof")
+        stats = pstats.Stats(str(tmp_path / "profile.prof"))
+        assert stats.stats[PSTATS_FILE, 0, CHECKS][:3] == (profile.phases[CHECKS].calls, profile.phases[CHECKS].calls, profile.phases[CHECKS].seconds)
+        assert stats.total_calls == sum(phase.calls for phase in profile.phases.values())
+        assert main(["2", "--profile", str(tmp_path / "main.json")]) == 0
+        assert (tmp_path / "main.json").exists()
+        with pytest.raises(ValueError):
+            perft(START_FEN, 2, processes=2, profile=profile)
+
+
+class TestProfilingBenchmark:
+    @pytest.mark.parametrize("profiled", [False, True])
+    @pytest.mark.benchmark(group="profiling")
+    def testPerft(self, benchmark, profiled: bool) -> None:
+        engine = XiangqiEngine(compact=True, cacheSize=0)
+        if profiled:
+            engine.profile = EngineProfile()
+        assert benchmark(engine.perft, 2) == KNOWN_PERFT[START_FEN][1]
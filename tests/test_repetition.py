@@ -0,0 +1,87 @@
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.move import positionsToMove
+from aiBoardGame.logic.engine.repetition import RepetitionHistory, RepetitionRules, RepetitionVerdict
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+def playCycle(engine: XiangqiEngine, moves, plies: int) -> None:
+    for ply in range(plies):
+        engine.makeMove(positionsToMove(*moves[ply % len(moves)]))
+
+
+CHECK_FEN = "3k5/9/9/9/9/9/9/9/9/4K3R w - - 0 1"
+CHECK_MOVES = [((8, 9), (8, 8)), ((3, 8), (3, 9)), ((8, 8), (8, 9)), ((3, 9), (3, 8))]
+
+CHASE_FEN = "3k5/9/9/9/c8/1R7/9/9/9/4K4 w - - 0 1"
+CHASE_MOVES = [((0, 4), (2, 4)), ((2, 5), (0, 5)), ((2, 4), (0, 4)), ((0, 5), (2, 5))]
+
+
+class TestRepetition:
+    def testRepetitionCount(self) -> None:
+        engine = XiangqiEngine()
+        horseMoves = [((1, 0), (2, 2)), ((1, 9), (2, 7)), ((2, 2), (1, 0)), ((2, 7), (1, 9))]
+        assert (engine.repetitionCount, engine.isRepetition) == (1, False)
+        playCycle(engine, horseMoves, 4)
+        assert (engine.repetitionCount, engine.isRepetition, engine.isPerpetualCheck, engine.isPerpetualChase) == (2, True, False, False)
+        playCycle(engine, horseMoves, 4)
+        assert engine.repetitionCount == 3
+        assert RepetitionRules().judge(engine) == RepetitionVerdict(None, "Position repeated 3 times")
+        engine.unmakeMove()
+        assert (engine.repetitionCount, RepetitionRules().judge(engine)) == (2, None)
+        engine.newGame()
+        assert engine.repetitionCount == 1
+
+    def testPerpetualCheck(self) -> None:
+        engine = XiangqiEngine.fromFen(CHECK_FEN, compact=True)
+        engine.makeMove(positionsToMove((8, 0), (8, 9)))
+        engine.makeMove(positionsToMove((3, 9), (3, 8)))
+        playCycle(engine, CHECK_MOVES, 3)
+        assert engine.repetitionCount == 2 and engine.isPerpetualCheck and engine.isPerpetualCheckBy(Side.RED)
+        assert not engine.isPerpetualCheckBy(Side.BLACK) and not engine.isPerpetualChase
+        assert RepetitionRules().judge(engine) is None and RepetitionRules(maxRepetitions=2).judge(engine) == RepetitionVerdict(Side.BLACK, "RED checked perpetually")
+        playCycle(engine, CHECK_MOVES[3:] + CHECK_MOVES[:3], 4)
+        assert RepetitionRules().judge(engine) == RepetitionVerdict(Side.BLACK, "RED checked perpetually")
+        assert RepetitionRules(perpetualCheckLoses=False).judge(engine).winner is None
+        engine.unmakeMove()
+        assert engine.repetitionCount == 2 and engine.isPerpetualCheckBy(Side.BLACK) is False
+        for _ in range(7):
+            engine.unmakeMove()
+        assert not engine.isRepetition and not engine.isPerpetualCheckBy(Side.RED)
+
+    def testPerpetualChase(self) -> None:
+        engine = XiangqiEngine.fromFen(CHASE_FEN)
+        engine.makeMove(positionsToMove((1, 4), (0, 4)))
+        engine.makeMove(positionsToMove((0, 5), (2, 5)))
+        playCycle(engine, CHASE_MOVES, 7)
+        assert engine.repetitionCount == 3 and engine.isPerpetualChaseBy(Side.RED) and not engine.isPerpetualChaseBy(Side.BLACK)
+        assert not engine.isPerpetualCheckBy(Side.RED)
+        assert RepetitionRules().judge(engine) == RepetitionVerdict(Side.BLACK, "RED chased perpetually")
+        assert RepetitionRules(perpetualChaseLoses=False).judge(engine).winner is None
+
+    @pytest.mark.parametrize("fen, move, isChase", [
+        (CHASE_FEN, ((1, 4), (0, 4)), True),
+        # NOTE: Attacking a protected piece is only a chase if the target is more valuable than the attacker
+        (CHASE_FEN.replace("3k5", "r2k5"), ((1, 4), (0, 4)), False),
+        ("2rk5/9/2r6/9/9/9/N8/9/9/4K4 w - - 0 1", ((0, 3), (1, 5)), True),
+        # NOTE: Soldiers on their own side of the river cannot be chased
+        ("3k5/9/9/9/9/9/p8/1R7/9/4K4 w - - 0 1", ((1, 2), (0, 2)), True),
+        ("3k5/9/9/9/p8/1R7/9/9/9/4K4 w - - 0 1", ((1, 4), (0, 4)), False)
+    ])
+    def testChase(self, fen: str, move, isChase: bool) -> None:
+        engine = XiangqiEngine.fromFen(fen)
+        engine.makeMove(positionsToMove(*move))
+        assert engine._repetitions._chaseRuns == [int(isChase)]
+
+    def testHistory(self) -> None:
+        history = RepetitionHistory(1)
+        for positionHash, isCheck in ((2, True), (3, False), (1, True), (2, False)):
+            history.push(positionHash, isCheck, False)
+        assert (len(history), history.count, history._checkRuns) == (4, 2, [1, 0, 2, 0])
+        for _ in range(4):
+            history.pop()
+        with pytest.raises(IndexError):
+            history.pop()
+        with pytest.raises(ValueError):
+            RepetitionRules(maxRepetitions=1)
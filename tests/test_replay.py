@@ -0,0 +1,57 @@
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Side
+from aiBoardGame.logic.engine.replay import replayGame, replayGames, readGameRecords, main
+
+
+GAMES = Path("tests/data/games")
+
+
+class TestReplayGames:
+    def testDirectory(self) -> None:
+        result = replayGames(GAMES)
+        assert [game.name for game in result.games] == ["game1.txt", "game2.txt"]
+        game1, game2 = result.games
+        replayedGame1 = replayGame(GAMES / "game1.txt")
+        assert game1.isValid and game1.result == "*"
+        assert (game1.plies, game1.fen) == (len(replayedGame1.moveHistory), replayedGame1.fen)
+        assert game2.isValid and game2.winner == Side.RED and game2.result == "1-0"
+        assert result.plies == game1.plies + game2.plies
+        assert result.invalidGames == []
+        assert result.pliesPerSecond > 0
+
+    def testIllegalPly(self, tmp_path: Path) -> None:
+        notations = (GAMES / "game1.txt").read_text().splitlines()
+        (tmp_path / "illegal.txt").write_text("\n".join(notations[:10] + ["R1+9"] + notations[10:]))
+        (tmp_path / "unknown.txt").write_text("B3+5\nXYZ\n")
+        illegal, unknown = replayGames(tmp_path).games
+        assert illegal.illegalPly == 11 and illegal.plies == 10 and illegal.result == "*"
+        assert illegal.fen.split(" ")[0] == replayGames(tmp_path / "illegal.txt").games[0].fen.split(" ")[0]
+        assert unknown.illegalPly == 2 and "XYZ" in unknown.error
+
+    def testArchives(self, tmp_path: Path) -> None:
+        with zipfile.ZipFile(tmp_path / "games.zip", "w") as archive:
+            for path in GAMES.iterdir():
+                archive.write(path, f"records/{path.name}")
+        with tarfile.open(tmp_path / "games.tar.gz", "w:gz") as archive:
+            archive.add(GAMES, "records")
+        expected = [(f"records/{game.name}", game.fen) for game in replayGames(GAMES).games]
+        assert [(game.name, game.fen) for game in replayGames(tmp_path / "games.zip").games] == expected
+        assert sorted((game.name, game.fen) for game in replayGames(tmp_path / "games.tar.gz").games) == expected
+        assert len(list(readGameRecords(tmp_path / "games.zip"))) == 2
+
+    def testProcesses(self) -> None:
+        assert replayGames(GAMES, processes=2, chunkSize=1).games == replayGames(GAMES, compact=False).games
+        with pytest.raises(ValueError):
+            replayGames(GAMES, processes=0)
+        with pytest.raises(FileNotFoundError):
+            replayGames(GAMES / "missing")
+
+    def testMain(self, tmp_path: Path) -> None:
+        assert main([str(GAMES), "--games"]) == 0
+        (tmp_path / "invalid.txt").write_text("R1+9\n")
+        assert main([str(tmp_path)]) == 1
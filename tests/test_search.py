@@ -0,0 +1,45 @@
+from aiBoardGame.logic.engine.auxiliary import Position
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.search.alphaBetaSearch import AlphaBetaSearch, MATE_SCORE
+from aiBoardGame.logic.stockfish.fairyStockfish import Difficulty
+
+
+class TestAlphaBetaSearch:
+    search = AlphaBetaSearch(difficulty=Difficulty.EASY, maxDepth=2)
+
+    def testMove(self) -> None:
+        game = XiangqiEngine()
+        start, end = self.search.nextMove(game.fen)
+        game.move(start, end)
+        assert self.search.lastResult.depth == 2
+        assert self.search.lastResult.nodesPerSecond > 0
+
+    def testPlay(self) -> None:
+        game = XiangqiEngine()
+        for _ in range(5):
+            start, end = self.search.nextMove(game.fen)
+            game.move(start, end)
+
+    def testEngineRestored(self) -> None:
+        game = XiangqiEngine.fromFen("2bakab2/9/4c1n2/2p3p1p/C3p4/2P3P2/P2RPr2P/4B3C/Nnc2N3/2BAKA3 w - - 0 21", compact=True)
+        fen, validMoves = game.fen, game._validMoves
+        self.search.search(game)
+        assert game.fen == fen
+        assert game._validMoves == validMoves
+        assert len(game.moveHistory) == 0
+
+    def testCapture(self) -> None:
+        assert self.search.nextMove("4k4/9/9/9/4r4/9/9/9/4R4/3K5 w - - 0 1") == (Position(4,1), Position(4,5))
+
+    def testMate(self) -> None:
+        assert self.search.nextMove("3k5/9/9/9/9/9/9/9/4R4/R3K4 w - - 0 1") == (Position(4,1), Position(3,1))
+        assert self.search.lastResult.score == MATE_SCORE - 1
+
+    def testNoMove(self) -> None:
+        assert self.search.nextMove("3k5/9/9/9/9/9/9/9/9/3RK4 b - - 0 1") is None
+
+    def testNodeLimit(self) -> None:
+        search = AlphaBetaSearch(maxDepth=10, maxNodes=100)
+        assert search.nextMove("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1") is not None
+        assert search.lastResult.nodes <= 100
+        assert search.lastResult.depth < 10
@@ -1,3 +1,9 @@
+import gc
+import sys
+from pathlib import Path
+
+import pytest
+
 from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
 from aiBoardGame.logic.stockfish.fairyStockfish import FairyStockfish
 
@@ -15,3 +21,11 @@ class TestStockfish:
         for _ in range(5):
             start, end = self.stockfish.nextMove(game.fen)
             game.move(start, end)
+
+    def testMissingBinary(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        unraisables = []
+        monkeypatch.setattr(sys, "unraisablehook", unraisables.append)
+        with pytest.raises(OSError):
+            FairyStockfish(tmp_path / "missing")
+        gc.collect()
+        assert len(unraisables) == 0
@@ -0,0 +1,118 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from aiBoardGame.logic.engine.compactBoard import CompactBoard, CODE_TO_ENTITY
+from aiBoardGame.logic.engine.move import encodeMove
+from aiBoardGame.logic.engine.tables import POSITIONS
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+from aiBoardGame.logic.search.tablebase import Tablebase, TablebaseResult, generateTablebases, canonicalSignature, _Layout, _generateChunk
+
+
+def layoutFen(layout: _Layout, index: int) -> str:
+    sides, pieceSquares = layout.decode(np.array([index]))
+    board = CompactBoard()
+    for square, code in zip(pieceSquares[0], layout.codes):
+        board[POSITIONS[square]] = CODE_TO_ENTITY[code]
+    return f"{board.fen} {'w' if sides[0] > 0 else 'b'} - - 0 1"
+
+
+def mirroredFen(fen: str) -> str:
+    boardFen, side, *rest = fen.split(" ")
+    return " ".join(["/".join(reversed(boardFen.split("/"))).swapcase(), "b" if side == "w" else "w", *rest])
+
+
+def resultOrder(result: TablebaseResult):
+    # NOTE: Quickest win first, then draw, then the longest defence
+    if result.isWin:
+        return (2, -result.plies)
+    return (1, 0) if result.isDraw else (0, result.plies)
+
+
+@pytest.fixture(scope="module")
+def tablebaseDirectory(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    directory = tmp_path_factory.mktemp("tablebases")
+    assert generateTablebases(["KRka"], directory) == ["Kk", "KAk", "KRk", "KAkr"]
+    return directory
+
+
+class TestTablebase:
+    def testGenerate(self, tablebaseDirectory: Path) -> None:
+        assert sorted(path.name for path in tablebaseDirectory.iterdir()) == ["KAk.npy", "KAkr.npy", "KRk.npy", "Kk.npy"]
+        assert generateTablebases(["KAkr", "KRk"], tablebaseDirectory) == []
+        assert Tablebase(tablebaseDirectory).signatures == {"Kk", "KAk", "KRk", "KAkr"}
+
+    def testEngineRules(self, tablebaseDirectory: Path) -> None:
+        # NOTE: Every legal position has the value of its best move according to the engine's own move generation
+        tablebase = Tablebase(tablebaseDirectory)
+        layout = _Layout("KAkr")
+        table = np.load(tablebaseDirectory / "KAkr.npy")
+        checked = 0
+        for index in range(0, layout.size, 53):
+            sides, pieceSquares = layout.decode(np.array([index]))
+            if len(set(pieceSquares[0])) < len(layout.codes):
+                continue
+            engine = XiangqiEngine.fromFen(layoutFen(layout, index), compact=True, cacheSize=0)
+            opponentGeneral = engine.squares.index(-5 * engine.currentSide)
+            if engine.isSquareAttacked(opponentGeneral, engine.currentSide):
+                continue
+            results = []
+            for start, ends in list(engine._validMoves.items()):
+                for end in ends:
+                    engine.makeMove(encodeMove(start, end))
+                    results.append(tablebase.probeSquares(engine.squares, engine.currentSide))
+                    engine.unmakeMove()
+            expected = TablebaseResult(-1) if engine.isOver else max((TablebaseResult(int(-result.value - np.sign(result.value))) for result in results), key=resultOrder)
+            assert tablebase.probe(layoutFen(layout, index)) == TablebaseResult(int(table[index])) == expected
+            checked += 1
+        assert checked > 500
+
+    def testMirrored(self, tablebaseDirectory: Path) -> None:
+        tablebase = Tablebase(tablebaseDirectory)
+        fen = "3k5/9/9/9/9/9/9/9/9/4K3R w - - 0 1"
+        assert tablebase.probe(fen) == tablebase.probe(mirroredFen(fen)) == TablebaseResult(2)
+        assert tablebase.probe(fen).plies == 1 and tablebase.probe(fen.replace(" w ", " b ")).isLoss
+        assert tablebase.probe("3k5/9/9/9/9/9/9/9/9/4K3R w - - 0 1".replace("R", "N")) is None
+        assert tablebase.probe("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1") is None
+
+    def testNextMove(self, tablebaseDirectory: Path) -> None:
+        tablebase = Tablebase(tablebaseDirectory)
+        layout = _Layout("KAkr")
+        table = np.load(tablebaseDirectory / "KAkr.npy")
+        for index in (int(np.argmax(table)), int(np.argmin(table))):
+            fen = layoutFen(layout, index)
+            result = tablebase.probe(fen)
+            engine = XiangqiEngine.fromFen(fen, compact=True, cacheSize=0)
+            side = engine.currentSide
+            while not engine.isOver:
+                engine.move(*tablebase.nextMove(engine.fen))
+            assert len(engine.moveHistory) == result.plies
+            assert engine.winner == (side if result.isWin else side.opponent)
+
+    def testResume(self, tmp_path: Path, tablebaseDirectory: Path) -> None:
+        generateTablebases(["Kk"], tmp_path)
+        (tmp_path / "KRk.work").mkdir()
+        for start in (0, 1000, 5000):
+            _generateChunk(("KRk", tmp_path, start, start + 1000))
+        assert generateTablebases(["KRk"], tmp_path, chunkSize=1000) == ["KRk"]
+        assert np.array_equal(np.load(tmp_path / "KRk.npy"), np.load(tablebaseDirectory / "KRk.npy"))
+        assert not (tmp_path / "KRk.work").exists()
+        assert generateTablebases(["KAk"], tmp_path / "parallel", processes=2, chunkSize=100) == ["Kk", "KAk"]
+        assert np.array_equal(np.load(tmp_path / "parallel" / "KAk.npy"), np.load(tablebaseDirectory / "KAk.npy"))
+
+    def testSignatures(self) -> None:
+        assert canonicalSignature("kRK") == canonicalSignature("rkK") == "KRk"
+        assert canonicalSignature("KRkaa") == canonicalSignature("KAAkr") == "KAAkr"
+        for signature in ("KR", "KRRRk", "KXk", "KKk"):
+            with pytest.raises(ValueError):
+                canonicalSignature(signature)
+        with pytest.raises(ValueError):
+            generateTablebases(["KRk"], Path("unused"), processes=0)
+
+
+class TestTablebaseBenchmark:
+    @pytest.mark.benchmark(group="tablebase")
+    def testNextMove(self, benchmark, tablebaseDirectory: Path) -> None:
+        tablebase = Tablebase(tablebaseDirectory)
+        assert benchmark(tablebase.nextMove, "4k4/9/9/9/9/9/9/9/4A4/3K1r3 b - - 0 1") is not None
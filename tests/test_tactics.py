@@ -0,0 +1,90 @@
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+from aiBoardGame.logic.engine.auxiliary import Position, Side
+from aiBoardGame.logic.engine.replay import replayGame
+from aiBoardGame.logic.engine.tables import SQUARE_COUNT, squareIndex
+from aiBoardGame.logic.engine.tactics import Tactics, Threat
+from aiBoardGame.logic.engine.xiangqiEngine import XiangqiEngine
+
+
+def encode(start: Tuple[int, int], end: Tuple[int, int]) -> int:
+    return squareIndex(start) << 8 | squareIndex(end)
+
+
+class TestTactics:
+    @pytest.mark.parametrize("fen, move, gain", [
+        # NOTE: Chariot takes a soldier defended by a horse
+        ("3k5/9/9/9/4p4/2n6/9/4R4/9/4K4 w - - 0 1", encode((4,2),(4,5)), -800),
+        # NOTE: Capturing chariot uncovers a cannon behind its screen, black's soldier defends before the cannon
+        ("c2k5/p8/n8/9/9/9/R8/9/N8/C3K4 w - - 0 1", encode((0,3),(0,7)), -400),
+        ("c2k5/N8/n8/9/9/9/R8/9/N8/C3K4 w - - 0 1", encode((0,3),(0,7)), -50),
+        # NOTE: Capturing advisor frees the leg of a horse, the general only recaptures on undefended squares
+        ("3k5/9/9/9/9/9/9/9/4p4/2nA1K3 w - - 0 1", encode((3,0),(4,1)), -100),
+        ("3k5/9/9/9/9/9/9/9/4p4/2nAK4 w - - 0 1", encode((3,0),(4,1)), 100),
+        ("3c1k3/3r5/9/9/9/9/9/9/R2p5/3K5 w - - 0 1", encode((0,1),(3,1)), -800),
+        ("3c1k3/9/9/9/3p5/9/9/9/R2p5/3K5 w - - 0 1", encode((0,1),(3,1)), -350),
+        # NOTE: Quiet moves
+        ("3k5/9/9/9/4p4/2n6/9/4R4/9/4K4 w - - 0 1", encode((4,2),(4,4)), -900),
+        ("3k5/9/9/9/4p4/2n6/9/4R4/9/4K4 w - - 0 1", encode((4,2),(5,2)), 0),
+    ])
+    def testSee(self, fen: str, move: int, gain: int) -> None:
+        engine = XiangqiEngine.fromFen(fen)
+        squares = engine.squares.tobytes()
+        assert Tactics(engine).see(move) == gain
+        assert engine.squares.tobytes() == squares
+        with pytest.raises(ValueError):
+            Tactics(engine).see(encode((0,5),(0,6)))
+
+    def testAttackers(self) -> None:
+        engine = XiangqiEngine.fromFen("3k5/9/9/9/9/9/9/9/4p4/2nA1K3 w - - 0 1")
+        tactics = Tactics(engine)
+        assert tactics.attackers(squareIndex((4,1)), Side.BLACK) == []
+        assert tactics.attackers(squareIndex((4,1)), Side.RED) == [squareIndex((3,0))]
+        engine.move((3,0),(4,1))
+        assert tactics.attackers(squareIndex((4,1)), Side.BLACK) == [squareIndex((2,0))]
+        # NOTE: Flying general
+        engine = XiangqiEngine.fromFen("4k4/9/9/9/9/9/9/9/9/4K4 w - - 0 1")
+        assert Tactics(engine).attackers(squareIndex((4,9)), Side.RED) == [squareIndex((4,0))]
+
+    def testAttackersMatchAttackMap(self) -> None:
+        game = replayGame(Path("tests/data/games/game1.txt"), game=XiangqiEngine())
+        tactics = Tactics(game)
+        while len(game.moveHistory) > 0:
+            for square in range(SQUARE_COUNT):
+                for side in Side:
+                    assert sorted(tactics.attackers(square, side)) == sorted(game._attackMap.attackers(square, side))
+            game.undoMove()
+
+    def testThreats(self) -> None:
+        engine = XiangqiEngine()
+        tactics = Tactics(engine)
+        assert tactics.threats() == tactics.threats(Side.RED) == [] and tactics.hangingPieces(Side.RED) == tactics.hangingPieces(Side.BLACK) == []
+        engine = XiangqiEngine.fromFen("3k5/9/9/9/9/9/9/9/4p4/2nAK4 w - - 0 1")
+        tactics = Tactics(engine)
+        threats = tactics.threats(Side.RED)
+        assert [(threat.start, threat.end, threat.gain) for threat in threats] == [(Position(3,0), Position(4,1), 100), (Position(4,0), Position(4,1), 100)]
+        assert tactics.threats() == [] and tactics.hangingPieces(Side.BLACK) == [Position(4,1)]
+        engine = XiangqiEngine.fromFen("3k5/9/9/9/4p4/2n6/9/4R4/9/4K4 b - - 0 1")
+        tactics = Tactics(engine)
+        assert tactics.threats() == [] and tactics.hangingPieces(Side.BLACK) == []
+        engine.move((2,4),(3,6))
+        assert tactics.threats() == [] and tactics.hangingPieces(Side.BLACK) == [Position(4,5)]
+        assert tactics.threats(Side.RED) == [Threat(encode((4,2),(4,5)), 100)]
+
+
+class TestTacticsBenchmark:
+    @pytest.mark.benchmark(group="tactics")
+    def testGameThreats(self, benchmark) -> None:
+        game = replayGame(Path("tests/data/games/game1.txt"), game=XiangqiEngine())
+        engines = []
+        while len(game.moveHistory) > 0:
+            engines.append(XiangqiEngine.fromSnapshot(game.snapshot()))
+            game.undoMove()
+
+        def analyse() -> int:
+            return sum(len(Tactics(engine).threats()) + len(Tactics(engine).hangingPieces(engine.currentSide)) for engine in engines)
+
+        assert benchmark(analyse) > 0